@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Round-trip cost of N fs_read calls sent one at a time, as one JSON-RPC batch,
+and as a single fs_read_many call.
+
+Spawns server.py against a temporary config whose only root is a temp dir of
+N small files, warms it up, then times both shapes R times.
+
+    python bench/batch_bench.py [--files 50] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _call(id_: int, path: str) -> dict:
+    return {"jsonrpc": "2.0", "id": id_, "method": "tools/call", "params": {"name": "fs_read", "arguments": {"path": path}}}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=20)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(opts.files):
+            p = pathlib.Path(tmp, f"f{i:04d}.txt")
+            p.write_text(f"file {i}\n" * 20, encoding="utf-8")
+            paths.append(str(p))
+        cfg = pathlib.Path(tmp, "config.yaml")
+        cfg.write_text(f"allowed_roots:\n  - {tmp}\ncache:\n  enabled: false\nreload:\n  watch: false\n", encoding="utf-8")
+
+        env = dict(os.environ, LOCAL_MCP_CONFIG=str(cfg))
+        env.pop("LOCAL_MCP_RECORD", None)
+        proc = subprocess.Popen(
+            [sys.executable, str(HERE / "server.py")],
+            cwd=str(HERE), env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding="utf-8",
+        )
+
+        def send(obj) -> None:
+            proc.stdin.write(json.dumps(obj) + "\n")
+            proc.stdin.flush()
+
+        def recv():
+            return json.loads(proc.stdout.readline())
+
+        next_id = 0
+
+        def sequential() -> None:
+            nonlocal next_id
+            for p in paths:
+                next_id += 1
+                send(_call(next_id, p))
+                assert "result" in recv()
+
+        def batched() -> None:
+            nonlocal next_id
+            batch = []
+            for p in paths:
+                next_id += 1
+                batch.append(_call(next_id, p))
+            send(batch)
+            out = recv()
+            assert len(out) == len(paths) and all("result" in m for m in out)
+
+        def read_many() -> None:
+            nonlocal next_id
+            next_id += 1
+            send({"jsonrpc": "2.0", "id": next_id, "method": "tools/call",
+                  "params": {"name": "fs_read_many", "arguments": {"files": paths}}})
+            out = json.loads(recv()["result"]["content"][0]["text"])
+            assert all("text" in f for f in out["files"])
+
+        try:
+            sequential()  # warm up: config load, tool import, thread pool
+            batched()
+            read_many()
+            for label, fn in (("sequential", sequential), ("batch", batched), ("fs_read_many", read_many)):
+                samples = []
+                for _ in range(opts.repeat):
+                    start = time.perf_counter()
+                    fn()
+                    samples.append((time.perf_counter() - start) * 1000.0)
+                samples.sort()
+                print(
+                    f"{label:12} {opts.files} calls: median {samples[len(samples) // 2]:8.2f} ms  "
+                    f"min {samples[0]:8.2f} ms  ({samples[len(samples) // 2] * 1000 / opts.files:.1f} us/call)"
+                )
+        finally:
+            proc.stdin.close()
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
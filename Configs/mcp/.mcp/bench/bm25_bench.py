@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+BM25 index on a synthetic source tree: build and incremental update time,
+index size, and bm25_search latency for multi-word queries against
+mgrep_search in tree mode (which scores every line).
+
+    python bench/bm25_bench.py [--files 5000] [--lines 200] [--workers 4]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local import bm25  # noqa: E402
+from mcp_local.policy import PathPolicy  # noqa: E402
+from mcp_local.tools import bm25_tools, mgrep_tools  # noqa: E402
+
+QUERIES = [
+    "load user config",
+    "parseFrame token cache",
+    "retry the request after a timeout",
+]
+
+
+def generate(root: str, files: int, lines: int) -> int:
+    rng = random.Random(11)
+    verbs = ["handle", "parse", "load", "render", "build", "check", "update", "fetch", "retry", "close"]
+    nouns = ["request", "config", "token", "user", "cache", "index", "record", "frame", "timeout", "socket"]
+    total = 0
+    for i in range(files):
+        d = os.path.join(root, f"pkg{i % 40:02d}")
+        os.makedirs(d, exist_ok=True)
+        out = []
+        for _ in range(lines):
+            verb, noun = rng.choice(verbs), rng.choice(nouns)
+            word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(5))
+            out.append(
+                rng.choice(
+                    [
+                        f"def {verb}_{noun}_{word}(self, {rng.choice(nouns)}):",
+                        f"    return self.{verb}{noun.title()}({word})",
+                        f"    # {verb} the {noun} before the {rng.choice(nouns)} is used",
+                        f"    {word} = {rng.choice(nouns)}.get('{noun}')",
+                        "",
+                    ]
+                )
+            )
+        data = "\n".join(out) + "\n"
+        total += len(data)
+        with open(os.path.join(d, f"file{i:05d}.py"), "w") as f:
+            f.write(data)
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--lines", type=int, default=200, help="lines per file")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--mgrep-budget", type=float, default=60.0, help="time budget of each mgrep_search call (s)")
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "src")
+        index_dir = os.path.join(tmp, "idx")
+        source = generate(root, opts.files, opts.lines)
+
+        built = bm25.update(root, index_dir, workers=opts.workers, rebuild=True)
+        size = bm25.BM25Index(bm25.index_path(root, index_dir)).stats()["bytes"]
+        print(f"build      {built['seconds']:7.2f} s  {opts.files} files, {source / 1e6:.1f} MB source -> "
+              f"{size / 1e6:.1f} MB index, {built['chunks']} chunks")
+
+        for n in random.Random(5).sample(range(opts.files), max(1, opts.files // 100)):
+            with open(os.path.join(root, f"pkg{n % 40:02d}", f"file{n:05d}.py"), "a") as f:
+                f.write("# edited\n")
+        updated = bm25.update(root, index_dir)
+        print(f"update     {updated['seconds']:7.2f} s  re-read {updated['read']} changed files")
+
+        policy = PathPolicy([tmp])
+        for query in QUERIES:
+            start = time.perf_counter()
+            bm25_tools.bm25_search(policy, root, query, max_results=10, index_dir=index_dir, max_age_s=0)
+            t_bm25 = time.perf_counter() - start
+            start = time.perf_counter()
+            out = mgrep_tools.search(
+                policy, query, root=root, max_results=10, workers=opts.workers, time_budget_s=opts.mgrep_budget
+            )
+            t_mgrep = time.perf_counter() - start
+            note = "  (mgrep hit its time budget)" if "time budget" in out else ""
+            print(f"{query!r:40} bm25_search {t_bm25 * 1000:8.1f} ms  mgrep_search {t_mgrep * 1000:9.1f} ms{note}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Reading files at a revision: `git show REV:PATH` forked per read vs
+git_show through the long-lived `git cat-file --batch` process.
+
+    python bench/git_show_bench.py [--repo .] [--rev HEAD] [--files 200]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.tools import git_tools  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repo", default=".")
+    ap.add_argument("--rev", default="HEAD")
+    ap.add_argument("--files", type=int, default=200)
+    opts = ap.parse_args()
+
+    top = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=opts.repo, capture_output=True, text=True, check=True)
+    repo = top.stdout.strip()
+    listed = subprocess.run(["git", "ls-tree", "-r", "--name-only", opts.rev], cwd=repo, capture_output=True, text=True)
+    paths = listed.stdout.splitlines()[: opts.files]
+
+    start = time.perf_counter()
+    forked = [subprocess.run(["git", "show", f"{opts.rev}:{p}"], cwd=repo, capture_output=True).stdout for p in paths]
+    t_fork = time.perf_counter() - start
+
+    git_tools.show(repo, rev=opts.rev)  # start the cat-file process outside the timing
+    start = time.perf_counter()
+    piped = [git_tools.show(repo, p, opts.rev, max_bytes=64 << 20) for p in paths]
+    t_pipe = time.perf_counter() - start
+
+    same = sum(f.decode("utf-8", errors="replace") == s for f, s in zip(forked, piped))
+    print(f"{len(paths)} files  git show per file {t_fork * 1000:8.1f} ms  git_show {t_pipe * 1000:8.1f} ms  "
+          f"({t_fork / t_pipe:.1f}x)  {same}/{len(paths)} identical (binary files are summarized)")
+
+
+if __name__ == "__main__":
+    main()
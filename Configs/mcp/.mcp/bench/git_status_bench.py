@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Status of many repos: `git status` run once per repo, one after another, vs
+git_status_many (repo discovery, a thread pool and core.untrackedCache).
+Generates the repos in a temporary directory.
+
+    python bench/git_status_bench.py [--repos 40] [--files 300] [--workers 8]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.tools import git_tools  # noqa: E402
+
+
+def _git(repo: str, *args: str) -> None:
+    subprocess.run(["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost", *args],
+                   cwd=repo, check=True, capture_output=True)
+
+
+def _make_repos(base: str, count: int, files: int) -> list:
+    repos = []
+    for i in range(count):
+        repo = os.path.join(base, f"group{i % 4}", f"repo{i:03d}")
+        for d in range(files // 20 + 1):
+            os.makedirs(os.path.join(repo, f"dir{d}"), exist_ok=True)
+        for f in range(files):
+            with open(os.path.join(repo, f"dir{f // 20}", f"f{f}.txt"), "w") as fh:
+                fh.write(f"{i} {f}\n")
+        _git(repo, "init", "-q")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-qm", "init")
+        with open(os.path.join(repo, "dir0", "f0.txt"), "a") as fh:
+            fh.write("changed\n")
+        open(os.path.join(repo, f"new{i}.txt"), "w").close()
+        repos.append(repo)
+    return repos
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repos", type=int, default=40)
+    ap.add_argument("--files", type=int, default=300)
+    ap.add_argument("--workers", type=int, default=8)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as base:
+        repos = _make_repos(base, opts.repos, opts.files)
+        # Warm both: the first untrackedCache run writes the cache into the index.
+        git_tools.status_many(base, workers=opts.workers)
+
+        start = time.perf_counter()
+        for repo in repos:
+            subprocess.run(["git", "status", "--porcelain=v2", "--branch", "-z"], cwd=repo, capture_output=True)
+        t_serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        out = json.loads(git_tools.status_many(base, workers=opts.workers))
+        t_pool = time.perf_counter() - start
+
+        found = len(out["repos"])
+        dirty = sum(not r.get("clean", False) for r in out["repos"])
+        print(f"{len(repos)} repos  git status one by one {t_serial * 1000:8.1f} ms  "
+              f"git_status_many {t_pool * 1000:8.1f} ms  ({t_serial / t_pool:.1f}x)  {found} found, {dirty} dirty")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+fs_glob on a large synthetic tree: legacy glob.glob + set + sort vs the
+scandir walker (sorted, unsorted, and stopping at max_results).
+
+The tree has --files files spread over nested package directories, with a
+node_modules and a .git directory holding about a fifth of them, so the
+pruned walker also does less work. The first run checks that the walker
+with pruning and .gitignore disabled returns exactly the legacy result.
+
+    python bench/glob_bench.py [--files 500000] [--pattern '**/*.py'] [--dir /tmp/tree]
+"""
+import argparse
+import glob
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.walk import walk  # noqa: E402
+
+EXTS = (".py", ".js", ".md", ".txt", ".json")
+
+
+def legacy(root: str, pattern: str) -> list:
+    return sorted(set(glob.glob(str(pathlib.Path(root) / pattern), recursive=True)))
+
+
+def build(root: str, files: int) -> None:
+    per_dir = 50
+    dirs = max(1, files // per_dir)
+    n = 0
+    for d in range(dirs):
+        top = "node_modules" if d % 10 == 0 else ".git/objects" if d % 10 == 1 else "src"
+        path = os.path.join(root, top, f"pkg{d % 40:02d}", f"mod{d // 40:04d}")
+        os.makedirs(path, exist_ok=True)
+        for i in range(per_dir):
+            with open(os.path.join(path, f"f{i:03d}{EXTS[i % len(EXTS)]}"), "w") as f:
+                f.write("x")
+            n += 1
+    with open(os.path.join(root, ".gitignore"), "w") as f:
+        f.write("*.json\n")
+
+
+def bench(label: str, fn) -> list:
+    start = time.perf_counter()
+    out = fn()
+    print(f"{label:40} {time.perf_counter() - start:9.3f} s  {len(out):>8} results")
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=500_000)
+    ap.add_argument("--pattern", default="**/*.py")
+    ap.add_argument("--max-results", type=int, default=1000)
+    ap.add_argument("--dir", help="reuse/build the tree here instead of a temp dir")
+    opts = ap.parse_args()
+
+    tmp = None
+    root = opts.dir
+    if root is None:
+        tmp = tempfile.TemporaryDirectory()
+        root = tmp.name
+    if not os.path.exists(os.path.join(root, ".gitignore")):
+        start = time.perf_counter()
+        build(root, opts.files)
+        print(f"built {opts.files} files in {time.perf_counter() - start:.1f} s")
+    try:
+        base = bench("legacy glob.glob+set+sort", lambda: legacy(root, opts.pattern))
+        same = bench("walker, no prune/gitignore", lambda: list(walk(root, opts.pattern, prune=(), gitignore=False)))
+        print(f"  identical to legacy: {same == base}")
+        bench("walker, sorted", lambda: list(walk(root, opts.pattern)))
+        bench("walker, unsorted", lambda: list(walk(root, opts.pattern, sort=False)))
+
+        def first_n():
+            out = []
+            for p in walk(root, opts.pattern, sort=False):
+                out.append(p)
+                if len(out) >= opts.max_results:
+                    break
+            return out
+
+        bench(f"walker, unsorted, first {opts.max_results}", first_n)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
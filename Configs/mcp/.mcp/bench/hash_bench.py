@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+fs_hash over a tree: cold (hash everything) vs warm (stat + persistent cache
+lookup only), against reading every file whole as fs_read would.
+
+    python bench/hash_bench.py [--files 2000] [--kb 256] [--workers 4]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.policy import PathPolicy  # noqa: E402
+from mcp_local.tools import hash_tools  # noqa: E402
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--kb", type=int, default=256, help="size of each file")
+    ap.add_argument("--workers", type=int, default=4)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "tree")
+        for i in range(opts.files):
+            d = os.path.join(root, f"d{i % 50:02d}")
+            os.makedirs(d, exist_ok=True)
+            with open(os.path.join(d, f"f{i:05d}.bin"), "wb") as f:
+                f.write(os.urandom(opts.kb << 10))
+        # Back-date mtimes so the racy-timestamp guard lets results be cached.
+        old = time.time() - 60
+        for d, _, names in os.walk(root):
+            for n in names:
+                os.utime(os.path.join(d, n), (old, old))
+        policy = PathPolicy([root])
+        db = os.path.join(tmp, "hashes.sqlite")
+        total_mb = opts.files * opts.kb / 1024
+
+        start = time.perf_counter()
+        for d, _, names in os.walk(root):
+            for n in names:
+                with open(os.path.join(d, n), "rb") as f:
+                    f.read().decode("utf-8", errors="replace")
+        print(f"{'read every file (fs_read style)':36} {time.perf_counter() - start:8.3f} s  ({total_mb:.0f} MiB)")
+
+        for label in ("fs_hash cold", "fs_hash warm (cached)"):
+            start = time.perf_counter()
+            out = json.loads(hash_tools.hash_paths(policy, root=root, cache_path=db, workers=opts.workers))
+            print(f"{label:36} {time.perf_counter() - start:8.3f} s  hashed={out['hashed']} cached={out['cached']}")
+
+        path, digest = next(iter(out["files"].items()))
+        with open(path, "rb") as f:
+            assert digest == hashlib.blake2b(f.read(), digest_size=32).hexdigest()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for server.py.
+
+Runs `python -X importtime -c "import server"` in a fresh interpreter and
+fails if the cumulative import time of `server` exceeds the budget, or if any
+module that must stay lazy (tool implementations, yaml, the worker pool) is
+pulled in at import time. Also reports wall time to the first `initialize`
+response from a spawned server.
+
+    python bench/import_budget.py [--budget-ms 40] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.dirname(HERE)
+
+MUST_STAY_LAZY = [
+    "yaml",
+    "concurrent.futures",
+    "mcp_local.dispatch",
+    "mcp_local.tools.fs_tools",
+    "mcp_local.tools.git_tools",
+    "mcp_local.tools.rg_tools",
+    "mcp_local.tools.pg_tools",
+    "mcp_local.tools.nerdctl_tools",
+    "mcp_local.tools.mgrep_tools",
+]
+
+
+def import_time_us() -> tuple[int, set[str]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=SERVER_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    seen = set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = [p.strip() for p in line[len("import time:"):].split("|")]
+        if not parts[0].isdigit():
+            continue  # header row
+        name = parts[2]
+        seen.add(name.strip())
+        if name == "server":
+            total = int(parts[1])
+    return total, seen
+
+
+def first_response_ms() -> float:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "server.py"],
+        cwd=SERVER_DIR,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    proc.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "initialize"}) + "\n")
+    proc.stdin.flush()
+    proc.stdout.readline()
+    elapsed = (time.perf_counter() - start) * 1000
+    proc.stdin.close()
+    proc.wait()
+    return elapsed
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=40.0)
+    ap.add_argument("--runs", type=int, default=5)
+    opts = ap.parse_args()
+
+    samples = []
+    seen: set[str] = set()
+    for _ in range(opts.runs):
+        us, seen = import_time_us()
+        samples.append(us / 1000)
+    import_ms = statistics.median(samples)
+    startup_ms = statistics.median(first_response_ms() for _ in range(opts.runs))
+
+    print(f"import server (median of {opts.runs}): {import_ms:.1f} ms (budget {opts.budget_ms:.1f} ms)")
+    print(f"spawn -> initialize response (median): {startup_ms:.1f} ms")
+
+    failed = False
+    eager = [m for m in MUST_STAY_LAZY if m in seen]
+    if eager:
+        print("FAIL: imported eagerly: " + ", ".join(eager))
+        failed = True
+    if import_ms > opts.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+In-memory index vs disk walks for glob and name queries.
+
+Builds the same synthetic tree as glob_bench.py, indexes it (reporting the
+initial scan time and the traced memory of the index), then times fs_glob-
+and fs_find-style queries answered from the disk and from the index.
+
+    python bench/index_bench.py [--files 500000] [--dir /tmp/tree]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from glob_bench import build  # noqa: E402
+from mcp_local.index import FileIndex  # noqa: E402
+from mcp_local.walk import find, walk  # noqa: E402
+
+
+def bench(label: str, fn) -> None:
+    start = time.perf_counter()
+    out = list(fn())
+    print(f"{label:40} {(time.perf_counter() - start) * 1000:10.1f} ms  {len(out):>8} results")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=500_000)
+    ap.add_argument("--dir", help="reuse/build the tree here instead of a temp dir")
+    opts = ap.parse_args()
+
+    tmp = None
+    root = opts.dir
+    if root is None:
+        tmp = tempfile.TemporaryDirectory()
+        root = tmp.name
+    if not os.path.exists(os.path.join(root, ".gitignore")):
+        build(root, opts.files)
+    try:
+        idx = FileIndex([root])
+        idx.start()
+        idx.ready.wait()
+        st = idx.stats()
+        print(
+            f"indexed {st['files']} files / {st['dirs']} dirs in {st['last_scan_s']:.2f} s "
+            f"({st['mode']}, {st['watches']} watches)"
+        )
+        # Memory: a second, unwatched scan under tracemalloc (which slows it down).
+        tracemalloc.start()
+        tree = idx._scan(idx.roots[0], None)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del tree
+        print(f"index memory {size / (1 << 20):.1f} MiB ({size / max(1, st['files'] + st['dirs']):.0f} B/entry)")
+        for pattern in ("**/*.py", "src/pkg07/**/*.md"):
+            bench(f"glob {pattern} (disk)", lambda: walk(root, pattern))
+            bench(f"glob {pattern} (index)", lambda: walk(root, pattern, listdir=idx.listdir))
+        bench("find 'f007' (disk)", lambda: find([root], "f007"))
+        bench("find 'f007' (index)", lambda: find([root], "f007", listdir=idx.listdir))
+        idx.stop()
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+mgrep_search with many phrasings of a query against one file: one
+search_file per query vs search_file_many (count-matrix bounds with NumPy,
+or the per-query loop without it). Checks the results are identical.
+
+    python bench/mgrep_batch_bench.py [--lines 200000] [--queries 30]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mgrep_bench import generate  # noqa: E402
+
+from mcp_local.tools import mgrep_tools  # noqa: E402
+
+PHRASES = [
+    "load the user config", "parse config file", "read configuration", "open the cache",
+    "raise ValueError", "return self.value", "def handle_request", "connection timeout",
+    "retry the request", "invalid token", "close the socket", "write the index",
+]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=200_000)
+    ap.add_argument("--queries", type=int, default=30)
+    ap.add_argument("--min-probability", type=float, default=0.6)
+    opts = ap.parse_args()
+    try:
+        import numpy  # noqa: F401
+
+        mode = "numpy"
+    except ImportError:
+        mode = "no numpy: per-query loop"
+
+    rng = random.Random(9)
+    queries = [rng.choice(PHRASES) + rng.choice(["", "s", " now", " again", "()"]) for _ in range(opts.queries)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.txt")
+        generate(path, opts.lines)
+
+        start = time.perf_counter()
+        each = [mgrep_tools.search_file(path, q, opts.min_probability, 20) for q in queries]
+        t_each = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = mgrep_tools.search_file_many(path, queries, opts.min_probability, 20)
+        t_batch = time.perf_counter() - start
+
+    same = batch == "\n\n".join(f"## {q}\n{out}" for q, out in zip(queries, each))
+    print(f"{opts.queries} queries x {opts.lines} lines: search_file each {t_each:7.2f} s  "
+          f"search_file_many {t_batch:7.2f} s ({mode})  {t_each / t_batch:.1f}x  "
+          f"{'same results' if same else 'RESULTS DIFFER'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+mgrep_search over a generated source-like file: the bounded top-k scorer
+against the previous score-every-line implementation (kept here verbatim),
+checking that both return identical rankings.
+
+The legacy scorer runs on the first --check-lines lines only (it needs
+minutes for a million); the new one also runs over the whole file.
+
+    python bench/mgrep_bench.py [--lines 1000000] [--check-lines 100000]
+"""
+import argparse
+import difflib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.tools import mgrep_tools  # noqa: E402
+
+WORDS = (
+    "self config path value result index items return import from class def "
+    "async await yield lambda None True False error raise except finally with "
+    "open read write cache token limit offset buffer query match score lines"
+).split()
+
+QUERIES = [
+    ("def load_config(path)", 0.5, 20),
+    ("raise ValueError", 0.6, 5),
+    ("return self.cache.get(key)", 0.4, 50),
+    ("x", 0.0, 10),
+    # Over 80 chars: candidates include a two-line window.
+    ("for item in items: result.append(self.score(item, query)) if item else None  # long", 0.5, 20),
+]
+
+
+def legacy(path: str, query: str, min_probability: float, max_results: int) -> str:
+    with open(path, encoding="utf-8", errors="ignore") as f:
+        lines = f.read().splitlines()
+    window_size = max(1, min(5, len(query) // 80 + 1))
+    results = []
+    for idx, _ in enumerate(lines):
+        candidates = [lines[idx]]
+        if window_size > 1:
+            chunk = " ".join(lines[idx : idx + window_size])
+            if chunk:
+                candidates.append(chunk)
+        best_score, best_text = 0.0, ""
+        for cand in candidates:
+            s = difflib.SequenceMatcher(None, query, cand).ratio()
+            if s > best_score:
+                best_score, best_text = s, cand
+        if best_score >= min_probability:
+            snippet = best_text.strip()
+            if len(snippet) > 240:
+                snippet = snippet[:237] + "..."
+            results.append((best_score, idx + 1, snippet))
+    if not results:
+        return f"(no matches >= {min_probability:.2f})"
+    results.sort(key=lambda r: (-r[0], r[1]))
+    return "\n".join(f"{path}:{n}:{s * 100:.1f}%: {t}" for s, n, t in results[:max_results])
+
+
+def generate(path: str, lines: int) -> None:
+    rng = random.Random(7)
+    with open(path, "w") as f:
+        for i in range(lines):
+            if i % 997 == 0:
+                f.write("    def load_config(self, path):\n")
+            elif i % 10 == 0:
+                f.write("\n")
+            else:
+                indent = " " * (4 * rng.randint(0, 3))
+                f.write(indent + " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 9))) + "\n")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    ap.add_argument("--check-lines", type=int, default=100_000)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full = os.path.join(tmp, "big.py")
+        part = os.path.join(tmp, "part.py")
+        generate(full, opts.lines)
+        with open(full) as src, open(part, "w") as dst:
+            for _, line in zip(range(opts.check_lines), src):
+                dst.write(line)
+
+        for query, min_p, k in QUERIES:
+            label = f"{query[:28]!r} p>={min_p} k={k}"
+            start = time.perf_counter()
+            old = legacy(part, query, min_p, k)
+            t_old = time.perf_counter() - start
+            start = time.perf_counter()
+            new = mgrep_tools.search_file(part, query, min_p, k)
+            t_new = time.perf_counter() - start
+            status = "same" if old == new else "DIFFERENT"
+            print(f"{label:46} {opts.check_lines} lines: legacy {t_old:7.2f} s  new {t_new:6.2f} s  {status}")
+            if old != new:
+                sys.exit(1)
+
+        for query, min_p, k in QUERIES:
+            label = f"{query[:28]!r} p>={min_p} k={k}"
+            start = time.perf_counter()
+            mgrep_tools.search_file(full, query, min_p, k)
+            print(f"{label:46} {opts.lines} lines: new {time.perf_counter() - start:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
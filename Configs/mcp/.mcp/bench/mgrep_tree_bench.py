@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+mgrep_search over a directory tree: one mgrep_search call per file (what a
+client had to do before tree mode) vs tree mode inline and on the process
+pool, checking all three produce the same ranking.
+
+    python bench/mgrep_tree_bench.py [--files 400] [--lines 2000] [--workers 4]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.policy import PathPolicy  # noqa: E402
+from mcp_local.tools import mgrep_tools  # noqa: E402
+
+from mgrep_bench import QUERIES, WORDS  # noqa: E402
+
+
+def per_file(files: list, query: str, min_p: float, k: int) -> str:
+    # One single-file search per file (what search_file does), merged the way
+    # a client would: by score, then file order, then line.
+    hits = []
+    for i, path in enumerate(files):
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            lines = f.read().splitlines()
+        for score, line, snippet in mgrep_tools.search_lines(lines, query, min_p, k):
+            hits.append((-score, i, line, f"{path}:{line}:{score * 100:.1f}%: {snippet}"))
+    hits.sort()
+    return "\n".join(h[3] for h in hits[:k]) or f"(no matches >= {min_p:.2f})"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=400)
+    ap.add_argument("--lines", type=int, default=2000, help="lines per file")
+    ap.add_argument("--workers", type=int, default=4)
+    opts = ap.parse_args()
+    print(f"cpus: {os.cpu_count()}  (tree mode uses at most that many workers)")
+
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for i in range(opts.files):
+            d = os.path.join(tmp, f"pkg{i % 20:02d}")
+            os.makedirs(d, exist_ok=True)
+            files.append(os.path.join(d, f"mod{i:04d}.py"))
+            with open(files[-1], "w") as f:
+                for _ in range(opts.lines):
+                    f.write(" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 9))) + "\n")
+        files.sort()
+        policy = PathPolicy([tmp])
+        mgrep_tools.search_tree(policy, tmp, "warm up the pool", workers=opts.workers)
+
+        for query, min_p, k in QUERIES[:3]:
+            label = f"{query[:28]!r} p>={min_p} k={k}"
+            start = time.perf_counter()
+            base = per_file(files, query, min_p, k)
+            t_base = time.perf_counter() - start
+            row = f"{label:46} per-file calls {t_base:6.2f} s"
+            for workers in (1, opts.workers):
+                start = time.perf_counter()
+                out = mgrep_tools.search_tree(policy, tmp, query, min_probability=min_p, max_results=k, workers=workers)
+                same = out == base
+                row += f"  tree x{workers} {time.perf_counter() - start:6.2f} s {'same' if same else 'DIFFERENT'}"
+                if not same:
+                    print(row)
+                    sys.exit(1)
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Per-path cost of the allowed_roots check with many roots.
+
+Compares the original check (resolve every root and the candidate on every
+call, then scan the roots) with the compiled PathPolicy, single and bulk.
+
+    python bench/policy_bench.py [--roots 60] [--paths 5000] [--depth 6]
+"""
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.policy import PathPolicy, _real  # noqa: E402
+
+
+def legacy_ensure(path: str, allowed_roots: list[str]) -> None:
+    rp = _real(path)
+    roots = [_real(r) for r in allowed_roots]
+    if not any(rp == r or rp.startswith(r + os.sep) for r in roots):
+        raise PermissionError(f"Path not allowed: {rp}")
+
+
+def bench(label: str, fn, n: int) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:34} {elapsed * 1e6 / n:9.2f} us/path  ({elapsed * 1000:.1f} ms total)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--roots", type=int, default=60)
+    ap.add_argument("--paths", type=int, default=5000)
+    ap.add_argument("--depth", type=int, default=6)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        roots = []
+        for i in range(opts.roots):
+            r = pathlib.Path(tmp, f"root{i:03d}")
+            r.mkdir()
+            roots.append(str(r))
+        # Candidates live under the last root so the legacy scan does full work.
+        deep = pathlib.Path(roots[-1], *[f"d{i}" for i in range(opts.depth)])
+        deep.mkdir(parents=True)
+        paths = []
+        for i in range(opts.paths):
+            f = deep / f"f{i % 500}.txt"
+            if i < 500:
+                f.touch()
+            paths.append(str(f))
+
+        print(f"{opts.roots} roots, {opts.paths} paths at depth {opts.depth}")
+        bench("legacy ensure_path_allowed", lambda: [legacy_ensure(p, roots) for p in paths], len(paths))
+        t0 = time.perf_counter()
+        policy = PathPolicy(roots)
+        print(f"{'compile PathPolicy (once)':34} {(time.perf_counter() - t0) * 1000:9.2f} ms")
+        bench("PathPolicy.check", lambda: [policy.check(p) for p in paths], len(paths))
+        bench("PathPolicy.check_many", lambda: policy.check_many(paths), len(paths))
+
+
+if __name__ == "__main__":
+    main()
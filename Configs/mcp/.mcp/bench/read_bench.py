@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Cost of slicing a large file: whole-file fs_read vs mmap-backed ranged reads.
+
+Writes a temporary log of --mb megabytes, then times a tail (last 64 KiB),
+a middle byte range, and repeated line-range reads (the first builds the
+line-offset index up to that line, later ones reuse it).
+
+    python bench/read_bench.py [--mb 200] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local.cache import CACHE  # noqa: E402
+from mcp_local.tools.fs_tools import read_text  # noqa: E402
+
+
+def bench(label: str, fn, repeat: int) -> None:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples.sort()
+    print(f"{label:40} median {samples[len(samples) // 2]:10.3f} ms  min {samples[0]:10.3f} ms  ({len(out)} chars)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mb", type=int, default=200)
+    ap.add_argument("--repeat", type=int, default=5)
+    opts = ap.parse_args()
+
+    line = b"2024-01-01T00:00:00Z INFO request handled path=/api/v1/items status=200 ms=12\n"
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.log")
+        with open(path, "wb") as f:
+            chunk = line * 8192
+            for _ in range(max(1, (opts.mb << 20) // len(chunk))):
+                f.write(chunk)
+        size = os.path.getsize(path)
+        lines = size // len(line)
+        print(f"{size / (1 << 20):.0f} MiB, {lines} lines")
+
+        CACHE.configure({"enabled": False})
+        bench("whole file, then tail slice", lambda: read_text(path)[-65536:], opts.repeat)
+        CACHE.configure({"enabled": True, "max_bytes": 256 << 20})
+        bench("offset=-65536", lambda: read_text(path, offset=-65536), opts.repeat)
+        bench("middle: offset=size/2 length=65536", lambda: read_text(path, offset=size // 2, length=65536), opts.repeat)
+        bench("line_start=-500", lambda: read_text(path, line_start=-500), opts.repeat)
+        mid = lines // 2
+        t = time.perf_counter()
+        read_text(path, line_start=mid, line_count=200)
+        print(f"{'first line_start=N/2 (builds index)':40} {(time.perf_counter() - t) * 1000:17.3f} ms")
+        bench("line_start=N/2 line_count=200 (cached)", lambda: read_text(path, line_start=mid, line_count=200), opts.repeat)
+        bench("line_start=N/4 line_count=200 (cached)", lambda: read_text(path, line_start=mid // 2, line_count=200), opts.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+rg_search on a synthetic tree: the previous version (capture all of rg's
+output, then truncate) vs streaming `rg --json` and stopping rg at
+max_results; then one rg_search per symbol vs a single call with
+`queries`. Needs `rg` in PATH.
+
+    python bench/rg_bench.py [--files 20000] [--lines 200]
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local import cancel  # noqa: E402
+from mcp_local.tools import rg_tools  # noqa: E402
+
+QUERIES = [
+    ("broad", "return", 200),
+    ("broad, small limit", "return", 10),
+    ("rare", "handle_request_4711", 200),
+]
+SYMBOLS = ["handle_request_4711", "parse_frame_17", "load_config_3", "render_token_99", "fetch_user_8"]
+
+
+def legacy(root: str, query: str, max_results: int = 200) -> str:
+    # rg_tools.search before streaming, verbatim apart from the name.
+    cmd = ["rg", "--no-heading", "--line-number", "--color", "never", query, root]
+    proc = cancel.run(cmd, text=True, capture_output=True)
+    if proc.returncode not in (0, 1):
+        raise RuntimeError((proc.stderr or proc.stdout or "").strip() or f"rg failed ({proc.returncode})")
+    lines = (proc.stdout or "").splitlines()
+    if not lines:
+        return "(no matches)"
+    if len(lines) > max_results:
+        lines = lines[:max_results] + [f"... truncated to {max_results} results"]
+    return "\n".join(lines)
+
+
+def generate(root: str, files: int, lines: int) -> None:
+    rng = random.Random(7)
+    for i in range(files):
+        d = os.path.join(root, f"pkg{i % 50:02d}")
+        os.makedirs(d, exist_ok=True)
+        out = [
+            rng.choice(["def f(x):", "    return x + 1", "    y = x * 2", "# comment"]) for _ in range(lines)
+        ]
+        if i % 501 == 0:
+            out.append(f"{SYMBOLS[i % len(SYMBOLS)]}()")
+        with open(os.path.join(d, f"f{i:05d}.py"), "w") as f:
+            f.write("\n".join(out) + "\n")
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=20000)
+    ap.add_argument("--lines", type=int, default=200, help="lines per file")
+    opts = ap.parse_args()
+    if shutil.which("rg") is None:
+        sys.exit("rg not found in PATH")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generate(tmp, opts.files, opts.lines)
+        for label, query, limit in QUERIES:
+            t_old = timed(lambda: legacy(tmp, query, limit))
+            t_new = timed(lambda: rg_tools.search([tmp], query, max_results=limit))
+            print(f"{label:20} max_results={limit:<4} capture {t_old * 1000:8.1f} ms  "
+                  f"stream {t_new * 1000:8.1f} ms  ({t_old / t_new:.1f}x)")
+
+        t_each = timed(lambda: [rg_tools.search([tmp], s) for s in SYMBOLS])
+        t_one = timed(lambda: rg_tools.search([tmp], SYMBOLS))
+        print(f"{len(SYMBOLS)} symbols            one call each {t_each * 1000:8.1f} ms  "
+              f"queries {t_one * 1000:8.1f} ms  ({t_each / t_one:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
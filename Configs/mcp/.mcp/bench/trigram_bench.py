@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Trigram index on a synthetic source tree: build and incremental update time,
+index size against the source size, and index_search query latency against
+plain `rg` over the whole tree (or, without rg, a full scan with Python's re,
+which is also what index_search falls back to).
+
+    python bench/trigram_bench.py [--files 5000] [--lines 200] [--workers 4]
+"""
+import argparse
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mcp_local import trigram  # noqa: E402
+from mcp_local.policy import PathPolicy  # noqa: E402
+from mcp_local.tools import trigram_tools  # noqa: E402
+
+QUERIES = [
+    ("rare identifier", "handle_request_4711", "literal"),
+    ("common word", "return", "literal"),
+    ("regex", r"handle_request_47[0-9]{2}\b", "regex"),
+    ("case-insensitive", "CONFIG_LOADER_93", "literal"),
+]
+
+
+def generate(root: str, files: int, lines: int) -> int:
+    rng = random.Random(3)
+    verbs = ["handle", "parse", "load", "render", "build", "check", "update", "fetch"]
+    nouns = ["request", "config", "token", "user", "cache", "index", "record", "frame"]
+    total = 0
+    for i in range(files):
+        d = os.path.join(root, f"pkg{i % 40:02d}", f"mod{i % 7}")
+        os.makedirs(d, exist_ok=True)
+        out = []
+        for _ in range(lines):
+            # A random word per line gives real-code-like trigram variety.
+            word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(5))
+            name = f"{rng.choice(verbs)}_{word}_{rng.randint(0, 9999)}"
+            out.append(
+                rng.choice(
+                    [
+                        f"def {name}(self, arg):",
+                        f"    return {name}(arg) + {rng.randint(0, 999)}",
+                        f"    # TODO: {rng.choice(nouns)} {rng.choice(verbs)} later",
+                        f"    value = self.{name}.get('{rng.choice(nouns)}')",
+                        f"CONFIG_LOADER_{rng.randint(0, 99)} = {rng.random():.4f}",
+                    ]
+                )
+            )
+        if i % 97 == 0:  # planted so the rare queries have a few hits
+            out.insert(rng.randrange(len(out) + 1), "def parse_frame_17(self, handle_request_4711):")
+        data = "\n".join(out) + "\n"
+        total += len(data)
+        with open(os.path.join(d, f"file{i:05d}.py"), "w") as f:
+            f.write(data)
+    return total
+
+
+def timed(fn, repeat: int = 3) -> tuple:
+    best, out = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        t = time.perf_counter() - start
+        best = t if best is None else min(best, t)
+    return best, out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=5000)
+    ap.add_argument("--lines", type=int, default=200, help="lines per file")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    opts = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, "src")
+        index_dir = os.path.join(tmp, "idx")
+        source = generate(root, opts.files, opts.lines)
+
+        start = time.perf_counter()
+        built = trigram.build(root, index_dir, workers=opts.workers, incremental=False)
+        print(f"build      {time.perf_counter() - start:7.2f} s  {opts.files} files, "
+              f"{source / 1e6:.1f} MB source -> {built['bytes'] / 1e6:.1f} MB index "
+              f"({built['bytes'] / source:.0%}), {built['trigrams']} trigrams")
+
+        changed = sorted(random.Random(5).sample(range(opts.files), max(1, opts.files // 100)))
+        for dp, _, names in os.walk(root):
+            for n in names:
+                if int(n[4:9]) in changed:
+                    with open(os.path.join(dp, n), "a") as f:
+                        f.write("# edited\n")
+        start = time.perf_counter()
+        updated = trigram.build(root, index_dir)
+        print(f"update     {time.perf_counter() - start:7.2f} s  re-read {updated['read']} changed files, "
+              f"reused {updated['reused']}")
+
+        policy = PathPolicy([tmp])
+        rg = shutil.which("rg")
+        if not rg:
+            print("(rg not found: baseline is a full scan with Python re)")
+        all_files = sorted(os.path.join(dp, n) for dp, _, names in os.walk(root) for n in names)
+        for label, query, mode in QUERIES:
+            ignore_case = label == "case-insensitive"
+
+            def indexed():
+                return trigram_tools.index_search(
+                    policy, root, query, mode=mode, ignore_case=ignore_case, max_results=5000, index_dir=index_dir
+                )
+
+            def plain():
+                if rg:
+                    cmd = ["rg", "--no-heading", "--line-number", "--color", "never"]
+                    cmd += (["-F"] if mode == "literal" else []) + (["-i"] if ignore_case else [])
+                    return subprocess.run(cmd + ["-e", query, root], capture_output=True, text=True).stdout.splitlines()
+                return trigram_tools._scan(all_files, query, mode == "literal", ignore_case, 10**9)
+
+            t_idx, out = timed(indexed)
+            t_plain, base = timed(plain)
+            lines = out.splitlines()
+            narrowed = lines[-1]
+            hits = [ln for ln in lines[:-1] if not ln.startswith(("(no matches", "... truncated"))]
+            same = len(hits) == min(len(base), 5000)
+            print(f"{label:18} index_search {t_idx * 1000:8.1f} ms  plain {t_plain * 1000:8.1f} ms  "
+                  f"{len(hits)} hits {'same' if same else 'DIFFERENT'}  {narrowed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+"""
+Persistent BM25 index of a source tree, used by bm25_search.
+
+One sqlite file per indexed root under bm25.dir, named after a hash of the
+root's real path. Files are split into chunks of about bm25.chunk_lines
+lines, cut where possible at a blank line or an unindented line (a new
+top-level block), and each chunk is tokenized identifier-aware:
+`parseHTTPHeader` and `parse_http_header` both give parse, http and header
+besides the whole identifier. Tables:
+
+    files     path relative to the root ('/'-separated), size, mtime_ns
+    chunks    file, first and last line, token count, its distinct terms
+    postings  (term, chunk) -> term frequency and chunk length, clustered by term
+    terms     term -> number of chunks containing it
+    meta      root, chunk_lines, chunk count and total length, last update
+
+so a query reads one postings range per query term and scores from it alone.
+`update` re-chunks only files whose size or mtime changed and deletes the
+postings of changed or removed ones through chunks.terms; `build` starts
+over. Files come from the scandir walker (`**/*`: no dot-files, no
+fs.prune_dirs, .gitignore honoured); binary and oversized files are listed
+without chunks.
+
+    python -m mcp_local.bm25 build ROOT [--workers N]
+    python -m mcp_local.bm25 update ROOT
+    python -m mcp_local.bm25 stats ROOT
+"""
+import argparse
+import hashlib
+import heapq
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DIR = "~/.cache/local-mcp/bm25"
+DEFAULT_MAX_FILE_BYTES = 1 << 20
+DEFAULT_CHUNK_LINES = 40
+K1, B = 1.2, 0.75
+
+_WORD = re.compile(r"\w+")
+_PARTS = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")  # HTTPServer2 -> HTTP Server 2
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in is it of on or the this that to was were will with".split()
+)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS files (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, size INTEGER, mtime_ns INTEGER);
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY, file INTEGER NOT NULL, start INTEGER, end INTEGER, dl INTEGER, terms TEXT);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks (file);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT, chunk INTEGER, tf INTEGER, dl INTEGER, PRIMARY KEY (term, chunk)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER) WITHOUT ROWID;
+"""
+
+
+def index_path(root: str, index_dir: str = DEFAULT_DIR) -> str:
+    real = os.path.realpath(os.path.expanduser(root))
+    name = hashlib.blake2b(real.encode(), digest_size=10).hexdigest()
+    return os.path.join(os.path.expanduser(index_dir), f"{name}.bm25")
+
+
+def _term(tok: str) -> Optional[str]:
+    if len(tok) < 2 or tok in STOPWORDS:
+        return None
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith(("ss", "us", "is")):
+        tok = tok[:-1]  # plain plurals: files -> file
+    return tok
+
+
+def tokens(text: str) -> List[str]:
+    """Index terms of text: each word lowercased, plus its snake/camel-case parts."""
+    out = []
+    for word in _WORD.findall(text):
+        if len(word) > 64:
+            continue  # hashes, base64, minified code
+        parts = _PARTS.findall(word) if word.isascii() else [p for p in word.split("_") if p]
+        if len(parts) > 1:
+            parts.append(word.strip("_"))
+        for p in parts:
+            t = _term(p.lower())
+            if t:
+                out.append(t)
+    return out
+
+
+def chunk_ranges(lines: List[str], chunk_lines: int) -> List[Tuple[int, int]]:
+    """[(start, end)] 0-based, end exclusive: at least chunk_lines lines, cut at a block start, at most twice that."""
+    out, start = [], 0
+    for i in range(1, len(lines)):
+        n = i - start
+        if n >= 2 * chunk_lines or (
+            n >= chunk_lines
+            and (not lines[i - 1].strip() or (lines[i][:1] not in " \t)]}" and lines[i].strip()))
+        ):
+            out.append((start, i))
+            start = i
+    if start < len(lines):
+        out.append((start, len(lines)))
+    return out
+
+
+def _file_chunks(path: str, max_file_bytes: int, chunk_lines: int) -> List[Tuple[int, int, int, List[Tuple[str, int]]]]:
+    """[(first line, last line, token count, [(term, tf)])] of a file, 1-based lines."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(max_file_bytes + 1)
+    except OSError:
+        return []
+    if len(data) > max_file_bytes or b"\0" in data[:8192]:
+        return []
+    lines = data.decode("utf-8", errors="replace").splitlines()
+    out = []
+    for a, b in chunk_ranges(lines, chunk_lines):
+        toks = tokens("\n".join(lines[a:b]))
+        if toks:
+            out.append((a + 1, b, len(toks), sorted(Counter(toks).items())))
+    return out
+
+
+class BM25Index:
+    """A connection to one index file; cheap to open, one per call."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_SCHEMA)
+
+    def meta(self, key: str, default: str = "") -> str:
+        row = self.db.execute("SELECT value FROM meta WHERE key=?", (key,)).fetchone()
+        return row[0] if row else default
+
+    @property
+    def root(self) -> str:
+        return self.meta("root")
+
+    @property
+    def updated(self) -> float:
+        return float(self.meta("updated", "0"))
+
+    def stats(self) -> Dict[str, object]:
+        q = lambda sql: self.db.execute(sql).fetchone()[0]  # noqa: E731
+        size = sum(os.path.getsize(p) for p in (self.path, self.path + "-wal") if os.path.exists(p))
+        return {
+            "root": self.root,
+            "files": q("SELECT COUNT(*) FROM files"),
+            "chunks": int(self.meta("chunks", "0")),
+            "terms": q("SELECT COUNT(*) FROM terms"),
+            "postings": q("SELECT COUNT(*) FROM postings"),
+            "bytes": size,
+        }
+
+    def search(
+        self, query: List[str], k: int, accept: Optional[Callable[[str], bool]] = None
+    ) -> List[Tuple[float, str, int, int]]:
+        """Top k chunks for the query terms: [(score, path, first line, last line)]."""
+        n, total = int(self.meta("chunks", "0")), int(self.meta("total", "0"))
+        if not n:
+            return []
+        # tf * (K1 + 1) / (tf + K1 * (1 - B + B * dl / avgdl)), constants hoisted
+        c0, c1 = K1 * (1 - B), K1 * B * n / total
+        scores: Dict[int, float] = {}
+        for term in set(query):
+            row = self.db.execute("SELECT df FROM terms WHERE term=?", (term,)).fetchone()
+            if not row:
+                continue
+            w = math.log(1 + (n - row[0] + 0.5) / (row[0] + 0.5)) * (K1 + 1)
+            get = scores.get
+            for chunk, tf, dl in self.db.execute("SELECT chunk, tf, dl FROM postings WHERE term=?", (term,)):
+                scores[chunk] = get(chunk, 0.0) + w * tf / (tf + c0 + c1 * dl)
+        ranked: Iterable[Tuple[int, float]]
+        if accept is None:
+            ranked = heapq.nsmallest(k, scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        else:
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        out = []
+        for chunk, score in ranked:
+            path, start, end = self.db.execute(
+                "SELECT f.path, c.start, c.end FROM chunks c JOIN files f ON f.id = c.file WHERE c.id=?", (chunk,)
+            ).fetchone()
+            if accept is None or accept(path):
+                out.append((score, path, start, end))
+                if len(out) >= k:
+                    break
+        return out
+
+    def close(self) -> None:
+        self.db.close()
+
+
+_WRITE_LOCKS: Dict[str, threading.Lock] = {}
+_WRITE_LOCKS_LOCK = threading.Lock()
+
+
+def update(
+    root: str,
+    index_dir: str = DEFAULT_DIR,
+    prune: Optional[Iterable[str]] = None,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    chunk_lines: int = DEFAULT_CHUNK_LINES,
+    workers: int = 1,
+    rebuild: bool = False,
+) -> Dict[str, float]:
+    """
+    Bring the index of root up to date: re-chunk files whose size or mtime
+    changed, drop removed ones. rebuild=True (or a different chunk_lines)
+    starts from an empty index. Readers see the old index until it commits.
+    """
+    from mcp_local.walk import list_files
+
+    start = time.monotonic()
+    root = os.path.realpath(os.path.expanduser(root))
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Directory not found: {root}")
+    path = index_path(root, index_dir)
+    with _WRITE_LOCKS_LOCK:
+        lock = _WRITE_LOCKS.setdefault(path, threading.Lock())
+    with lock:
+        idx = BM25Index(path)
+        db = idx.db
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            if rebuild or idx.root != root or idx.meta("chunk_lines") != str(chunk_lines):
+                for table in ("meta", "files", "chunks", "postings", "terms"):
+                    db.execute(f"DELETE FROM {table}")
+            nchunks, total = int(idx.meta("chunks", "0")), int(idx.meta("total", "0"))
+
+            listed = list_files(root, prune)
+            disk = {rel: (size, mtime) for rel, size, mtime in listed}
+            have = {rel: (fid, (size, mtime)) for fid, rel, size, mtime in db.execute("SELECT * FROM files")}
+            gone = [fid for rel, (fid, sig) in have.items() if disk.get(rel) != sig]
+            todo = [(rel, size, mtime) for rel, size, mtime in listed if have.get(rel, (0, None))[1] != (size, mtime)]
+
+            for fid in gone:
+                for cid, dl, terms in db.execute("SELECT id, dl, terms FROM chunks WHERE file=?", (fid,)).fetchall():
+                    terms = terms.split(" ")
+                    db.executemany("DELETE FROM postings WHERE term=? AND chunk=?", [(t, cid) for t in terms])
+                    db.executemany("UPDATE terms SET df = df - 1 WHERE term=?", [(t,) for t in terms])
+                    nchunks, total = nchunks - 1, total - dl
+                db.execute("DELETE FROM chunks WHERE file=?", (fid,))
+                db.execute("DELETE FROM files WHERE id=?", (fid,))
+            if gone:
+                db.execute("DELETE FROM terms WHERE df <= 0")
+
+            base = root.rstrip(os.sep) or os.sep
+            paths = [os.path.join(base, *rel.split("/")) for rel, _, _ in todo]
+            n = len(paths)
+            if workers > 1 and n > 64:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                ctx = multiprocessing.get_context("spawn")  # may run inside the (threaded) server
+                pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+                results = pool.map(_file_chunks, paths, [max_file_bytes] * n, [chunk_lines] * n, chunksize=16)
+            else:
+                pool = None
+                results = (_file_chunks(p, max_file_bytes, chunk_lines) for p in paths)
+            try:
+                for (rel, size, mtime), chunks in zip(todo, results):
+                    fid = db.execute("INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)", (rel, size, mtime)).lastrowid
+                    for first, last, dl, counts in chunks:
+                        cid = db.execute(
+                            "INSERT INTO chunks (file, start, end, dl, terms) VALUES (?, ?, ?, ?, ?)",
+                            (fid, first, last, dl, " ".join(t for t, _ in counts)),
+                        ).lastrowid
+                        db.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", [(t, cid, tf, dl) for t, tf in counts])
+                        db.executemany(
+                            "INSERT INTO terms VALUES (?, 1) ON CONFLICT (term) DO UPDATE SET df = df + 1",
+                            [(t,) for t, _ in counts],
+                        )
+                        nchunks, total = nchunks + 1, total + dl
+            finally:
+                if pool is not None:
+                    pool.shutdown()
+
+            meta = {"root": root, "chunk_lines": chunk_lines, "chunks": nchunks, "total": total, "updated": time.time()}
+            db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+            db.execute("COMMIT")
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            idx.close()
+    return {
+        "files": len(listed),
+        "read": len(todo),
+        "removed": sum(1 for rel in have if rel not in disk),
+        "chunks": nchunks,
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+def find_index(root: str, index_dir: str = DEFAULT_DIR) -> Optional[BM25Index]:
+    """The index of root or of its nearest indexed ancestor."""
+    d = os.path.realpath(os.path.expanduser(root))
+    while True:
+        path = index_path(d, index_dir)
+        if os.path.exists(path):
+            idx = BM25Index(path)
+            if idx.root:  # an interrupted first build leaves an empty file
+                return idx
+            idx.close()
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m mcp_local.bm25")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name, help_ in (
+        ("build", "index ROOT from scratch"),
+        ("update", "re-chunk only files changed since the last build/update"),
+        ("stats", "print the size of ROOT's index"),
+    ):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("root")
+        p.add_argument("--config", help="config.yaml to take bm25.* and fs.prune_dirs from")
+        p.add_argument("--dir", help="index directory (default: bm25.dir)")
+        if name != "stats":
+            p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    opts = ap.parse_args(argv)
+
+    cfg: dict = {}
+    try:
+        from mcp_local.config import load_config
+
+        cfg = load_config(opts.config)
+    except Exception as e:
+        if opts.config:
+            raise
+        sys.stderr.write(f"(no usable config.yaml, using defaults: {e})\n")
+    bcfg = cfg.get("bm25", {})
+    index_dir = opts.dir or bcfg.get("dir") or DEFAULT_DIR
+
+    if opts.cmd == "stats":
+        path = index_path(opts.root, index_dir)
+        if not os.path.exists(path):
+            print(f"no index for {opts.root} ({path})")
+            return 1
+        idx = BM25Index(path)
+        print(f"{path}: " + ", ".join(f"{k}={v}" for k, v in idx.stats().items()))
+        idx.close()
+        return 0
+
+    result = update(
+        opts.root,
+        index_dir,
+        prune=cfg.get("fs", {}).get("prune_dirs"),
+        max_file_bytes=int(bcfg.get("max_file_bytes", DEFAULT_MAX_FILE_BYTES)),
+        chunk_lines=int(bcfg.get("chunk_lines", DEFAULT_CHUNK_LINES)),
+        workers=opts.workers,
+        rebuild=opts.cmd == "build",
+    )
+    print(", ".join(f"{k}={v}" for k, v in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
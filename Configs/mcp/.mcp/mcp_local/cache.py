@@ -0,0 +1,161 @@
+"""
+In-process LRU cache for read-only tool results.
+
+Every entry stores a validator (a cheap stat-derived signature) next to its
+value; a lookup whose current validator differs from the stored one is a miss.
+Entries are keyed by (tool, path, *args) so writers can drop everything at or
+around a path via invalidate_path().
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+MISS = object()
+
+
+def file_sig(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def dir_sig(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+
+def git_sig(repo: str) -> Optional[tuple]:
+    # .git/index changes on stage/commit/checkout/refresh; HEAD on branch moves.
+    git_dir = os.path.join(repo, ".git")
+    if not os.path.isdir(git_dir):
+        return None  # worktree/submodule (.git file) or not a repo: don't cache
+    sig = []
+    for name in ("index", "HEAD"):
+        try:
+            st = os.stat(os.path.join(git_dir, name))
+        except OSError:
+            sig.append(None)
+            continue
+        sig.append((st.st_ino, st.st_size, st.st_mtime_ns))
+    return tuple(sig)
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 2048, max_bytes: int = 64 << 20) -> None:
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Tuple[Any, Any, int, float]]" = OrderedDict()
+        self.enabled = True
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = {}  # tool name -> max entry age in seconds
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def configure(self, cfg: dict) -> None:
+        with self._lock:
+            self.enabled = bool(cfg.get("enabled", True))
+            self.max_entries = int(cfg.get("max_entries", self.max_entries))
+            self.max_bytes = int(cfg.get("max_bytes", self.max_bytes))
+            self.ttl = {
+                "git_status": float(cfg.get("git_status_ttl_s", 2.0)),
+                "fs_glob": float(cfg.get("glob_ttl_s", 2.0)),
+            }
+            if not self.enabled:
+                self._data.clear()
+                self._bytes = 0
+            self._evict()
+
+    def get(self, key: Tuple, validator: Any) -> Any:
+        if not self.enabled or validator is None:
+            return MISS
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, stored, _, created = entry
+                ttl = self.ttl.get(key[0])
+                if stored == validator and (ttl is None or time.monotonic() - created < ttl):
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+            self.misses += 1
+            return MISS
+
+    def put(self, key: Tuple, validator: Any, value: Any, size: int) -> None:
+        if not self.enabled or validator is None or size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, validator, size, time.monotonic())
+            self._bytes += size
+            self._evict()
+
+    def invalidate_path(self, path: str, subtree: bool = False) -> None:
+        """
+        Drop entries for path and for every cached ancestor of it (listings,
+        globs, repo status). With subtree=True also drop everything below it.
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            doomed = []
+            for key in self._data:
+                p = key[1]
+                if p == path or path.startswith(p.rstrip(os.sep) + os.sep):
+                    doomed.append(key)
+                elif subtree and p.startswith(path.rstrip(os.sep) + os.sep):
+                    doomed.append(key)
+            for key in doomed:
+                self._drop(key)
+            self.invalidations += len(doomed)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._data)
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: Hashable) -> None:
+        # Caller holds self._lock.
+        _, _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        # Caller holds self._lock.
+        while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, _, size, _) = self._data.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+
+CACHE = LRUCache()
+
+
+def cached(key: Tuple, validator: Any, compute) -> str:
+    """Return the cached value for key if validator still matches, else compute()."""
+    value = CACHE.get(key, validator)
+    if value is MISS:
+        value = compute()
+        CACHE.put(key, validator, value, len(value))
+    return value
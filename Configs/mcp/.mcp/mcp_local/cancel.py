@@ -0,0 +1,120 @@
+"""
+Per-call cancellation.
+
+The dispatcher binds a CancelToken to the worker thread running a tool call.
+Tools register cleanup on it (kill a child process, cancel a Postgres query)
+through current()/run() and never need the token passed in explicitly.
+"""
+import subprocess
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+class Cancelled(Exception):
+    """Raised inside a tool call once the client has cancelled it."""
+
+
+class CancelToken:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._callbacks: list[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled:
+                return
+            self._cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for cb in callbacks:
+            try:
+                cb()
+            except Exception:
+                pass
+
+    def on_cancel(self, cb: Callable[[], None]) -> Callable[[], None]:
+        """Run cb on cancel (now, if already cancelled); returns an unregister fn."""
+        with self._lock:
+            if not self._cancelled:
+                self._callbacks.append(cb)
+
+                def unregister() -> None:
+                    with self._lock:
+                        if cb in self._callbacks:
+                            self._callbacks.remove(cb)
+
+                return unregister
+        cb()
+        return lambda: None
+
+    def check(self) -> None:
+        if self._cancelled:
+            raise Cancelled("request cancelled")
+
+
+_local = threading.local()
+
+
+def current() -> Optional[CancelToken]:
+    return getattr(_local, "token", None)
+
+
+def check() -> None:
+    token = current()
+    if token is not None:
+        token.check()
+
+
+@contextmanager
+def bind(token: CancelToken) -> Iterator[CancelToken]:
+    prev = current()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = prev
+
+
+def run(cmd: list[str], *, capture_output: bool = False, text: bool = False, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() that kills the child if the current call is cancelled."""
+    token = current()
+    if token is None:
+        return subprocess.run(cmd, capture_output=capture_output, text=text, **kwargs)
+    token.check()
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    with subprocess.Popen(cmd, text=text, **kwargs) as proc:
+        unregister = token.on_cancel(proc.kill)
+        try:
+            out, err = proc.communicate()
+        finally:
+            unregister()
+    token.check()
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+
+@contextmanager
+def popen(cmd: list[str], **kwargs) -> Iterator[subprocess.Popen]:
+    """
+    subprocess.Popen for streaming output: the child is killed if the current
+    call is cancelled, or if the block exits while it is still running (e.g.
+    the caller has read all it needs).
+    """
+    token = current()
+    if token is not None:
+        token.check()
+    with subprocess.Popen(cmd, **kwargs) as proc:
+        unregister = token.on_cancel(proc.kill) if token is not None else (lambda: None)
+        try:
+            yield proc
+        finally:
+            unregister()
+            if proc.poll() is None:
+                proc.kill()
+    if token is not None:
+        token.check()
@@ -1,18 +1,89 @@
-import os, pathlib, yaml
+import os, pathlib, signal, sys, threading
+from typing import Callable, Optional
+from mcp_local.policy import path_policy
 
 DEFAULT_CONFIG_PATHS = [
     os.environ.get("LOCAL_MCP_CONFIG", ""),
     str(pathlib.Path(__file__).resolve().parent.parent / "config.yaml"),
 ]
 
-def load_config() -> dict:
-    path = None
+def find_config_path() -> str:
     for p in DEFAULT_CONFIG_PATHS:
         if p and os.path.exists(p):
-            path = p
-            break
-    if not path:
-        raise RuntimeError("config.yaml not found. Set LOCAL_MCP_CONFIG or place config.yaml next to server.py")
+            return p
+    raise RuntimeError("config.yaml not found. Set LOCAL_MCP_CONFIG or place config.yaml next to server.py")
+
+def validate_config(cfg: dict) -> None:
+    """Raise ValueError if a (normalized) config can't be used as-is."""
+    roots = cfg["allowed_roots"]
+    if not isinstance(roots, list) or not all(isinstance(r, str) and r for r in roots):
+        raise ValueError("allowed_roots must be a list of paths")
+    conns = cfg["postgres"]["connections"]
+    if not isinstance(conns, dict):
+        raise ValueError("postgres.connections must be a mapping")
+    for name, c in conns.items():
+        if not isinstance(c, dict) or not isinstance(c.get("url"), str):
+            raise ValueError(f"postgres.connections.{name}.url must be a string")
+    hosts = cfg["ssh"]["hosts"]
+    if not isinstance(hosts, dict):
+        raise ValueError("ssh.hosts must be a mapping")
+    for name, h in hosts.items():
+        if not isinstance(h, dict) or not isinstance(h.get("target"), str):
+            raise ValueError(f"ssh.hosts.{name}.target must be a string")
+    for key in ("read_many_workers", "read_many_max_bytes", "hash_workers"):
+        v = cfg["fs"].get(key)
+        if v is not None and not (isinstance(v, int) and v >= 1):
+            raise ValueError(f"fs.{key} must be a positive integer")
+    prune = cfg["fs"].get("prune_dirs")
+    if prune is not None and not (isinstance(prune, list) and all(isinstance(d, str) for d in prune)):
+        raise ValueError("fs.prune_dirs must be a list of directory names")
+    for key in ("workers", "max_files", "max_file_bytes"):
+        v = cfg["mgrep"].get(key)
+        if v is not None and not (isinstance(v, int) and v >= 1):
+            raise ValueError(f"mgrep.{key} must be a positive integer")
+    budget = cfg["mgrep"].get("time_budget_s", 30)
+    if not (isinstance(budget, (int, float)) and budget > 0):
+        raise ValueError("mgrep.time_budget_s must be a positive number")
+    tri = cfg["trigram"]
+    if tri.get("dir") is not None and not isinstance(tri["dir"], str):
+        raise ValueError("trigram.dir must be a path")
+    v = tri.get("max_file_bytes")
+    if v is not None and not (isinstance(v, int) and v >= 1):
+        raise ValueError("trigram.max_file_bytes must be a positive integer")
+    b25 = cfg["bm25"]
+    if b25.get("dir") is not None and not isinstance(b25["dir"], str):
+        raise ValueError("bm25.dir must be a path")
+    for key in ("max_file_bytes", "chunk_lines"):
+        v = b25.get(key)
+        if v is not None and not (isinstance(v, int) and v >= 1):
+            raise ValueError(f"bm25.{key} must be a positive integer")
+    age = b25.get("max_age_s", 300)
+    if not (isinstance(age, (int, float)) and age >= 0):
+        raise ValueError("bm25.max_age_s must be a non-negative number")
+    idle = cfg["git"].get("cat_file_idle_s", 300)
+    if not (isinstance(idle, (int, float)) and idle > 0):
+        raise ValueError("git.cat_file_idle_s must be a positive number")
+    workers = cfg["git"].get("status_workers", 8)
+    if not (isinstance(workers, int) and workers >= 1):
+        raise ValueError("git.status_workers must be a positive integer")
+    for key in ("status_untracked_cache", "status_fsmonitor"):
+        if not isinstance(cfg["git"].get(key, False), bool):
+            raise ValueError(f"git.{key} must be true or false")
+    interval = cfg["index"].get("rescan_interval_s", 300)
+    if not (isinstance(interval, (int, float)) and interval > 0):
+        raise ValueError("index.rescan_interval_s must be a positive number")
+    cc = cfg["concurrency"]
+    for key in ("max_workers", "default_per_tool"):
+        if key in cc and not (isinstance(cc[key], int) and cc[key] >= 1):
+            raise ValueError(f"concurrency.{key} must be a positive integer")
+    for tool, n in cc["per_tool"].items():
+        if not (isinstance(n, int) and n >= 1):
+            raise ValueError(f"concurrency.per_tool.{tool} must be a positive integer")
+
+def load_config(path: Optional[str] = None) -> dict:
+    path = path or find_config_path()
+    import yaml  # deferred: only needed once the first tool call arrives
+
     with open(path, "r", encoding="utf-8") as f:
         cfg = yaml.safe_load(f) or {}
 
@@ -22,5 +93,95 @@ def load_config() -> dict:
     cfg["postgres"].setdefault("write_policy", {})
     cfg.setdefault("ssh", {}).setdefault("hosts", {})
     cfg.setdefault("nerdctl", {}).setdefault("local_path", "nerdctl")
+    cfg.setdefault("concurrency", {}).setdefault("per_tool", {})
+    cfg.setdefault("fs", {})
+    cfg.setdefault("mgrep", {})
+    cfg.setdefault("trigram", {})
+    cfg.setdefault("bm25", {})
+    cfg.setdefault("git", {})
+    cfg.setdefault("index", {}).setdefault("enabled", False)
+    cfg.setdefault("cache", {}).setdefault("enabled", True)
+    cfg.setdefault("metrics", {}).setdefault("interval_s", 15)
+    cfg.setdefault("reload", {}).setdefault("watch", True)
     cfg.setdefault("logging", {}).setdefault("level", "INFO")
+    validate_config(cfg)
+
+    # Resolve allowed_roots now rather than on the first path check.
+    path_policy(cfg["allowed_roots"])
     return cfg
+
+class ConfigStore:
+    """
+    Holds the current config and swaps in a new one when config.yaml changes
+    (mtime poll) or on SIGHUP. Parsing and validation happen on the watcher
+    thread; a bad file is reported on stderr and the old config stays active.
+    Listeners get (old, new) after the swap and tear down only what changed.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path or find_config_path()
+        self._mtime = self._stat_mtime()
+        self._config = load_config(self.path)
+        self._listeners: list[Callable[[dict, dict], None]] = []
+        self._wake = threading.Event()
+        self._lock = threading.Lock()  # serializes reloads, not readers
+        self._watcher: Optional[threading.Thread] = None
+
+    def get(self) -> dict:
+        # Readers take a snapshot reference; a reload replaces, never mutates.
+        return self._config
+
+    def on_change(self, cb: Callable[[dict, dict], None]) -> None:
+        self._listeners.append(cb)
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        with self._lock:
+            self._mtime = self._stat_mtime()
+            try:
+                new = load_config(self.path)
+            except Exception as e:
+                sys.stderr.write(f"local-mcp: config reload failed, keeping previous config: {e}\n")
+                return False
+            old, self._config = self._config, new
+        for cb in self._listeners:
+            try:
+                cb(old, new)
+            except Exception as e:
+                sys.stderr.write(f"local-mcp: config reload hook failed: {e}\n")
+        return True
+
+    def request_reload(self) -> None:
+        """Reload on the watcher thread as soon as possible (e.g. from SIGHUP)."""
+        self._wake.set()
+
+    def start_watching(self) -> None:
+        """
+        Start the reload thread. It polls the file's mtime every
+        reload.interval_s while reload.watch is on (both re-read from the
+        current config); request_reload() always wakes it.
+        """
+        if self._watcher is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                rcfg = self._config["reload"]
+                poll = bool(rcfg.get("watch", True))
+                forced = self._wake.wait(float(rcfg.get("interval_s", 2)) if poll else None)
+                self._wake.clear()
+                if forced or (poll and self._stat_mtime() != self._mtime):
+                    self.reload()
+
+        self._watcher = threading.Thread(target=loop, name="mcp-config", daemon=True)
+        self._watcher.start()
+
+def install_sighup(handler: Callable[[], None]) -> None:
+    """Call handler() on SIGHUP where the platform has it (main thread only)."""
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: handler())
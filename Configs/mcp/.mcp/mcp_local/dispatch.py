@@ -0,0 +1,155 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from mcp_local.cancel import CancelToken, bind
+
+
+class Dispatcher:
+    """
+    Runs tools/call work on a thread pool with a per-tool concurrency cap.
+    Calls over a tool's cap wait in a per-tool queue instead of holding a
+    worker thread, so a burst of slow calls cannot starve the fast ones.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        default_limit: int = 4,
+        limits: Optional[dict] = None,
+    ):
+        self._max_workers = max(1, int(max_workers))
+        self._pool = self._new_pool(self._max_workers)
+        self._default_limit = max(1, int(default_limit))
+        self._limits = {k: max(1, int(v)) for k, v in (limits or {}).items()}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._running: dict[str, int] = {}
+        self._waiting: dict[str, deque] = {}
+        # Tokens of calls currently holding a slot, mapped to their tool.
+        self._active: dict[CancelToken, str] = {}
+
+    @staticmethod
+    def _new_pool(max_workers: int) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+
+    @classmethod
+    def from_config(cls, config: dict) -> "Dispatcher":
+        cc = config.get("concurrency", {}) or {}
+        return cls(
+            max_workers=cc.get("max_workers", 16),
+            default_limit=cc.get("default_per_tool", 4),
+            limits=cc.get("per_tool", {}) or {},
+        )
+
+    def reconfigure(self, config: dict) -> None:
+        """
+        Apply new concurrency settings in place. Limits change immediately; a
+        new max_workers swaps in a fresh pool while the old one finishes the
+        calls it is already running.
+        """
+        cc = config.get("concurrency", {}) or {}
+        workers = max(1, int(cc.get("max_workers", 16)))
+        old_pool = None
+        with self._lock:
+            self._default_limit = max(1, int(cc.get("default_per_tool", 4)))
+            self._limits = {k: max(1, int(v)) for k, v in (cc.get("per_tool", {}) or {}).items()}
+            if workers != self._max_workers:
+                old_pool, self._pool = self._pool, self._new_pool(workers)
+                self._max_workers = workers
+            # Raised limits: start queued calls that now fit.
+            for tool, queue in self._waiting.items():
+                while queue and self._running.get(tool, 0) < self.limit_for(tool):
+                    self._start(tool, *queue.popleft())
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def limit_for(self, tool: str) -> int:
+        return self._limits.get(tool, self._default_limit)
+
+    def submit(
+        self,
+        tool: str,
+        fn: Callable[[], None],
+        token: Optional[CancelToken] = None,
+        on_drop: Optional[Callable[[], None]] = None,
+    ) -> CancelToken:
+        """
+        Schedule fn(); fn is responsible for sending its own response.
+        fn runs with token bound (see mcp_local.cancel.current()). If the call
+        is cancelled before fn starts, on_drop() runs instead.
+        """
+        token = token or CancelToken()
+        with self._lock:
+            if self._running.get(tool, 0) < self.limit_for(tool):
+                self._start(tool, fn, token, on_drop)
+            else:
+                self._waiting.setdefault(tool, deque()).append((fn, token, on_drop))
+        return token
+
+    def cancel(self, token: CancelToken) -> None:
+        """
+        Cancel a queued or running call. A queued call is dropped; a running
+        one has its token fired (killing child processes/queries) and gives
+        its tool slot back immediately rather than when the thread unwinds.
+        """
+        dropped = None
+        with self._lock:
+            for tool, queue in self._waiting.items():
+                for entry in queue:
+                    if entry[1] is token:
+                        queue.remove(entry)
+                        dropped = entry
+                        break
+            if dropped is not None:
+                self._notify_if_idle()
+        if dropped is not None:
+            token.cancel()
+            if dropped[2] is not None:
+                dropped[2]()
+            return
+        with self._lock:
+            tool = self._active.pop(token, None)
+            if tool is not None:
+                self._release(tool)
+        token.cancel()
+
+    def _start(self, tool: str, fn: Callable[[], None], token: CancelToken, on_drop=None) -> None:
+        # Caller holds self._lock.
+        self._running[tool] = self._running.get(tool, 0) + 1
+        self._active[token] = tool
+        self._pool.submit(self._run, tool, fn, token, on_drop)
+
+    def _release(self, tool: str) -> None:
+        # Caller holds self._lock.
+        self._running[tool] -= 1
+        queue = self._waiting.get(tool)
+        if queue:
+            # Hand the slot straight to the next queued call.
+            self._start(tool, *queue.popleft())
+        self._notify_if_idle()
+
+    def _notify_if_idle(self) -> None:
+        if not any(self._running.values()) and not any(self._waiting.values()):
+            self._idle.notify_all()
+
+    def _run(self, tool: str, fn: Callable[[], None], token: CancelToken, on_drop=None) -> None:
+        try:
+            if not token.cancelled:
+                with bind(token):
+                    fn()
+            elif on_drop is not None:
+                on_drop()
+        finally:
+            with self._lock:
+                # Absent if cancel() already gave the slot back.
+                if self._active.pop(token, None) is not None:
+                    self._release(tool)
+
+    def drain(self) -> None:
+        """Wait for queued and running calls to finish, then stop the pool."""
+        with self._lock:
+            while any(self._running.values()) or any(self._waiting.values()):
+                self._idle.wait()
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,5 @@
+"""
+Local stand-ins for tool modules that need external services (Postgres, SSH).
+Enabled with LOCAL_MCP_FAKE_TOOLS=pg_tools,nerdctl_tools; used by
+mcp_local.replay so recorded sessions can be replayed on any machine.
+"""
@@ -0,0 +1,10 @@
+# Same signatures as mcp_local.tools.nerdctl_tools; nothing is executed.
+
+def local(config: dict, args: list[str]) -> str:
+    return "(ok)"
+
+def remote_ssh(config: dict, host: str, args: list[str]) -> str:
+    return "(ok)"
+
+def run(config: dict, args: list[str], host: str | None = None) -> str:
+    return "(ok)"
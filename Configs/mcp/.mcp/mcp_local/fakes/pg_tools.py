@@ -0,0 +1,11 @@
+from __future__ import annotations
+import json
+
+# Same signatures as mcp_local.tools.pg_tools; no database is contacted.
+
+def query(config: dict, conn: str, sql: str, limit: int = 2000) -> str:
+    payload = {"columns": ["fake"], "rows": [["fake"]], "rowCount": 1}
+    return json.dumps(payload, ensure_ascii=False, default=str, indent=2)
+
+def exec_write(config: dict, conn: str, sql: str) -> str:
+    return json.dumps({"status": "ok", "rowCount": 0}, ensure_ascii=False, indent=2)
@@ -0,0 +1,385 @@
+"""
+Optional in-memory index of everything under allowed_roots (index.enabled).
+
+A background thread walks each root once, then keeps the tree current from
+inotify events (Linux, via ctypes). fs_glob and fs_find read directory
+entries from the index instead of the disk; directories it doesn't hold
+(pruned ones, paths outside the roots) fall back to os.scandir.
+
+The tree is nested dicts keyed by interned names: a directory is a _Dir, a
+file or symlink is a (size, mtime_ns) tuple, so memory grows with the number
+of entries and not with path lengths. Where inotify is unavailable, the watch
+limit (fs.inotify.max_user_watches) is hit or the event queue overflows, the
+index drops its watches and rebuilds by rescanning every
+index.rescan_interval_s instead.
+"""
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_EXCL_UNLINK = 0x04000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_EXCL_UNLINK
+)
+_EVENT = struct.Struct("iIII")
+
+
+class _Dir:
+    __slots__ = ("entries", "wd")
+
+    def __init__(self) -> None:
+        self.entries: Dict[str, object] = {}
+        self.wd = -1
+
+
+# Placeholder for a directory that is listed but never descended (prune list).
+_PRUNED = object()
+
+
+class _WatchLimit(Exception):
+    pass
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+        self._ctypes = ctypes
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add(self, path: str) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _MASK)
+        if wd < 0:
+            err = self._ctypes.get_errno()
+            if err == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                raise _WatchLimit()
+            return -1  # vanished or unreadable; its parent's events still cover it
+        return wd
+
+    def remove(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return []
+        events, off = [], 0
+        while off + _EVENT.size <= len(buf):
+            wd, mask, _, n = _EVENT.unpack_from(buf, off)
+            off += _EVENT.size
+            name = os.fsdecode(buf[off:off + n].split(b"\0", 1)[0])
+            off += n
+            events.append((wd, mask, name))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class FileIndex:
+    def __init__(self, roots: Iterable[str], prune: Optional[Iterable[str]] = None, rescan_interval_s: float = 300.0) -> None:
+        from mcp_local.walk import DEFAULT_PRUNE
+
+        # Nested roots would be indexed (and watched) twice; keep the outermost.
+        absroots = sorted({os.path.abspath(os.path.expanduser(r)).rstrip(os.sep) or os.sep for r in roots})
+        self.roots: List[str] = []
+        for r in absroots:
+            if not any(r == o or r.startswith(o.rstrip(os.sep) + os.sep) for o in self.roots):
+                self.roots.append(r)
+        self.prune = DEFAULT_PRUNE if prune is None else frozenset(prune)
+        self.rescan_interval_s = float(rescan_interval_s)
+        self.ready = threading.Event()
+        self.mode = "starting"
+        self.scans = 0
+        self.last_scan_s = 0.0
+        self._lock = threading.RLock()
+        self._trees: Dict[str, _Dir] = {}
+        self._wds: Dict[int, Tuple[_Dir, str]] = {}
+        self._ino: Optional[_Inotify] = None
+        self._use_inotify = True  # cleared for good once inotify fails or runs out of watches
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- queries -----------------------------------------------------------
+
+    def _node(self, path: str) -> Optional[_Dir]:
+        # Caller holds self._lock.
+        path = os.path.abspath(path)
+        for root, tree in self._trees.items():
+            if path == root:
+                return tree
+            if path.startswith(root.rstrip(os.sep) + os.sep):
+                node: object = tree
+                for part in path[len(root.rstrip(os.sep)) + 1:].split(os.sep):
+                    node = node.entries.get(part) if isinstance(node, _Dir) else None
+                return node if isinstance(node, _Dir) else None
+        return None
+
+    def listdir(self, path: str) -> Optional[List[Tuple[str, bool]]]:
+        """(name, is_dir) pairs for an indexed directory, else None."""
+        if not self.ready.is_set():
+            return None
+        with self._lock:
+            node = self._node(path)
+            if node is None:
+                return None
+            return [(name, v is _PRUNED or isinstance(v, _Dir)) for name, v in node.entries.items()]
+
+    def stat(self, path: str) -> Optional[Tuple[int, int]]:
+        """(size, mtime_ns) of an indexed file, else None."""
+        head, name = os.path.split(os.path.abspath(path))
+        with self._lock:
+            node = self._node(head)
+            v = node.entries.get(name) if node is not None else None
+        return v if isinstance(v, tuple) else None
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = dirs = 0
+            stack = list(self._trees.values())
+            while stack:
+                for v in stack.pop().entries.values():
+                    if isinstance(v, _Dir):
+                        dirs += 1
+                        stack.append(v)
+                    elif v is _PRUNED:
+                        dirs += 1
+                    else:
+                        files += 1
+            return {
+                "mode": self.mode,
+                "ready": self.ready.is_set(),
+                "roots": len(self.roots),
+                "files": files,
+                "dirs": dirs,
+                "watches": len(self._wds),
+                "scans": self.scans,
+                "last_scan_s": round(self.last_scan_s, 3),
+            }
+
+    # --- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="mcp-index", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        self._rebuild()
+        while not self._stop.is_set():
+            if self._ino is None:
+                if self._stop.wait(self.rescan_interval_s):
+                    break
+                self._rebuild()
+                continue
+            try:
+                events = self._ino.read(1.0)
+            except OSError:
+                events = [(-1, IN_Q_OVERFLOW, "")]
+            if events:
+                self._apply(events)
+        self._close_watches()
+
+    def _close_watches(self) -> None:
+        with self._lock:
+            self._wds.clear()
+        if self._ino is not None:
+            try:
+                self._ino.close()
+            except OSError:
+                pass
+            self._ino = None
+
+    def _rebuild(self) -> None:
+        start = time.perf_counter()
+        # Start from a fresh inotify instance so no stale watch survives.
+        self._close_watches()
+        if self._use_inotify:
+            try:
+                self._ino = _Inotify()
+            except OSError:
+                self._use_inotify = False
+        wds: Dict[int, Tuple[_Dir, str]] = {}
+        trees = {}
+        try:
+            for root in self.roots:
+                trees[root] = self._scan(root, wds)
+        except _WatchLimit:
+            sys.stderr.write(
+                "local-mcp: inotify watch limit reached; index falls back to rescanning "
+                f"every {self.rescan_interval_s:g}s (raise fs.inotify.max_user_watches)\n"
+            )
+            self._use_inotify = False
+            self._close_watches()
+            wds = {}
+            trees = {root: self._scan(root, None) for root in self.roots}
+        with self._lock:
+            self._trees = trees
+            self._wds = wds
+            self.mode = "inotify" if self._ino is not None else "rescan"
+            self.scans += 1
+            self.last_scan_s = time.perf_counter() - start
+        self.ready.set()
+
+    def _scan(self, path: str, wds: Optional[Dict[int, Tuple[_Dir, str]]]) -> _Dir:
+        """Index the tree at path; with wds, watch each directory before listing it."""
+        node = _Dir()
+        stack = [(path, node)]
+        while stack:
+            dirpath, d = stack.pop()
+            if wds is not None and self._ino is not None:
+                d.wd = self._ino.add(dirpath)
+                if d.wd >= 0:
+                    wds[d.wd] = (d, dirpath)
+            try:
+                it = os.scandir(dirpath)
+            except OSError:
+                continue
+            with it:
+                for e in it:
+                    name = sys.intern(e.name)
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if name in self.prune:
+                                d.entries[name] = _PRUNED
+                            else:
+                                child = d.entries[name] = _Dir()
+                                stack.append((e.path, child))
+                            continue
+                        st = e.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    d.entries[name] = (st.st_size, st.st_mtime_ns)
+        return node
+
+    # --- events ------------------------------------------------------------
+
+    def _apply(self, events: List[Tuple[int, int, str]]) -> None:
+        if any(mask & IN_Q_OVERFLOW for _, mask, _ in events):
+            self._rebuild()  # events were lost; only a rescan is trustworthy
+            return
+        try:
+            with self._lock:
+                for wd, mask, name in events:
+                    watched = self._wds.get(wd)
+                    if watched is None:
+                        continue
+                    node, dirpath = watched
+                    if mask & IN_IGNORED:
+                        del self._wds[wd]
+                        continue
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        if dirpath in self._trees:
+                            node.entries.clear()  # a root itself went away
+                        continue
+                    if not name:
+                        continue
+                    name = sys.intern(name)
+                    if mask & (IN_DELETE | IN_MOVED_FROM):
+                        self._drop(node, name)
+                    if mask & (IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE | IN_ATTRIB):
+                        self._refresh(node, dirpath, name)
+        except _WatchLimit:
+            self._use_inotify = False
+            self._rebuild()
+
+    def _drop(self, node: _Dir, name: str) -> None:
+        # Caller holds self._lock. Moves are handled as drop + re-scan.
+        child = node.entries.pop(name, None)
+        stack = [child] if isinstance(child, _Dir) else []
+        while stack:
+            d = stack.pop()
+            if d.wd >= 0 and self._wds.pop(d.wd, None) is not None and self._ino is not None:
+                self._ino.remove(d.wd)
+            stack.extend(v for v in d.entries.values() if isinstance(v, _Dir))
+
+    def _refresh(self, node: _Dir, dirpath: str, name: str) -> None:
+        # Caller holds self._lock.
+        path = os.path.join(dirpath, name)
+        try:
+            st = os.lstat(path)
+        except OSError:
+            self._drop(node, name)
+            return
+        if not os.path.isdir(path) or os.path.islink(path):
+            if isinstance(node.entries.get(name), _Dir):
+                self._drop(node, name)
+            node.entries[name] = (st.st_size, st.st_mtime_ns)
+        elif name in self.prune:
+            node.entries[name] = _PRUNED
+        elif not isinstance(node.entries.get(name), _Dir):
+            node.entries[name] = self._scan(path, self._wds if self._ino is not None else None)
+
+
+_INDEX: Optional[FileIndex] = None
+_SETTINGS: Optional[tuple] = None
+_LOCK = threading.Lock()
+
+
+def stats() -> Optional[dict]:
+    idx = _INDEX
+    return idx.stats() if idx is not None else None
+
+
+def current() -> Optional[FileIndex]:
+    """The running index once its first scan finished, else None."""
+    idx = _INDEX
+    return idx if idx is not None and idx.ready.is_set() else None
+
+
+def configure(config: dict) -> None:
+    """Start, replace or stop the index to match config (index.*, allowed_roots, fs.prune_dirs)."""
+    global _INDEX, _SETTINGS
+    icfg = config.get("index", {})
+    settings = (
+        tuple(config.get("allowed_roots", [])),
+        tuple(config.get("fs", {}).get("prune_dirs") or ()) or None,
+        float(icfg.get("rescan_interval_s", 300)),
+    )
+    with _LOCK:
+        if not icfg.get("enabled"):
+            if _INDEX is not None:
+                _INDEX.stop()
+            _INDEX = _SETTINGS = None
+            return
+        if _INDEX is not None and settings == _SETTINGS:
+            return
+        if _INDEX is not None:
+            _INDEX.stop()
+        _INDEX = FileIndex(settings[0], settings[1], settings[2])
+        _SETTINGS = settings
+        _INDEX.start()
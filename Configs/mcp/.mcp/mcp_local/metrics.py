@@ -0,0 +1,166 @@
+"""
+Per-tool call metrics: counts, errors, bytes returned and a latency histogram.
+
+Percentiles are estimated from fixed histogram buckets (linear interpolation
+inside the bucket), the same way Prometheus' histogram_quantile does, so the
+server_stats numbers and the exported textfile agree.
+"""
+import bisect
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# Upper bounds in milliseconds; a final implicit +Inf bucket follows.
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "cancelled", "bytes_out", "sum_ms", "max_ms", "buckets")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.bytes_out = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def quantile(self, q: float) -> float:
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                if i == len(BUCKETS_MS):
+                    return self.max_ms
+                lo = BUCKETS_MS[i - 1] if i else 0.0
+                hi = min(BUCKETS_MS[i], self.max_ms)
+                return lo + (max(hi, lo) - lo) * (rank - seen) / n
+            seen += n
+        return self.max_ms
+
+
+class Metrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._started = time.time()
+        self._exporter: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def record(self, tool: str, seconds: float, nbytes: int = 0, error: bool = False, cancelled: bool = False) -> None:
+        ms = seconds * 1000.0
+        with self._lock:
+            st = self._tools.get(tool)
+            if st is None:
+                st = self._tools[tool] = _ToolStats()
+            st.calls += 1
+            st.errors += bool(error)
+            st.cancelled += bool(cancelled)
+            st.bytes_out += nbytes
+            st.sum_ms += ms
+            st.max_ms = max(st.max_ms, ms)
+            st.buckets[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {}
+            for name, st in sorted(self._tools.items()):
+                tools[name] = {
+                    "calls": st.calls,
+                    "errors": st.errors,
+                    "cancelled": st.cancelled,
+                    "bytes_out": st.bytes_out,
+                    "mean_ms": round(st.sum_ms / st.calls, 3) if st.calls else 0.0,
+                    "p50_ms": round(st.quantile(0.50), 3),
+                    "p95_ms": round(st.quantile(0.95), 3),
+                    "p99_ms": round(st.quantile(0.99), 3),
+                    "max_ms": round(st.max_ms, 3),
+                }
+        uptime = time.time() - self._started
+        total = sum(t["calls"] for t in tools.values())
+        return {
+            "uptime_s": round(uptime, 1),
+            "calls": total,
+            "calls_per_s": round(total / uptime, 3) if uptime > 0 else 0.0,
+            "tools": tools,
+        }
+
+    def prometheus_text(self) -> str:
+        out = [
+            "# HELP local_mcp_tool_calls_total Tool calls handled.",
+            "# TYPE local_mcp_tool_calls_total counter",
+        ]
+        with self._lock:
+            items = sorted(self._tools.items())
+            for name, st in items:
+                out.append(f'local_mcp_tool_calls_total{{tool="{name}"}} {st.calls}')
+            out += [
+                "# HELP local_mcp_tool_errors_total Tool calls that returned an error.",
+                "# TYPE local_mcp_tool_errors_total counter",
+            ]
+            for name, st in items:
+                out.append(f'local_mcp_tool_errors_total{{tool="{name}"}} {st.errors}')
+            out += [
+                "# HELP local_mcp_tool_cancelled_total Tool calls cancelled by the client.",
+                "# TYPE local_mcp_tool_cancelled_total counter",
+            ]
+            for name, st in items:
+                out.append(f'local_mcp_tool_cancelled_total{{tool="{name}"}} {st.cancelled}')
+            out += [
+                "# HELP local_mcp_tool_response_bytes_total UTF-8 bytes returned by tools.",
+                "# TYPE local_mcp_tool_response_bytes_total counter",
+            ]
+            for name, st in items:
+                out.append(f'local_mcp_tool_response_bytes_total{{tool="{name}"}} {st.bytes_out}')
+            out += [
+                "# HELP local_mcp_tool_latency_seconds Tool call latency.",
+                "# TYPE local_mcp_tool_latency_seconds histogram",
+            ]
+            for name, st in items:
+                cum = 0
+                for bound, n in zip(BUCKETS_MS, st.buckets):
+                    cum += n
+                    out.append(f'local_mcp_tool_latency_seconds_bucket{{tool="{name}",le="{bound / 1000:g}"}} {cum}')
+                out.append(f'local_mcp_tool_latency_seconds_bucket{{tool="{name}",le="+Inf"}} {st.calls}')
+                out.append(f'local_mcp_tool_latency_seconds_sum{{tool="{name}"}} {st.sum_ms / 1000:.6f}')
+                out.append(f'local_mcp_tool_latency_seconds_count{{tool="{name}"}} {st.calls}')
+        return "\n".join(out) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        # node_exporter's textfile collector may read at any time: write + rename.
+        path = os.path.expanduser(path)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+    def start_textfile_exporter(self, path: str, interval_s: float = 15.0) -> None:
+        if self._exporter is not None:
+            return
+        stop = self._stop = threading.Event()
+
+        def loop() -> None:
+            while not stop.wait(interval_s):
+                try:
+                    self.write_textfile(path)
+                except OSError:
+                    pass
+
+        self._exporter = threading.Thread(target=loop, name="mcp-metrics", daemon=True)
+        self._exporter.start()
+
+    def stop_exporter(self, path: Optional[str] = None) -> None:
+        self._stop.set()
+        self._exporter = None
+        if path:
+            try:
+                self.write_textfile(path)
+            except OSError:
+                pass
+
+
+METRICS = Metrics()
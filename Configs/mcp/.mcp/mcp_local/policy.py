@@ -1,4 +1,4 @@
-import os, pathlib, re
+import functools, os, pathlib, re
 
 SQL_DDL_RE = re.compile(r"\b(CREATE|ALTER|DROP)\b", re.IGNORECASE)
 SQL_TRUNC_RE = re.compile(r"\bTRUNCATE\b", re.IGNORECASE)
@@ -11,11 +11,66 @@ SQL_WHERE_RE = re.compile(r"\bWHERE\b", re.IGNORECASE)
 def _real(p: str) -> str:
     return str(pathlib.Path(p).expanduser().resolve())
 
+class PathPolicy:
+    """
+    allowed_roots compiled once: roots are resolved up front into a set, and a
+    candidate is allowed when it or one of its ancestors is in the set (O(depth)
+    lookups instead of a scan over every root).
+
+    Candidates are fully resolved with realpath on every check, exactly as
+    _real() does; nothing about the filesystem is cached, so a directory
+    swapped for a symlink between checks is seen by the next one.
+    """
+
+    def __init__(self, allowed_roots: list[str]):
+        self.roots = frozenset(_real(r) for r in allowed_roots)
+
+    def resolve(self, path: str) -> str:
+        return _real(path)
+
+    def allows(self, real: str) -> bool:
+        if real in self.roots:
+            return True
+        p = os.path.dirname(real)
+        while True:
+            # Mirrors the old startswith(root + os.sep) test, under which a
+            # root of "/" only admits "/" itself.
+            if p in self.roots and p != os.sep:
+                return True
+            parent = os.path.dirname(p)
+            if parent == p:
+                return False
+            p = parent
+
+    def check(self, path: str) -> str:
+        """Resolve path and return it, or raise PermissionError."""
+        rp = self.resolve(path)
+        if not self.allows(rp):
+            raise PermissionError(f"Path not allowed: {rp}")
+        return rp
+
+    def check_many(self, paths: list[str]) -> list[str]:
+        """check() every path (each resolved once); raises on the first denial."""
+        return [self.check(p) for p in paths]
+
+    def partition(self, paths: list[str]) -> tuple[list[str], list[str]]:
+        """Split paths into (allowed resolved paths, denied resolved paths)."""
+        ok, denied = [], []
+        for p in paths:
+            rp = self.resolve(p)
+            (ok if self.allows(rp) else denied).append(rp)
+        return ok, denied
+
+@functools.lru_cache(maxsize=8)
+def _compiled(roots: tuple[str, ...]) -> PathPolicy:
+    return PathPolicy(list(roots))
+
+def path_policy(allowed_roots: list[str]) -> PathPolicy:
+    """The compiled policy for these roots; built once per distinct root list."""
+    return _compiled(tuple(allowed_roots))
+
 def ensure_path_allowed(path: str, allowed_roots: list[str]) -> None:
-    rp = _real(path)
-    roots = [_real(r) for r in allowed_roots]
-    if not any(rp == r or rp.startswith(r + os.sep) for r in roots):
-        raise PermissionError(f"Path not allowed: {rp}")
+    path_policy(allowed_roots).check(path)
 
 def split_single_statement(sql: str, allow_multi: bool) -> str:
     # Simple guard: disallow multi-statement unless explicitly allowed.
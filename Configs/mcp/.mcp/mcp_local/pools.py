@@ -0,0 +1,52 @@
+"""
+Module-level executors that tools share across calls.
+
+The worker count comes from config and can change on reload. A call takes
+the pool with use() and keeps that same executor until it is done; a resize
+installs a new executor for later calls, and the old one is shut down once
+its last user has left, so no caller ever submits to a shut-down pool.
+"""
+import threading
+from concurrent.futures import Executor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional
+
+
+class SharedPool:
+    def __init__(self, factory: Callable[[int], Executor]) -> None:
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._pool: Optional[Executor] = None
+        self._size = 0
+        self._users: Dict[Executor, int] = {}
+
+    def _retire(self, pool: Executor) -> None:
+        # Caller holds self._lock.
+        if self._pool is pool:
+            self._pool = None
+        if not self._users.get(pool):
+            self._users.pop(pool, None)
+            pool.shutdown(wait=False)
+
+    @contextmanager
+    def use(self, workers: int) -> Iterator[Executor]:
+        """The current executor with `workers` workers, held for the block."""
+        with self._lock:
+            if self._pool is None or self._size != workers:
+                if self._pool is not None:
+                    self._retire(self._pool)
+                self._pool, self._size = self._factory(workers), workers
+            pool = self._pool
+            self._users[pool] = self._users.get(pool, 0) + 1
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                self._users[pool] -= 1
+                if self._pool is not pool:
+                    self._retire(pool)
+
+    def discard(self, pool: Executor) -> None:
+        """Stop handing out pool (e.g. it broke); it is shut down once unused."""
+        with self._lock:
+            self._retire(pool)
@@ -0,0 +1,666 @@
+"""
+Declarative tool registry.
+
+Each ToolSpec carries its JSON schema, an argument coercion step (which also
+applies path/SQL policy) and the dotted location of its handler. Handler
+modules are imported on first call, so starting the server and answering
+initialize/tools/list never imports the tool implementations.
+"""
+import importlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from mcp_local.policy import (
+    path_policy,
+    check_sql_write_policy,
+    split_single_statement,
+)
+
+# Tool modules replaced by mcp_local.fakes (replay runs without Postgres/SSH).
+_FAKES = frozenset(
+    m.strip() for m in os.environ.get("LOCAL_MCP_FAKE_TOOLS", "").split(",") if m.strip()
+)
+
+# coerce(args, config) -> (positional args, keyword args) for the handler.
+Coerce = Callable[[Dict[str, Any], dict], Tuple[tuple, Dict[str, Any]]]
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    name: str
+    description: str
+    schema: Dict[str, Any]
+    module: str  # module under mcp_local.tools
+    func: str
+    coerce: Coerce
+
+    def handler(self) -> Callable[..., str]:
+        package = "mcp_local.fakes" if self.module in _FAKES else "mcp_local.tools"
+        mod = importlib.import_module(f"{package}.{self.module}")
+        return getattr(mod, self.func)
+
+    def call(self, args: Dict[str, Any], config: dict) -> str:
+        pos, kw = self.coerce(args, config)
+        return self.handler()(*pos, **kw)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "inputSchema": self.schema,
+        }
+
+
+def _schema(required: List[str], **props: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "object", "properties": props, "required": required}
+
+
+_STR = {"type": "string"}
+_BOOL = {"type": "boolean"}
+_ARGV = {"type": "array", "items": {"type": "string"}}
+_RANGE = {
+    "offset": {"type": "integer"},
+    "length": {"type": "integer", "minimum": 0},
+    "line_start": {"type": "integer"},
+    "line_count": {"type": "integer", "minimum": 0},
+    "max_bytes": {"type": "integer", "minimum": 1},
+}
+
+
+def _allowed(args: Dict[str, Any], config: dict, key: str) -> str:
+    path = args[key]
+    path_policy(config.get("allowed_roots", [])).check(path)
+    return path
+
+
+# --- argument coercion -----------------------------------------------------
+
+def _c_path(args, config):
+    return (_allowed(args, config, "path"),), {}
+
+
+_RANGE_KEYS = ("offset", "length", "line_start", "line_count", "max_bytes")
+
+
+def _ranges(args: Dict[str, Any]) -> Dict[str, int]:
+    return {k: int(args[k]) for k in _RANGE_KEYS if args.get(k) is not None}
+
+
+def _c_fs_read(args, config):
+    return (_allowed(args, config, "path"),), _ranges(args)
+
+
+def _c_fs_read_many(args, config):
+    # Denied paths become per-file errors instead of failing the whole call.
+    policy = path_policy(config.get("allowed_roots", []))
+    files = []
+    for item in args["files"]:
+        item = {"path": item} if isinstance(item, str) else item
+        path = item["path"]
+        rp = policy.resolve(path)
+        err = None if policy.allows(rp) else f"Path not allowed: {rp}"
+        files.append((path, _ranges(item), err))
+    fs = config.get("fs", {})
+    return (files,), {
+        "max_total_bytes": int(args.get("max_total_bytes", fs.get("read_many_max_bytes", 4 << 20))),
+        "workers": int(fs.get("read_many_workers", 8)),
+    }
+
+
+def _c_fs_list(args, config):
+    return (_allowed(args, config, "path"),), {
+        "details": bool(args.get("details", False)),
+        "depth": int(args.get("depth", 1)),
+        "limit": int(args.get("limit", 1000)),
+        "cursor": args.get("cursor") or None,
+    }
+
+
+def _c_fs_find(args, config):
+    roots = [_allowed(args, config, "root")] if args.get("root") else list(config.get("allowed_roots", []))
+    return (roots, args["query"]), {
+        "kind": args.get("kind"),
+        "max_results": int(args.get("max_results", 200)),
+        "prune": config.get("fs", {}).get("prune_dirs"),
+    }
+
+
+def _c_fs_hash(args, config):
+    # Individual files are checked (with per-file errors) in the handler.
+    fs = config.get("fs", {})
+    root = _allowed(args, config, "root") if args.get("root") else None
+    return (path_policy(config.get("allowed_roots", [])),), {
+        "paths": args.get("paths"),
+        "root": root,
+        "pattern": args.get("pattern", "**/*"),
+        "algorithm": args.get("algorithm", "blake2b"),
+        "max_files": int(args.get("max_files", 10000)),
+        "cache_path": fs.get("hash_cache", "~/.cache/local-mcp/hashes.sqlite"),
+        "workers": int(fs.get("hash_workers", 4)),
+        "prune": fs.get("prune_dirs"),
+    }
+
+
+def _c_fs_write(args, config):
+    return (_allowed(args, config, "path"), args["content"]), {"append": bool(args.get("append", False))}
+
+
+def _c_fs_edit(args, config):
+    return (_allowed(args, config, "path"),), {"edits": args.get("edits"), "patch": args.get("patch")}
+
+
+def _c_fs_glob(args, config):
+    return (_allowed(args, config, "root"), args["pattern"]), {
+        "max_results": int(args.get("max_results", 1000)),
+        "sort": bool(args.get("sort", True)),
+        "gitignore": bool(args.get("gitignore", True)),
+        "prune": config.get("fs", {}).get("prune_dirs"),
+    }
+
+
+def _c_repo(args, config):
+    return (_allowed(args, config, "repo"),), {}
+
+
+def _c_git_diff(args, config):
+    return (_allowed(args, config, "repo"),), {"staged": bool(args.get("staged", False))}
+
+
+def _c_git_log(args, config):
+    return (_allowed(args, config, "repo"),), {"n": int(args.get("n", 20))}
+
+
+def _c_git_checkout(args, config):
+    return (_allowed(args, config, "repo"), args["branch"]), {}
+
+
+def _c_git_commit(args, config):
+    return (_allowed(args, config, "repo"), args["message"]), {}
+
+
+def _c_git_show(args, config):
+    return (_allowed(args, config, "repo"),), {
+        "path": args.get("path", ""),
+        "rev": args.get("rev", "HEAD"),
+        "max_bytes": int(args.get("max_bytes", 1 << 20)),
+        "idle_s": float(config.get("git", {}).get("cat_file_idle_s", 300)),
+    }
+
+
+def _c_git_ls_tree(args, config):
+    return (_allowed(args, config, "repo"),), {
+        "path": args.get("path", ""),
+        "rev": args.get("rev", "HEAD"),
+        "recursive": bool(args.get("recursive", False)),
+        "max_entries": int(args.get("max_entries", 5000)),
+        "idle_s": float(config.get("git", {}).get("cat_file_idle_s", 300)),
+    }
+
+
+def _c_git_status_many(args, config):
+    git = config.get("git", {})
+    return (_allowed(args, config, "root"),), {
+        "max_depth": int(args.get("max_depth", 3)),
+        "max_repos": int(args.get("max_repos", 500)),
+        "workers": int(git.get("status_workers", 8)),
+        "untracked_cache": bool(git.get("status_untracked_cache", True)),
+        "fsmonitor": bool(git.get("status_fsmonitor", False)),
+        "prune": config.get("fs", {}).get("prune_dirs"),
+    }
+
+
+def _c_rg_search(args, config):
+    roots = args.get("roots") or ([args["root"]] if args.get("root") else [])
+    if not roots:
+        raise ValueError("Pass root or roots")
+    policy = path_policy(config.get("allowed_roots", []))
+    for r in roots:
+        policy.check(r)
+    query = args.get("queries") or args.get("query")
+    if not query:
+        raise ValueError("Pass query or queries")
+    glob, context = args.get("glob"), int(args.get("context", 0))
+    return (roots, query), {
+        "glob": [glob] if isinstance(glob, str) else glob,
+        "max_results": int(args.get("max_results", 200)),
+        "max_count": int(args["max_count"]) if args.get("max_count") else None,
+        "case": args.get("case", "sensitive"),
+        "word": bool(args.get("word", False)),
+        "fixed_strings": bool(args.get("fixed_strings", False)),
+        "before": int(args.get("before", context)),
+        "after": int(args.get("after", context)),
+        "sort": bool(args.get("sort", False)),
+    }
+
+
+def _c_index_search(args, config):
+    tri, mg = config.get("trigram", {}), config.get("mgrep", {})
+    return (path_policy(config.get("allowed_roots", [])), _allowed(args, config, "root"), args["query"]), {
+        "mode": args.get("mode", "literal"),
+        "ignore_case": bool(args.get("ignore_case", False)),
+        "glob": args.get("glob"),
+        "max_results": int(args.get("max_results", 200)),
+        "refresh": bool(args.get("refresh", False)),
+        "index_dir": tri.get("dir") or "~/.cache/local-mcp/trigram",
+        "max_file_bytes": int(tri.get("max_file_bytes", 4 << 20)),
+        "prune": config.get("fs", {}).get("prune_dirs"),
+        "min_probability": float(args.get("min_probability", 0.5)),
+        "workers": int(mg.get("workers", 4)),
+        "time_budget_s": float(args.get("time_budget_s", mg.get("time_budget_s", 30))),
+    }
+
+
+def _c_bm25_search(args, config):
+    b25 = config.get("bm25", {})
+    return (path_policy(config.get("allowed_roots", [])), _allowed(args, config, "root"), args["query"]), {
+        "max_results": int(args.get("max_results", 20)),
+        "glob": args.get("glob"),
+        "refresh": bool(args.get("refresh", False)),
+        "index_dir": b25.get("dir") or "~/.cache/local-mcp/bm25",
+        "max_file_bytes": int(b25.get("max_file_bytes", 1 << 20)),
+        "chunk_lines": int(b25.get("chunk_lines", 40)),
+        "max_age_s": float(b25.get("max_age_s", 300)),
+        "prune": config.get("fs", {}).get("prune_dirs"),
+        "snippet_lines": int(args.get("snippet_lines", 6)),
+    }
+
+
+def _c_mgrep_search(args, config):
+    kw = {
+        "min_probability": float(args.get("min_probability", 0.5)),
+        "max_results": int(args.get("max_results", 20)),
+    }
+    if bool(args.get("path")) == bool(args.get("root")):
+        raise ValueError("Pass exactly one of path or root")
+    if args.get("path"):
+        kw["path"] = _allowed(args, config, "path")
+    else:
+        mg = config.get("mgrep", {})
+        kw.update(
+            root=_allowed(args, config, "root"),
+            include=args.get("include"),
+            exclude=args.get("exclude"),
+            time_budget_s=float(args.get("time_budget_s", mg.get("time_budget_s", 30))),
+            workers=int(mg.get("workers", 4)),
+            max_files=int(mg.get("max_files", 20000)),
+            max_file_bytes=int(mg.get("max_file_bytes", 8 << 20)),
+            prune=config.get("fs", {}).get("prune_dirs"),
+        )
+    query = args.get("queries") or args.get("query")
+    if not query:
+        raise ValueError("Pass query or queries")
+    return (path_policy(config.get("allowed_roots", [])), query), kw
+
+
+def _c_pg_query(args, config):
+    return (config, args["conn"], args["sql"]), {"limit": int(args.get("limit", 2000))}
+
+
+def _c_pg_exec(args, config):
+    write_policy = config.get("postgres", {}).get("write_policy", {})
+    sql = split_single_statement(
+        args["sql"],
+        allow_multi=bool(write_policy.get("allow_multi_statement", False)),
+    )
+    check_sql_write_policy(sql, write_policy)
+    return (config, args["conn"], sql), {}
+
+
+def _c_nerdctl(args, config):
+    return (config, args["args"]), {"host": args.get("host")}
+
+
+def _c_nerdctl_local(args, config):
+    return (config, args["args"]), {}
+
+
+def _c_nerdctl_ssh(args, config):
+    return (config, args["host"], args["args"]), {}
+
+
+def _c_server_stats(args, config):
+    return (), {"fmt": args.get("format", "json")}
+
+
+TOOLS: Dict[str, ToolSpec] = {
+    spec.name: spec
+    for spec in [
+        # Filesystem
+        ToolSpec(
+            "fs_read",
+            "Read a text file (restricted to allowed_roots). Optionally a byte range "
+            "(offset/length; negative offset counts from the end) or a line range "
+            "(line_start is 1-based, negative counts from the end; line_count), "
+            "capped at max_bytes.",
+            _schema(["path"], path=_STR, **_RANGE),
+            "fs_tools", "read_text", _c_fs_read,
+        ),
+        ToolSpec(
+            "fs_read_many",
+            "Read many files in one call (restricted to allowed_roots). Each entry is a path or "
+            "{path, offset/length or line_start/line_count, max_bytes}. Returns JSON with per-file "
+            "text or error, in request order, within a total max_total_bytes budget.",
+            _schema(
+                ["files"],
+                files={
+                    "type": "array",
+                    "minItems": 1,
+                    "maxItems": 500,
+                    "items": {
+                        "anyOf": [
+                            _STR,
+                            _schema(["path"], path=_STR, **_RANGE),
+                        ]
+                    },
+                },
+                max_total_bytes={"type": "integer", "minimum": 1},
+            ),
+            "fs_tools", "read_many", _c_fs_read_many,
+        ),
+        ToolSpec(
+            "fs_write",
+            "Write a text file (restricted to allowed_roots). Replaces the file atomically "
+            "(temp file + fsync + rename); append=true appends instead.",
+            _schema(["path", "content"], path=_STR, content=_STR, append=_BOOL),
+            "fs_tools", "write_text", _c_fs_write,
+        ),
+        ToolSpec(
+            "fs_edit",
+            "Edit a text file in place without resending it (restricted to allowed_roots). Pass "
+            "either edits (exact old->new replacements, applied in order; old must be unique "
+            "unless replace_all) or patch (a unified diff for this file). Written atomically.",
+            _schema(
+                ["path"],
+                path=_STR,
+                edits={
+                    "type": "array",
+                    "minItems": 1,
+                    "items": _schema(["old", "new"], old=_STR, new=_STR, replace_all=_BOOL),
+                },
+                patch=_STR,
+            ),
+            "fs_tools", "edit_text", _c_fs_edit,
+        ),
+        ToolSpec(
+            "fs_list",
+            "List directory entries (restricted to allowed_roots) as kind<TAB>name lines. "
+            "details adds size and UTC mtime columns and symlink targets; depth > 1 recurses "
+            "(names become relative paths). At most limit entries per call; pass the returned "
+            "cursor to get the next page.",
+            _schema(
+                ["path"],
+                path=_STR,
+                details=_BOOL,
+                depth={"type": "integer", "minimum": 1, "maximum": 32},
+                limit={"type": "integer", "minimum": 1, "maximum": 100000},
+                cursor=_STR,
+            ),
+            "fs_tools", "list_dir", _c_fs_list,
+        ),
+        ToolSpec(
+            "fs_glob",
+            "Glob files under an allowed root (restricted). ** spans directories; .git, "
+            "node_modules, .venv and similar are skipped and .gitignore is honoured unless "
+            "gitignore=false. Stops after max_results; sort=false returns matches in walk order.",
+            _schema(
+                ["root", "pattern"],
+                root=_STR,
+                pattern=_STR,
+                max_results={"type": "integer", "minimum": 1, "maximum": 100000},
+                sort=_BOOL,
+                gitignore=_BOOL,
+            ),
+            "fs_tools", "glob_files", _c_fs_glob,
+        ),
+        ToolSpec(
+            "fs_find",
+            "Find files/directories by name under an allowed root (default: all roots). query is a "
+            "case-insensitive substring, or a glob on the name if it contains * ? [. Served from the "
+            "in-memory index when index.enabled.",
+            _schema(
+                ["query"],
+                query=_STR,
+                root=_STR,
+                kind={"type": "string", "enum": ["file", "dir"]},
+                max_results={"type": "integer", "minimum": 1, "maximum": 100000},
+            ),
+            "fs_tools", "find_files", _c_fs_find,
+        ),
+        ToolSpec(
+            "fs_hash",
+            "BLAKE2 content hashes of files (paths) or of every file under root matching pattern "
+            "(default **/*). Returns JSON {algorithm, files: {path: hexdigest or {error}}, hashed, "
+            "cached, truncated}: hashed/cached count files read vs answered from a persistent "
+            "cache keyed by dev/inode/size/mtime; truncated means max_files was reached.",
+            _schema(
+                [],
+                paths={"type": "array", "items": _STR, "minItems": 1},
+                root=_STR,
+                pattern=_STR,
+                algorithm={"type": "string", "enum": ["blake2b", "blake2s"]},
+                max_files={"type": "integer", "minimum": 1, "maximum": 200000},
+            ),
+            "hash_tools", "hash_paths", _c_fs_hash,
+        ),
+        # Git
+        ToolSpec(
+            "git_status",
+            "git status --porcelain in a repo.",
+            _schema(["repo"], repo=_STR),
+            "git_tools", "status", _c_repo,
+        ),
+        ToolSpec(
+            "git_diff",
+            "git diff (optionally staged).",
+            _schema(["repo"], repo=_STR, staged=_BOOL),
+            "git_tools", "diff", _c_git_diff,
+        ),
+        ToolSpec(
+            "git_log",
+            "git log --oneline (n entries).",
+            _schema(
+                ["repo"],
+                repo=_STR,
+                n={"type": "integer", "minimum": 1, "maximum": 200},
+            ),
+            "git_tools", "log", _c_git_log,
+        ),
+        ToolSpec(
+            "git_checkout",
+            "git checkout <branch>.",
+            _schema(["repo", "branch"], repo=_STR, branch=_STR),
+            "git_tools", "checkout", _c_git_checkout,
+        ),
+        ToolSpec(
+            "git_commit",
+            "git commit -am <message> (only tracked changes).",
+            _schema(["repo", "message"], repo=_STR, message=_STR),
+            "git_tools", "commit_am", _c_git_commit,
+        ),
+        ToolSpec(
+            "git_show",
+            "A file's content at a revision (path relative to the repo root) without checking "
+            "it out; without path, the commit or tag object itself.",
+            _schema(
+                ["repo"],
+                repo=_STR,
+                path=_STR,
+                rev=_STR,
+                max_bytes={"type": "integer", "minimum": 1, "maximum": 64 << 20},
+            ),
+            "git_tools", "show", _c_git_show,
+        ),
+        ToolSpec(
+            "git_ls_tree",
+            "git ls-tree of a directory at a revision (path relative to the repo root); "
+            "recursive=true lists every file below it.",
+            _schema(
+                ["repo"],
+                repo=_STR,
+                path=_STR,
+                rev=_STR,
+                recursive=_BOOL,
+                max_entries={"type": "integer", "minimum": 1, "maximum": 200000},
+            ),
+            "git_tools", "ls_tree", _c_git_ls_tree,
+        ),
+        ToolSpec(
+            "git_status_many",
+            "git status of every repository under root (up to max_depth directories down; "
+            "repos nested inside another repo are skipped), run in parallel. Returns JSON per "
+            "repo: branch, upstream, ahead/behind and staged/modified/untracked/conflict counts.",
+            _schema(
+                ["root"],
+                root=_STR,
+                max_depth={"type": "integer", "minimum": 0, "maximum": 10},
+                max_repos={"type": "integer", "minimum": 1, "maximum": 5000},
+            ),
+            "git_tools", "status_many", _c_git_status_many,
+        ),
+        # Search
+        ToolSpec(
+            "rg_search",
+            "Search text under one or more roots using ripgrep (rg). Returns JSON matches "
+            "(path, line, column, text, optional before/after context lines); rg is stopped "
+            "as soon as max_results matches are found. `queries` searches several patterns "
+            "in one pass and groups the matches per query, max_results each.",
+            _schema(
+                [],
+                root=_STR,
+                roots={"type": "array", "items": _STR, "minItems": 1},
+                query=_STR,
+                queries={"type": "array", "items": _STR, "minItems": 1, "maxItems": 100},
+                glob={"anyOf": [_STR, {"type": "array", "items": _STR}]},
+                max_results={"type": "integer", "minimum": 1, "maximum": 5000},
+                max_count={"type": "integer", "minimum": 1},
+                case={"type": "string", "enum": ["sensitive", "insensitive", "smart"]},
+                word=_BOOL,
+                fixed_strings=_BOOL,
+                context={"type": "integer", "minimum": 0, "maximum": 20},
+                before={"type": "integer", "minimum": 0, "maximum": 20},
+                after={"type": "integer", "minimum": 0, "maximum": 20},
+                sort=_BOOL,
+            ),
+            "rg_tools", "search", _c_rg_search,
+        ),
+        ToolSpec(
+            "index_search",
+            "Search root through its persistent trigram index: only files containing the "
+            "query's trigrams are read, by rg (mode literal/regex) or the mgrep scorer (mode "
+            "fuzzy). Build the index with `python -m mcp_local.trigram build ROOT`, or pass "
+            "refresh=true to build/update it first.",
+            _schema(
+                ["root", "query"],
+                root=_STR,
+                query=_STR,
+                mode={"type": "string", "enum": ["literal", "regex", "fuzzy"]},
+                ignore_case=_BOOL,
+                glob=_STR,
+                max_results={"type": "integer", "minimum": 1, "maximum": 5000},
+                refresh=_BOOL,
+                min_probability={"type": "number", "minimum": 0.0, "maximum": 1.0},
+                time_budget_s={"type": "number", "exclusiveMinimum": 0},
+            ),
+            "trigram_tools", "index_search", _c_index_search,
+        ),
+        ToolSpec(
+            "bm25_search",
+            "Ranked search for natural-language or multi-identifier queries: BM25 over "
+            "chunks of the files under root (identifiers are split on snake/camel case), "
+            "from a persistent index. Returns JSON chunks (path, line range, score, snippet). "
+            "Build the index with `python -m mcp_local.bm25 build ROOT`, or pass refresh=true.",
+            _schema(
+                ["root", "query"],
+                root=_STR,
+                query=_STR,
+                glob=_STR,
+                max_results={"type": "integer", "minimum": 1, "maximum": 200},
+                refresh=_BOOL,
+                snippet_lines={"type": "integer", "minimum": 0, "maximum": 40},
+            ),
+            "bm25_tools", "bm25_search", _c_bm25_search,
+        ),
+        ToolSpec(
+            "mgrep_search",
+            "Approximate text search with match probability (mimics mgrep). "
+            "Searches one file (path) or every file under root matching include/exclude globs. "
+            "With path, `queries` scores several phrasings in one pass and groups results per query.",
+            _schema(
+                [],
+                path=_STR,
+                root=_STR,
+                query=_STR,
+                queries={"type": "array", "items": _STR, "minItems": 1, "maxItems": 100},
+                include={"type": "array", "items": _STR},
+                exclude={"type": "array", "items": _STR},
+                min_probability={"type": "number", "minimum": 0.0, "maximum": 1.0},
+                max_results={"type": "integer", "minimum": 1, "maximum": 500},
+                time_budget_s={"type": "number", "exclusiveMinimum": 0},
+            ),
+            "mgrep_tools", "search", _c_mgrep_search,
+        ),
+        # Postgres
+        ToolSpec(
+            "pg_query",
+            "Run a read-only SQL query on a named Postgres connection.",
+            _schema(
+                ["conn", "sql"],
+                conn=_STR,
+                sql=_STR,
+                limit={"type": "integer", "minimum": 1, "maximum": 10000},
+            ),
+            "pg_tools", "query", _c_pg_query,
+        ),
+        ToolSpec(
+            "pg_exec",
+            "Run a write SQL statement (INSERT/UPDATE/DELETE) with policy guards on a named Postgres connection.",
+            _schema(["conn", "sql"], conn=_STR, sql=_STR),
+            "pg_tools", "exec_write", _c_pg_exec,
+        ),
+        # nerdctl
+        ToolSpec(
+            "nerdctl",
+            "Run nerdctl locally or on a remote SSH host when host is provided.",
+            _schema(["args"], args=_ARGV, host=_STR),
+            "nerdctl_tools", "run", _c_nerdctl,
+        ),
+        ToolSpec(
+            "nerdctl_local",
+            "Run nerdctl locally (e.g., ps/logs/exec).",
+            _schema(["args"], args=_ARGV),
+            "nerdctl_tools", "local", _c_nerdctl_local,
+        ),
+        ToolSpec(
+            "nerdctl_ssh",
+            "Run nerdctl on a remote host via SSH (key-based auth).",
+            _schema(["host", "args"], host=_STR, args=_ARGV),
+            "nerdctl_tools", "remote_ssh", _c_nerdctl_ssh,
+        ),
+        # Server
+        ToolSpec(
+            "server_stats",
+            "Per-tool call counts, errors, bytes returned and latency percentiles (p50/p95/p99).",
+            _schema([], format={"type": "string", "enum": ["json", "prometheus"]}),
+            "stats_tools", "server_stats", _c_server_stats,
+        ),
+    ]
+}
+
+_TOOLS_LIST_JSON: Optional[str] = None
+
+
+def get(name: str) -> Optional[ToolSpec]:
+    return TOOLS.get(name)
+
+
+def tools_list_json() -> str:
+    """The tools/list result, JSON-encoded once and reused for every request."""
+    global _TOOLS_LIST_JSON
+    if _TOOLS_LIST_JSON is None:
+        _TOOLS_LIST_JSON = json.dumps(
+            {"tools": [spec.describe() for spec in TOOLS.values()]},
+            ensure_ascii=False,
+        )
+    return _TOOLS_LIST_JSON
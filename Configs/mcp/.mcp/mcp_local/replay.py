@@ -0,0 +1,305 @@
+"""
+Replay recorded local-mcp sessions against a fresh server and compare runs.
+
+Record a session with `server.py --record session.jsonl` (or LOCAL_MCP_RECORD),
+then, from the directory containing server.py:
+
+    python -m mcp_local.replay run session.jsonl -o base.json
+    python -m mcp_local.replay run session.jsonl -o new.json --fake pg_tools,nerdctl_tools
+    python -m mcp_local.replay compare base.json new.json --threshold 0.15
+
+`run` spawns server.py, feeds it the recorded requests (as fast as the window
+allows, or with the recorded pacing under --realtime) and reports per-method
+throughput and latency percentiles. tools/call is broken down per tool.
+`compare` prints the p50/p95/p99 deltas and exits 1 on a p95 regression.
+"""
+import argparse
+import json
+import math
+import os
+import pathlib
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+SERVER = pathlib.Path(__file__).resolve().parent.parent / "server.py"
+
+
+def load_session(path: str) -> List[Dict[str, Any]]:
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if isinstance(entry.get("msg"), (dict, list)):
+                entries.append(entry)
+    return entries
+
+
+def _label(msg: Dict[str, Any]) -> str:
+    method = msg.get("method") or "?"
+    if method == "tools/call":
+        return f"tools/call:{(msg.get('params') or {}).get('name')}"
+    return method
+
+
+def _percentile(sorted_ms: List[float], q: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    idx = min(len(sorted_ms) - 1, max(0, math.ceil(q * len(sorted_ms)) - 1))  # nearest rank
+    return sorted_ms[idx]
+
+
+class _Run:
+    def __init__(self, proc: subprocess.Popen, window: int) -> None:
+        self.proc = proc
+        self.slots = threading.BoundedSemaphore(max(1, window))
+        self.lock = threading.Lock()
+        self.pending: Dict[int, tuple] = {}  # new id -> (label, t_sent)
+        self.batch_of: Dict[int, int] = {}  # member id -> key of its batch
+        self.done = threading.Condition(self.lock)
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    def send(self, obj: Any) -> None:
+        self.proc.stdin.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self.proc.stdin.flush()
+
+    def expect(self, new_id: int, label: str) -> None:
+        with self.lock:
+            self.pending[new_id] = (label, time.perf_counter())
+
+    def forget(self, new_id: int) -> None:
+        # Cancelled requests get no response; stop waiting for them.
+        with self.lock:
+            if self.pending.pop(new_id, None) is not None:
+                self.slots.release()
+                self.done.notify_all()
+
+    def read_responses(self) -> None:
+        for line in self.proc.stdout:
+            now = time.perf_counter()
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            with self.lock:
+                if isinstance(msg, list):
+                    members = [m for m in msg if isinstance(m, dict)]
+                    key = next((self.batch_of[m.get("id")] for m in members if m.get("id") in self.batch_of), None)
+                    failed = any("error" in m for m in members)
+                else:
+                    key = msg.get("id")
+                    failed = "error" in msg
+                entry = self.pending.pop(key, None)
+                if entry is None:
+                    continue
+                label, sent = entry
+                self.samples.setdefault(label, []).append((now - sent) * 1000.0)
+                if failed:
+                    self.errors[label] = self.errors.get(label, 0) + 1
+                self.done.notify_all()
+            self.slots.release()
+
+    def wait_all(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        with self.lock:
+            while self.pending:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self.done.wait(left)
+        return True
+
+
+def run_session(
+    session: str,
+    window: int = 8,
+    realtime: bool = False,
+    fakes: Optional[str] = None,
+    config: Optional[str] = None,
+    timeout: float = 120.0,
+) -> Dict[str, Any]:
+    entries = load_session(session)
+    env = dict(os.environ)
+    env.pop("LOCAL_MCP_RECORD", None)
+    if fakes:
+        env["LOCAL_MCP_FAKE_TOOLS"] = fakes
+    if config:
+        env["LOCAL_MCP_CONFIG"] = os.path.abspath(config)
+
+    proc = subprocess.Popen(
+        [sys.executable, str(SERVER)],
+        cwd=str(SERVER.parent),
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+    )
+    run = _Run(proc, window)
+    reader = threading.Thread(target=run.read_responses, daemon=True)
+    reader.start()
+
+    # Recorded ids may repeat across reconnects; renumber and remap cancels.
+    id_map: Dict[Any, int] = {}
+    next_id = 0
+    start = time.perf_counter()
+    for seq, entry in enumerate(entries, 1):
+        if realtime:
+            delay = float(entry.get("t", 0.0)) - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if isinstance(entry["msg"], list):
+            # Batch: one round trip, timed as a whole under "batch[N]".
+            members = []
+            for m in entry["msg"]:
+                m = dict(m) if isinstance(m, dict) else m
+                if isinstance(m, dict) and m.get("id") is not None:
+                    next_id += 1
+                    id_map[m["id"]] = m["id"] = -next_id
+                members.append(m)
+            ids = [m["id"] for m in members if isinstance(m, dict) and "id" in m]
+            if not ids:
+                run.send(members)
+                continue
+            run.slots.acquire()
+            with run.lock:
+                for i in ids:
+                    run.batch_of[i] = ids[0]
+            run.expect(ids[0], f"batch[{len(members)}]")
+            run.send(members)
+            continue
+        msg = dict(entry["msg"])
+        if msg.get("method") == "notifications/cancelled":
+            params = dict(msg.get("params") or {})
+            target = id_map.get(params.get("requestId"))
+            if target is None:
+                continue
+            params["requestId"] = target
+            msg["params"] = params
+            run.send(msg)
+            run.forget(target)
+            continue
+        if "id" not in msg or msg["id"] is None:
+            run.send(msg)
+            continue
+        run.slots.acquire()
+        id_map[msg["id"]] = seq
+        msg["id"] = seq
+        run.expect(seq, _label(msg))
+        run.send(msg)
+
+    complete = run.wait_all(timeout)
+    wall = time.perf_counter() - start
+    proc.stdin.close()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+    methods = {}
+    for label, samples in sorted(run.samples.items()):
+        samples.sort()
+        methods[label] = {
+            "count": len(samples),
+            "errors": run.errors.get(label, 0),
+            "throughput_per_s": round(len(samples) / wall, 3) if wall > 0 else 0.0,
+            "p50_ms": round(_percentile(samples, 0.50), 3),
+            "p95_ms": round(_percentile(samples, 0.95), 3),
+            "p99_ms": round(_percentile(samples, 0.99), 3),
+            "max_ms": round(samples[-1], 3),
+        }
+    return {
+        "session": os.path.abspath(session),
+        "requests": sum(m["count"] for m in methods.values()),
+        "wall_s": round(wall, 3),
+        "window": window,
+        "realtime": realtime,
+        "fakes": fakes or "",
+        "complete": complete,
+        "methods": methods,
+    }
+
+
+def compare_runs(base: Dict[str, Any], new: Dict[str, Any], threshold: float, min_ms: float) -> tuple[List[str], bool]:
+    rows = [f"{'method':40} {'p50 base/new':>20} {'p95 base/new':>20} {'p99 base/new':>20}  change"]
+    regressed = False
+    for label in sorted(set(base["methods"]) | set(new["methods"])):
+        b = base["methods"].get(label)
+        n = new["methods"].get(label)
+        if b is None or n is None:
+            rows.append(f"{label:40} {'only in ' + ('new' if b is None else 'base'):>20}")
+            continue
+        cells = [f"{b[k]:>9.2f}/{n[k]:<9.2f}" for k in ("p50_ms", "p95_ms", "p99_ms")]
+        change = (n["p95_ms"] - b["p95_ms"]) / b["p95_ms"] if b["p95_ms"] else 0.0
+        flag = ""
+        if change > threshold and n["p95_ms"] - b["p95_ms"] > min_ms:
+            flag = "  REGRESSION"
+            regressed = True
+        rows.append(f"{label:40} {cells[0]:>20} {cells[1]:>20} {cells[2]:>20}  {change * 100:+6.1f}%{flag}")
+    return rows, regressed
+
+
+def _print_run(result: Dict[str, Any]) -> None:
+    print(f"{result['requests']} requests in {result['wall_s']:.3f}s (window={result['window']})")
+    print(f"{'method':40} {'count':>6} {'err':>4} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for label, m in result["methods"].items():
+        print(
+            f"{label:40} {m['count']:>6} {m['errors']:>4} {m['throughput_per_s']:>9.1f} "
+            f"{m['p50_ms']:>9.2f} {m['p95_ms']:>9.2f} {m['p99_ms']:>9.2f} {m['max_ms']:>9.2f}"
+        )
+    if not result["complete"]:
+        print("WARNING: timed out waiting for some responses")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m mcp_local.replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="replay a recorded session against a fresh server")
+    r.add_argument("session")
+    r.add_argument("-o", "--out", help="write the result JSON here")
+    r.add_argument("--window", type=int, default=8, help="max requests in flight (default 8)")
+    r.add_argument("--realtime", action="store_true", help="keep the recorded request pacing")
+    r.add_argument("--fake", default="", help="comma-separated tool modules to stub, e.g. pg_tools,nerdctl_tools")
+    r.add_argument("--config", help="config.yaml for the replayed server")
+    r.add_argument("--timeout", type=float, default=120.0)
+
+    c = sub.add_parser("compare", help="compare two replay results")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.15, help="p95 slowdown that counts as a regression (default 0.15)")
+    c.add_argument("--min-ms", type=float, default=1.0, help="ignore p95 changes smaller than this (default 1ms)")
+
+    opts = ap.parse_args(argv)
+    if opts.cmd == "run":
+        result = run_session(
+            opts.session,
+            window=opts.window,
+            realtime=opts.realtime,
+            fakes=opts.fake,
+            config=opts.config,
+            timeout=opts.timeout,
+        )
+        _print_run(result)
+        if opts.out:
+            with open(opts.out, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+        return 0 if result["complete"] else 1
+
+    with open(opts.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(opts.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows, regressed = compare_runs(base, new, opts.threshold, opts.min_ms)
+    print("\n".join(rows))
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import json, os, time
+from typing import Optional
+from mcp_local import bm25, cancel
+
+def _snippet(path: str, start: int, end: int, terms: set, lines: int) -> list:
+    # The `lines` lines of the chunk around its line with the most query terms.
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            chunk = [ln.rstrip("\n") for n, ln in enumerate(f, 1) if start <= n <= end]
+    except OSError:
+        return []
+    hits = [sum(t in terms for t in bm25.tokens(ln)) for ln in chunk]
+    best = max(range(len(chunk)), key=hits.__getitem__, default=0)
+    a = max(0, min(best - lines // 2, len(chunk) - lines))
+    return [{"line": start + i, "text": chunk[i][:500]} for i in range(a, min(a + lines, len(chunk)))]
+
+def bm25_search(
+    policy,
+    root: str,
+    query: str,
+    max_results: int = 20,
+    glob: Optional[str] = None,
+    refresh: bool = False,
+    index_dir: str = bm25.DEFAULT_DIR,
+    max_file_bytes: int = bm25.DEFAULT_MAX_FILE_BYTES,
+    chunk_lines: int = bm25.DEFAULT_CHUNK_LINES,
+    max_age_s: float = 300.0,
+    prune: Optional[list] = None,
+    snippet_lines: int = 6,
+) -> str:
+    """
+    Rank chunks of the files under root by BM25 against query, using the
+    index of root or an indexed ancestor. The index is updated first if
+    refresh=True or it is older than max_age_s (0: never on its own).
+    Returns JSON {"results": [{path, start, end, score, snippet}], "index"}.
+    """
+    terms = bm25.tokens(query)
+    if not terms:
+        raise ValueError("query has no searchable terms (words of 2+ characters, not stopwords)")
+    root = os.path.expanduser(root)
+    idx = bm25.find_index(root, index_dir)
+    if refresh or (idx is not None and max_age_s and time.time() - idx.updated > max_age_s):
+        target = idx.root if idx is not None else root
+        if idx is not None:
+            idx.close()
+        bm25.update(target, index_dir, prune=prune, max_file_bytes=max_file_bytes, chunk_lines=chunk_lines)
+        idx = bm25.find_index(root, index_dir)
+    if idx is None:
+        raise RuntimeError(
+            f"No BM25 index covers {root}. Build one with "
+            f"`python -m mcp_local.bm25 build {root}` or call with refresh=true."
+        )
+    cancel.check()
+
+    from mcp_local.walk import path_matcher
+
+    try:
+        real = os.path.realpath(root)
+        prefix = "" if real == idx.root else os.path.relpath(real, idx.root).replace(os.sep, "/") + "/"
+        in_glob = path_matcher([glob]) if glob else None
+
+        def accept(rel: str) -> bool:
+            if not rel.startswith(prefix):
+                return False
+            if in_glob is not None and not in_glob(rel[len(prefix):]):
+                return False
+            try:
+                policy.check(os.path.join(root, *rel[len(prefix):].split("/")))
+            except PermissionError:
+                return False
+            return True
+
+        hits = idx.search(terms, max_results, accept)
+        stats = {"chunks": int(idx.meta("chunks", "0")), "age_s": round(time.time() - idx.updated, 1)}
+    finally:
+        idx.close()
+    wanted = set(terms)
+    results = []
+    for score, rel, start, end in hits:
+        path = os.path.join(root, *rel[len(prefix):].split("/"))
+        results.append(
+            {
+                "path": path,
+                "start": start,
+                "end": end,
+                "score": round(score, 3),
+                "snippet": _snippet(path, start, end, wanted, snippet_lines),
+            }
+        )
+    return json.dumps({"results": results, "index": stats}, ensure_ascii=False)
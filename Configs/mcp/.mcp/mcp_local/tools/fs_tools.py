@@ -1,30 +1,547 @@
-import os, pathlib, glob
+import os, pathlib, base64, json, mmap, re, secrets, threading, time
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+from mcp_local import cancel
+from mcp_local.cache import CACHE, MISS, cached, dir_sig, file_sig
+from mcp_local.pools import SharedPool
 
-def read_text(path: str) -> str:
+def _abs(path: str) -> str:
+    return os.path.abspath(os.path.expanduser(path))
+
+def read_text(
+    path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    line_start: Optional[int] = None,
+    line_count: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    key = _abs(path)
+    ranged = offset is not None or length is not None
+    by_line = line_start is not None or line_count is not None
+    if not ranged and not by_line and max_bytes is None:
+        p = pathlib.Path(path).expanduser()
+        return cached(
+            ("fs_read", key),
+            file_sig(key),
+            lambda: p.read_text(encoding="utf-8", errors="replace"),
+        )
+    if ranged and by_line:
+        raise ValueError("Use either offset/length or line_start/line_count, not both")
+
+    # Slices go through mmap so a tail or middle read touches only its pages.
+    with open(key, "rb") as f:
+        st = os.fstat(f.fileno())
+        size = st.st_size
+        if size == 0:
+            return ""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if by_line:
+                sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+                start, end = _line_span(key, sig, mm, size, line_start or 1, line_count)
+            else:
+                start = offset or 0
+                start = max(0, size + start) if start < 0 else min(start, size)
+                end = size if length is None else min(size, start + max(0, length))
+            return _decode_slice(mm, start, end, size, max_bytes)
+
+def _decode_slice(mm: mmap.mmap, start: int, end: int, size: int, max_bytes: Optional[int]) -> str:
+    cut = max_bytes is not None and end - start > max_bytes
+    if cut:
+        end = start + max_bytes
+        # Back off to a UTF-8 boundary so the cut doesn't split a character.
+        back = end
+        while back > start and mm[back] & 0xC0 == 0x80:
+            back -= 1
+        end = back if back > start else end
+    text = mm[start:end].decode("utf-8", errors="replace")
+    if cut:
+        text += f"\n[truncated: bytes {start}-{end} of {size}; continue with offset={end}]"
+    return text
+
+class _LineIndex:
+    """Start offsets of the lines scanned so far; extended on demand."""
+
+    __slots__ = ("starts", "pos", "lock")
+
+    def __init__(self) -> None:
+        self.starts = array("Q", [0])
+        self.pos = 0  # bytes scanned
+        self.lock = threading.Lock()
+
+    def extend(self, mm: mmap.mmap, size: int, lines: int) -> None:
+        # Caller holds self.lock. Scan until `lines` starts are known or EOF.
+        starts, pos, find = self.starts, self.pos, mm.find
+        while len(starts) < lines and pos < size:
+            nl = find(b"\n", pos)
+            if nl < 0:
+                pos = size
+                break
+            pos = nl + 1
+            if pos < size:
+                starts.append(pos)
+        self.pos = pos
+
+def _line_span(key: str, sig: tuple, mm: mmap.mmap, size: int, line_start: int, line_count: Optional[int]) -> tuple:
+    """Byte span of line_count lines from 1-based line_start (negative: from the end)."""
+    if line_count is not None and line_count <= 0:
+        return 0, 0
+    if line_start < 0:
+        # Tail: walk back over -line_start newlines; no index needed.
+        start = size - 1 if mm[size - 1] == 0x0A else size
+        for _ in range(-line_start):
+            start = mm.rfind(b"\n", 0, start)
+            if start < 0:
+                break
+        start += 1
+        if line_count is None:
+            return start, size
+        end = start
+        for _ in range(line_count):
+            nl = mm.find(b"\n", end)
+            if nl < 0:
+                return start, size
+            end = nl + 1
+        return start, end
+
+    first = max(line_start, 1) - 1
+    idx = CACHE.get(("fs_lines", key), sig)
+    fresh = idx is MISS
+    if fresh:
+        idx = _LineIndex()
+    with idx.lock:
+        before = len(idx.starts)
+        need = first + 1 if line_count is None else first + line_count + 1
+        idx.extend(mm, size, need)
+        starts = idx.starts
+        if first >= len(starts):
+            span = (size, size)
+        elif line_count is None or first + line_count >= len(starts):
+            span = (starts[first], size)
+        else:
+            span = (starts[first], starts[first + line_count])
+        grown = len(starts) != before
+        nbytes = len(starts) * starts.itemsize
+    if fresh or grown:
+        CACHE.put(("fs_lines", key), sig, idx, nbytes)
+    return span
+
+_READ_POOL = SharedPool(lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="mcp-read"))
+
+def _read_one(path: str, ranges: dict, cap: int, token) -> str:
+    if token is not None and token.cancelled:
+        raise cancel.Cancelled()
+    if not ranges and os.stat(_abs(path)).st_size <= cap:
+        return read_text(path)  # whole small file: same cached path as fs_read
+    return read_text(path, **dict(ranges, max_bytes=min(ranges.get("max_bytes", cap), cap)))
+
+def _utf8_prefix(text: str, nbytes: int) -> str:
+    return text.encode("utf-8")[:nbytes].decode("utf-8", errors="ignore")
+
+def read_many(files: list, max_total_bytes: int = 4 << 20, workers: int = 8) -> str:
+    """
+    Read several files on a bounded thread pool. files holds (path, ranges,
+    error) triples from argument coercion; denied paths arrive with an error.
+    Results keep request order; once max_total_bytes of text has been
+    returned the remaining files are skipped.
+
+    At most 2 * workers reads are in flight, each capped at the budget left
+    when it is submitted, so memory stays bounded however many files are asked
+    for, and nothing new is read once the budget is spent.
+    """
+    token = cancel.current()
+    out: list = [None] * len(files)
+    pending: deque = deque()  # (index, path, future) in request order
+    left = max_total_bytes
+
+    def finish(i: int, path: str, fut) -> None:
+        nonlocal left
+        try:
+            text = fut.result()
+        except cancel.Cancelled:
+            raise
+        except Exception as e:
+            out[i] = {"path": path, "error": f"{type(e).__name__}: {e}"}
+            return
+        if left <= 0:
+            out[i] = {"path": path, "error": "skipped: max_total_bytes exhausted"}
+            return
+        nbytes = len(text.encode("utf-8"))
+        entry: dict[str, Any] = {"path": path}
+        if nbytes > left:
+            text = _utf8_prefix(text, left)
+            nbytes = len(text.encode("utf-8"))
+            entry["truncated"] = True
+        left -= nbytes
+        entry["bytes"] = nbytes
+        entry["text"] = text
+        out[i] = entry
+
+    with _READ_POOL.use(workers) as pool:
+        try:
+            for i, (path, ranges, err) in enumerate(files):
+                if err:
+                    out[i] = {"path": path, "error": err}
+                    continue
+                while len(pending) >= 2 * workers:
+                    finish(*pending.popleft())
+                if left <= 0:
+                    out[i] = {"path": path, "error": "skipped: max_total_bytes exhausted"}
+                    continue
+                pending.append((i, path, pool.submit(_read_one, path, ranges, left, token)))
+            while pending:
+                finish(*pending.popleft())
+        finally:
+            for _, _, fut in pending:
+                fut.cancel()
+    cancel.check()
+    return json.dumps(
+        {"files": out, "total_bytes": max_total_bytes - left, "max_total_bytes": max_total_bytes},
+        ensure_ascii=False,
+    )
+
+def _create_temp(parent: str, name: str) -> tuple:
+    # Like mkstemp, but created with 0o666 so the kernel applies the umask as
+    # it would for a plain open(); reading the umask means changing it, which
+    # is process-wide and would race other tool threads.
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+    for _ in range(100):
+        tmp = os.path.join(parent, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(tmp, flags, 0o666), tmp
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No free temporary file name in {parent}")
+
+def _atomic_write(path: str, data: bytes) -> None:
+    """Replace path with data via temp file + fsync + rename (keeps the file mode)."""
+    target = os.path.realpath(path)  # write through a symlink, don't replace it
+    parent = os.path.dirname(target)
+    os.makedirs(parent, exist_ok=True)
+    try:
+        mode = os.stat(target).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None  # new file: keep the umask-derived mode it was created with
+    fd, tmp = _create_temp(parent, os.path.basename(target))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            if mode is not None:
+                os.fchmod(f.fileno(), mode)
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    try:
+        dfd = os.open(parent, os.O_RDONLY)
+    except OSError:
+        return  # e.g. platforms without directory fds
+    try:
+        os.fsync(dfd)
+    except OSError:
+        pass
+    finally:
+        os.close(dfd)
+
+def write_text(path: str, content: str, append: bool = False) -> str:
     p = pathlib.Path(path).expanduser()
-    return p.read_text(encoding="utf-8", errors="replace")
+    try:
+        if append:
+            p.parent.mkdir(parents=True, exist_ok=True)
+            with open(p, "ab") as f:
+                f.write(content.encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            _atomic_write(str(p), content.encode("utf-8"))
+    finally:
+        CACHE.invalidate_path(_abs(path))
+    return f"{'Appended' if append else 'Wrote'} {len(content)} bytes to {str(p)}"
 
-def write_text(path: str, content: str) -> str:
+_EDIT_LOCKS: dict = {}
+_EDIT_LOCKS_LOCK = threading.Lock()
+
+def _edit_lock(path: str) -> threading.Lock:
+    # Concurrent fs_edit calls on one file would otherwise lose each other's changes.
+    key = os.path.realpath(path)
+    with _EDIT_LOCKS_LOCK:
+        lock = _EDIT_LOCKS.get(key)
+        if lock is None:
+            lock = _EDIT_LOCKS[key] = threading.Lock()
+        return lock
+
+def edit_text(path: str, edits: Optional[list] = None, patch: Optional[str] = None) -> str:
+    """Apply exact-string replacements or a unified diff to a file, atomically."""
+    if (edits is None) == (patch is None):
+        raise ValueError("Pass exactly one of edits or patch")
+    with _edit_lock(_abs(path)):
+        return _edit_text(path, edits, patch)
+
+def _edit_text(path: str, edits: Optional[list], patch: Optional[str]) -> str:
     p = pathlib.Path(path).expanduser()
-    p.parent.mkdir(parents=True, exist_ok=True)
-    p.write_text(content, encoding="utf-8")
-    return f"Wrote {len(content)} bytes to {str(p)}"
+    try:
+        text = p.read_bytes().decode("utf-8")
+    except UnicodeDecodeError:
+        raise ValueError(f"Not a UTF-8 text file: {p}") from None
+    if edits is not None:
+        for i, e in enumerate(edits, 1):
+            old, new = e["old"], e["new"]
+            n = text.count(old) if old else 0
+            if n == 0:
+                raise ValueError(f"Edit {i}: old text not found")
+            if n > 1 and not e.get("replace_all"):
+                raise ValueError(f"Edit {i}: old text found {n} times; add context or set replace_all")
+            text = text.replace(old, new)
+        summary = f"{len(edits)} edit(s)"
+    else:
+        text, summary = _apply_patch(text, patch)
+    try:
+        _atomic_write(str(p), text.encode("utf-8"))
+    finally:
+        CACHE.invalidate_path(_abs(path))
+    return f"Edited {p}: {summary}"
+
+_HUNK = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+def _split_lines(text: str) -> list:
+    # Lines ending in "\n" (kept), like diff sees them; str.splitlines() would
+    # also break on \f, \v, \x1c-\x1e, \x85 and \u2028 inside a line.
+    lines = [l + "\n" for l in text.split("\n")]
+    lines[-1] = lines[-1][:-1]
+    return lines if lines[-1] else lines[:-1]
+
+def _parse_patch(patch: str) -> list:
+    """Hunks as (old_start, old_count, [(tag, text, eol), ...]) for a single-file diff."""
+    hunks, files = [], 0
+    lines = [l.rstrip("\n") for l in _split_lines(patch)]
+    lines = [l[:-1] if l.endswith("\r") else l for l in lines]  # CRLF patch
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if line.startswith("+++ "):
+            files += 1
+            if files > 1:
+                raise ValueError("patch must touch a single file")
+            continue
+        m = _HUNK.match(line)
+        if not m:
+            continue  # diff/index/--- headers
+        old_start = int(m.group(1))
+        old_left = int(m.group(2) or 1)
+        new_left = int(m.group(4) or 1)
+        old_count, ops = old_left, []
+        while i < len(lines) and (old_left or new_left or lines[i].startswith("\\")):
+            line = lines[i]
+            i += 1
+            if line.startswith("\\"):  # "\ No newline at end of file"
+                if ops:
+                    ops[-1] = (ops[-1][0], ops[-1][1], False)
+                continue
+            tag, body = (line[:1], line[1:]) if line else (" ", "")
+            if tag == " ":
+                old_left, new_left = old_left - 1, new_left - 1
+            elif tag == "-":
+                old_left -= 1
+            elif tag == "+":
+                new_left -= 1
+            else:
+                raise ValueError(f"Malformed hunk line: {line[:80]!r}")
+            ops.append((tag, body, True))
+        if old_left > 0 or new_left > 0:
+            raise ValueError("patch hunk is truncated")
+        hunks.append((old_start, old_count, ops))
+    if not hunks:
+        raise ValueError("patch has no hunks")
+    return hunks
+
+def _apply_patch(text: str, patch: str) -> tuple:
+    lines = _split_lines(text)
+    bare = [l.rstrip("\r\n") for l in lines]
+    nl = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    out, done, added, removed = [], 0, 0, 0
+    for n, (start, count, ops) in enumerate(_parse_hunks_checked(patch), 1):
+        old = [body for tag, body, _ in ops if tag != "+"]
+        expected = start - 1 if count else start
+        pos = _find_hunk(bare, old, expected, done)
+        if pos is None:
+            raise ValueError(f"Hunk {n} (@@ -{start},{count}) does not apply")
+        out.extend(lines[done:pos])
+        cur = pos
+        for tag, body, eol in ops:
+            if tag == "+":
+                if out and not out[-1].endswith(("\n", "\r")):
+                    out[-1] += nl
+                out.append(body + (nl if eol else ""))
+                added += 1
+            elif tag == "-":
+                cur += 1
+                removed += 1
+            else:
+                out.append(lines[cur])
+                cur += 1
+        done = cur
+    out.extend(lines[done:])
+    return "".join(out), f"{n} hunk(s), +{added} -{removed} lines"
+
+def _parse_hunks_checked(patch: str) -> list:
+    hunks = _parse_patch(patch)
+    for (a, c, _), (b, _, _) in zip(hunks, hunks[1:]):
+        if b < a + c:
+            raise ValueError("patch hunks overlap or are out of order")
+    return hunks
+
+def _find_hunk(bare: list, old: list, expected: int, lo: int) -> Optional[int]:
+    # Try the stated line first, then search outward (like patch's offset handling).
+    hi = len(bare) - len(old)
+    expected = min(max(expected, lo), max(hi, lo))
+    for delta in range(0, max(expected - lo, hi - expected) + 1):
+        for pos in ((expected,) if delta == 0 else (expected - delta, expected + delta)):
+            if lo <= pos <= hi and bare[pos:pos + len(old)] == old:
+                return pos
+    return None
 
-def list_dir(path: str) -> str:
+def list_dir(path: str, details: bool = False, depth: int = 1, limit: int = 1000, cursor: Optional[str] = None) -> str:
+    key = _abs(path)
+    compute = lambda: _list_dir(path, details, depth, limit, cursor)
+    if details or depth > 1:
+        return compute()  # dir_sig can't see child size/mtime or nested changes
+    return cached(("fs_list", key, limit, cursor), dir_sig(key), compute)
+
+def _list_dir(path: str, details: bool, depth: int, limit: int, cursor: Optional[str]) -> str:
     p = pathlib.Path(path).expanduser()
     if not p.exists():
         return f"Not found: {p}"
     if not p.is_dir():
         return f"Not a directory: {p}"
-    items = []
-    for child in sorted(p.iterdir(), key=lambda x: x.name.lower()):
-        kind = "dir" if child.is_dir() else "file"
-        items.append(f"{kind}\t{child.name}")
+    after = _cursor_key(cursor) if cursor else None
+    items, last = [], ""
+    for n, (rel, entry, is_dir) in enumerate(_iter_tree(str(p), "", 1, depth, after)):
+        if n >= limit:
+            items.append(f"(more: cursor={base64.urlsafe_b64encode(last.encode('utf-8', 'surrogateescape')).decode()})")
+            break
+        if not n & 1023:
+            cancel.check()
+        items.append(_format_entry(rel, entry, is_dir, details))
+        last = rel
     return "\n".join(items) if items else "(empty)"
 
-def glob_files(root: str, pattern: str) -> str:
-    base = pathlib.Path(root).expanduser()
-    pat = str(base / pattern)
-    matches = glob.glob(pat, recursive=True)
-    matches = sorted(set(matches))
+def _tree_key(rel: str) -> tuple:
+    # Listing order: per component, case-insensitive name then exact name.
+    return tuple((c.lower(), c) for c in rel.split("/"))
+
+def _cursor_key(cursor: str) -> tuple:
+    try:
+        rel = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8", "surrogateescape")
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor") from None
+    return _tree_key(rel)
+
+def _iter_tree(dirpath: str, rel: str, level: int, depth: int, after: Optional[tuple]):
+    """Yield (relative path, DirEntry, is_dir) in listing order, past `after`."""
+    try:
+        with os.scandir(dirpath) as it:
+            entries = sorted(it, key=lambda e: (e.name.lower(), e.name))
+    except OSError:
+        return
+    for e in entries:
+        r = f"{rel}/{e.name}" if rel else e.name
+        try:
+            is_dir = e.is_dir()
+            down = level < depth and is_dir and not e.is_symlink()
+        except OSError:
+            is_dir = down = False
+        if after is not None:
+            k = _tree_key(r)
+            if k <= after:
+                # Skipped, unless the cursor points somewhere inside this directory.
+                if down and after[: len(k)] == k:
+                    yield from _iter_tree(e.path, r, level + 1, depth, after)
+                continue
+        yield r, e, is_dir
+        if down:
+            yield from _iter_tree(e.path, r, level + 1, depth, after)
+
+def _format_entry(rel: str, e: os.DirEntry, is_dir: bool, details: bool) -> str:
+    kind = "dir" if is_dir else "file"
+    if not details:
+        return f"{kind}\t{rel}"
+    try:
+        st = e.stat()
+    except OSError:
+        try:
+            st = e.stat(follow_symlinks=False)  # dangling symlink
+        except OSError:
+            return f"{kind}\t-\t-\t{rel}"
+    mtime = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(st.st_mtime))
+    line = f"{kind}\t{st.st_size}\t{mtime}\t{rel}"
+    if e.is_symlink():
+        try:
+            line += f" -> {os.readlink(e.path)}"
+        except OSError:
+            pass
+    return line
+
+def glob_files(
+    root: str,
+    pattern: str,
+    max_results: int = 1000,
+    sort: bool = True,
+    gitignore: bool = True,
+    prune: Optional[list] = None,
+) -> str:
+    # Only the root's mtime is checked; the glob_ttl_s cap bounds staleness
+    # from changes deeper in the tree.
+    key = _abs(root)
+    opts = (max_results, sort, gitignore, tuple(prune) if prune is not None else None)
+    return cached(
+        ("fs_glob", key, pattern, opts),
+        dir_sig(key),
+        lambda: _glob_files(root, pattern, max_results, sort, gitignore, prune),
+    )
+
+def _glob_files(root: str, pattern: str, max_results: int, sort: bool, gitignore: bool, prune: Optional[list]) -> str:
+    from mcp_local import index
+    from mcp_local.walk import walk
+
+    idx = index.current()
+    base = str(pathlib.Path(root).expanduser())
+    matches = []
+    walker = walk(base, pattern, sort=sort, prune=prune, gitignore=gitignore, listdir=idx.listdir if idx else None)
+    for i, path in enumerate(walker):
+        if i >= max_results:
+            matches.append(f"... (stopped at max_results={max_results})")
+            break
+        if not i & 1023:
+            cancel.check()
+        matches.append(path)
     return "\n".join(matches) if matches else "(no matches)"
+
+def find_files(
+    roots: list,
+    query: str,
+    kind: Optional[str] = None,
+    max_results: int = 200,
+    prune: Optional[list] = None,
+) -> str:
+    from mcp_local import index
+    from mcp_local.walk import find
+
+    idx = index.current()
+    bases = [str(pathlib.Path(r).expanduser()) for r in roots]
+    out = []
+    for i, path in enumerate(find(bases, query, kind=kind, prune=prune, listdir=idx.listdir if idx else None)):
+        if i >= max_results:
+            out.append(f"... (stopped at max_results={max_results})")
+            break
+        if not i & 1023:
+            cancel.check()
+        out.append(path)
+    return "\n".join(out) if out else "(no matches)"
@@ -1,11 +1,16 @@
-import subprocess, pathlib
+import json, os, pathlib, re, subprocess, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from mcp_local import cancel
+from mcp_local.cache import CACHE, cached, git_sig
+from mcp_local.pools import SharedPool
 
 def _run(repo: str, args: list[str]) -> str:
     r = pathlib.Path(repo).expanduser()
     if not (r / ".git").exists():
         # allow git worktrees/submodules? best-effort
         pass
-    proc = subprocess.run(
+    proc = cancel.run(
         ["git"] + args,
         cwd=str(r),
         text=True,
@@ -16,8 +21,18 @@ def _run(repo: str, args: list[str]) -> str:
         raise RuntimeError(out.strip() or f"git failed ({proc.returncode})")
     return out.strip()
 
+def _abs(repo: str) -> str:
+    return os.path.abspath(os.path.expanduser(repo))
+
 def status(repo: str) -> str:
-    return _run(repo, ["status", "--porcelain=v1", "-b"])
+    # Validated by .git/index + HEAD; worktree edits that don't touch the
+    # index are only picked up after git_status_ttl_s.
+    key = _abs(repo)
+    return cached(
+        ("git_status", key),
+        git_sig(key),
+        lambda: _run(repo, ["status", "--porcelain=v1", "-b"]),
+    )
 
 def diff(repo: str, staged: bool = False) -> str:
     return _run(repo, ["diff", "--staged"] if staged else ["diff"])
@@ -26,8 +41,344 @@ def log(repo: str, n: int = 20) -> str:
     return _run(repo, ["log", f"-n{n}", "--oneline", "--decorate"])
 
 def checkout(repo: str, branch: str) -> str:
-    return _run(repo, ["checkout", branch])
+    try:
+        return _run(repo, ["checkout", branch])
+    finally:
+        CACHE.invalidate_path(_abs(repo), subtree=True)
 
 def commit_am(repo: str, message: str) -> str:
     # -a commits only tracked changes; avoids accidentally adding new files.
-    return _run(repo, ["commit", "-am", message])
+    try:
+        return _run(repo, ["commit", "-am", message])
+    finally:
+        CACHE.invalidate_path(_abs(repo), subtree=True)
+
+# --- object reads through `git cat-file --batch` ---------------------------
+
+_READ_CHUNK = 1 << 20
+
+class _CatFile:
+    """
+    One long-lived `git cat-file --batch` per repo: each read is a line on its
+    stdin and a header plus the object on its stdout, so no fork per call.
+    Reads are serialized per repo; a dead process is restarted once per read.
+    """
+
+    def __init__(self, repo: str) -> None:
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.proc: Optional[subprocess.Popen] = None
+        self.err = None
+        self.used = time.monotonic()
+        self.idle_s = 300.0
+
+    def _start(self) -> None:
+        self.err = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(
+            ["git", "cat-file", "--batch"], cwd=self.repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=self.err
+        )
+
+    def _stop(self) -> str:
+        """Stop the process (if any); returns what it wrote to stderr."""
+        proc, err, self.proc, self.err = self.proc, self.err, None, None
+        if proc is not None:
+            try:
+                proc.stdin.close()
+                proc.wait(timeout=1)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+        if err is None:
+            return ""
+        err.seek(0)
+        text = err.read().decode("utf-8", errors="replace").strip()
+        err.close()
+        return text
+
+    def read(self, name: str, max_bytes: Optional[int] = None) -> Optional[Tuple[str, str, int, bytes]]:
+        """(sha, type, size, content up to max_bytes) of object name, None if missing."""
+        if "\n" in name or not name.strip():
+            raise ValueError(f"Invalid object name: {name!r}")
+        with self.lock:
+            self.used = time.monotonic()
+            for attempt in (0, 1):
+                if self.proc is None or self.proc.poll() is not None:
+                    self._stop()
+                    self._start()
+                token = cancel.current()
+                unregister = token.on_cancel(self.proc.kill) if token is not None else (lambda: None)
+                try:
+                    self.proc.stdin.write(name.encode("utf-8") + b"\n")
+                    self.proc.stdin.flush()
+                    header = self.proc.stdout.readline()
+                    if not header:
+                        raise EOFError
+                    # "<name> missing" / "<name> ambiguous"; name may itself contain spaces.
+                    if header.rstrip(b"\n").rsplit(b" ", 1)[-1] in (b"missing", b"ambiguous"):
+                        return None
+                    sha, kind, size = header.split()
+                    sha, kind, size = sha.decode(), kind.decode(), int(size)
+                    keep = size if max_bytes is None else min(size, max_bytes)
+                    data, left = bytearray(), size + 1  # the content is followed by a newline
+                    while left:
+                        buf = self.proc.stdout.read(min(left, _READ_CHUNK))
+                        if not buf:
+                            raise EOFError
+                        left -= len(buf)
+                        if len(data) < keep:
+                            data += buf[: keep - len(data)]
+                    return sha, kind, size, bytes(data)
+                except (OSError, EOFError, ValueError):
+                    stderr = self._stop()  # mid-object: the stream can't be resynced
+                    cancel.check()
+                    if attempt:
+                        raise RuntimeError(stderr or f"git cat-file exited unexpectedly in {self.repo}")
+                finally:
+                    unregister()
+                    self.used = time.monotonic()
+        return None
+
+    def close_if_idle(self, now: float) -> bool:
+        """Stop the process if unused for idle_s; True if it is (now) stopped."""
+        if self.proc is None:
+            return True
+        if now - self.used < self.idle_s or not self.lock.acquire(blocking=False):
+            return False
+        try:
+            self._stop()
+        finally:
+            self.lock.release()
+        return True
+
+_WORKERS: Dict[str, _CatFile] = {}
+_WORKERS_LOCK = threading.Lock()
+_REAPER: Optional[threading.Thread] = None
+
+def _reap() -> None:
+    # Stops idle cat-file processes; exits once none is running.
+    global _REAPER
+    while True:
+        with _WORKERS_LOCK:
+            workers = list(_WORKERS.values())
+        time.sleep(max(1.0, min(30.0, min(w.idle_s for w in workers) / 2)))
+        now = time.monotonic()
+        stopped = [w.close_if_idle(now) for w in workers]
+        with _WORKERS_LOCK:
+            if all(stopped) and len(_WORKERS) == len(workers) and all(w.proc is None for w in workers):
+                _REAPER = None
+                return
+
+def _cat_file(repo: str, idle_s: float) -> _CatFile:
+    global _REAPER
+    key = os.path.realpath(_abs(repo))
+    if not os.path.isdir(key):
+        raise FileNotFoundError(f"Directory not found: {key}")
+    with _WORKERS_LOCK:
+        w = _WORKERS.get(key)
+        if w is None:
+            w = _WORKERS[key] = _CatFile(key)
+        w.idle_s = idle_s
+        if _REAPER is None:
+            _REAPER = threading.Thread(target=_reap, name="git-cat-file-reaper", daemon=True)
+            _REAPER.start()
+    return w
+
+def _object(repo: str, name: str, max_bytes: Optional[int], idle_s: float) -> Tuple[str, str, int, bytes]:
+    obj = _cat_file(repo, idle_s).read(name, max_bytes)
+    if obj is None:
+        raise FileNotFoundError(f"Not found in {repo}: {name}")
+    return obj
+
+def show(repo: str, path: str = "", rev: str = "HEAD", max_bytes: int = 1 << 20, idle_s: float = 300.0) -> str:
+    """
+    A file as of rev without checking it out (path relative to the repo
+    root), or with no path the commit/tag object rev itself.
+    """
+    name = f"{rev}:{path.strip('/')}" if path else rev
+    _, kind, size, data = _object(repo, name, max_bytes, idle_s)
+    if kind == "tree":
+        raise ValueError(f"{name} is a directory; use git_ls_tree")
+    if b"\0" in data[:8000]:
+        return f"(binary {kind}, {size} bytes)"
+    text = data.decode("utf-8", errors="replace")
+    if size > len(data):
+        text += f"\n... truncated at {len(data)} of {size} bytes"
+    return text
+
+def _entries(data: bytes, oid_len: int) -> List[Tuple[str, str, str]]:
+    # Tree object body: "<mode> <name>\0<raw object id>" per entry.
+    out, i = [], 0
+    while i < len(data):
+        sp = data.index(b" ", i)
+        nul = data.index(b"\0", sp)
+        oid = data[nul + 1 : nul + 1 + oid_len].hex()
+        out.append((data[i:sp].decode(), data[sp + 1 : nul].decode("utf-8", errors="replace"), oid))
+        i = nul + 1 + oid_len
+    return out
+
+def ls_tree(
+    repo: str,
+    path: str = "",
+    rev: str = "HEAD",
+    recursive: bool = False,
+    max_entries: int = 5000,
+    idle_s: float = 300.0,
+) -> str:
+    """`git ls-tree [-r] rev path/` from the object store: "<mode> <type> <id>\t<path>" lines."""
+    base = path.strip("/")
+    sha, kind, _, data = _object(repo, f"{rev}:{base}", None, idle_s)
+    if kind != "tree":
+        raise ValueError(f"{rev}:{base} is a {kind}, not a directory")
+    oid_len = len(sha) // 2  # 20 (SHA-1) or 32 (SHA-256)
+
+    def walk(prefix: str, entries: List[Tuple[str, str, str]]):
+        for mode, name, oid in entries:
+            mode = mode.zfill(6)
+            kind = "tree" if mode == "040000" else "commit" if mode == "160000" else "blob"
+            full = f"{prefix}/{name}" if prefix else name
+            if recursive and kind == "tree":
+                cancel.check()
+                yield from walk(full, _entries(_object(repo, oid, None, idle_s)[3], oid_len))
+            else:
+                yield f"{mode} {kind} {oid}\t{full}"
+
+    lines: List[str] = []
+    for line in walk(base, _entries(data, oid_len)):
+        if len(lines) == max_entries:
+            lines.append(f"... truncated to {max_entries} entries")
+            break
+        lines.append(line)
+    return "\n".join(lines) if lines else "(empty tree)"
+
+# --- status across many repos ----------------------------------------------
+
+_STATUS_POOL = SharedPool(lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="mcp-git-status"))
+_FSMONITOR: Optional[bool] = None
+
+def _fsmonitor_available() -> bool:
+    # The builtin fsmonitor daemon exists on macOS and Windows from git 2.37.
+    global _FSMONITOR
+    if _FSMONITOR is None:
+        ok = sys.platform in ("darwin", "win32")
+        if ok:
+            m = re.search(r"(\d+)\.(\d+)", cancel.run(["git", "version"], text=True, capture_output=True).stdout or "")
+            ok = m is not None and (int(m.group(1)), int(m.group(2))) >= (2, 37)
+        _FSMONITOR = ok
+    return _FSMONITOR
+
+def find_repos(root: str, max_depth: int = 3, prune: Optional[Iterable[str]] = None, max_repos: int = 500) -> Tuple[List[str], bool]:
+    """
+    (repositories, truncated): directories holding .git at most max_depth
+    levels below root, sorted, and whether the search stopped at max_repos
+    with directories left to look at. A repository is not searched further,
+    so submodules and worktrees nested in it are left out; symlinked
+    directories aren't followed.
+    """
+    from mcp_local.walk import DEFAULT_PRUNE
+
+    prune = DEFAULT_PRUNE if prune is None else frozenset(prune)
+    out: List[str] = []
+    stack = [(_abs(root), 0)]
+    while stack:
+        d, depth = stack.pop()
+        try:
+            with os.scandir(d) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if any(e.name == ".git" for e in entries):
+            if len(out) == max_repos:
+                return sorted(out), True
+            out.append(d)
+            continue
+        if depth < max_depth:
+            stack.extend(
+                (e.path, depth + 1)
+                for e in sorted(entries, key=lambda e: e.name, reverse=True)
+                if e.name not in prune and e.is_dir(follow_symlinks=False)
+            )
+    return sorted(out), False
+
+def _parse_status(out: str) -> dict:
+    # `git status --porcelain=v2 --branch -z`: "# branch.*" headers, then one
+    # NUL-terminated record per path (renames carry the old path as an extra field).
+    info = {"branch": None, "upstream": None, "ahead": 0, "behind": 0,
+            "staged": 0, "modified": 0, "untracked": 0, "conflicts": 0}
+    oid = ""
+    fields = iter(out.split("\0"))
+    for f in fields:
+        if f.startswith("# branch.oid "):
+            oid = f[13:]
+        elif f.startswith("# branch.head "):
+            info["branch"] = f[14:]
+        elif f.startswith("# branch.upstream "):
+            info["upstream"] = f[18:]
+        elif f.startswith("# branch.ab "):
+            ahead, behind = f[12:].split()
+            info["ahead"], info["behind"] = int(ahead), -int(behind)
+        elif f[:2] in ("1 ", "2 "):
+            info["staged"] += f[2] != "."
+            info["modified"] += f[3] != "."
+            if f[0] == "2":
+                next(fields, None)
+        elif f.startswith("u "):
+            info["conflicts"] += 1
+        elif f.startswith("? "):
+            info["untracked"] += 1
+    if info["branch"] == "(detached)":
+        info["branch"] = f"(detached at {oid[:12]})"
+    info["clean"] = not (info["staged"] or info["modified"] or info["untracked"] or info["conflicts"])
+    return info
+
+def _status_one(repo: str, git_config: List[str], token) -> dict:
+    if token is not None and token.cancelled:
+        raise cancel.Cancelled()
+    cmd = ["git"] + git_config + ["status", "--porcelain=v2", "--branch", "-z"]
+    if token is not None:
+        with cancel.bind(token):  # a cancel kills this repo's git too
+            proc = cancel.run(cmd, cwd=repo, text=True, capture_output=True)
+    else:
+        proc = cancel.run(cmd, cwd=repo, text=True, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError((proc.stderr or "").strip() or f"git status exited {proc.returncode}")
+    return _parse_status(proc.stdout or "")
+
+def status_many(
+    root: str,
+    max_depth: int = 3,
+    max_repos: int = 500,
+    workers: int = 8,
+    untracked_cache: bool = True,
+    fsmonitor: bool = False,
+    prune: Optional[Iterable[str]] = None,
+) -> str:
+    """
+    Summaries of every repository under root (see find_repos), from `git
+    status` run on a thread pool: branch, upstream, ahead/behind and counts of
+    staged, modified, untracked and conflicted paths.
+    """
+    repos, truncated = find_repos(root, max_depth, prune, max_repos)
+    git_config: List[str] = []
+    if untracked_cache:
+        git_config += ["-c", "core.untrackedCache=true"]
+    if fsmonitor and _fsmonitor_available():
+        git_config += ["-c", "core.fsmonitor=true"]
+    token = cancel.current()
+    base = _abs(root)
+    out = []
+    with _STATUS_POOL.use(workers) as pool:
+        futures = [pool.submit(_status_one, r, git_config, token) for r in repos]
+        for repo, fut in zip(repos, futures):
+            entry = {"repo": os.path.relpath(repo, base)}
+            try:
+                entry.update(fut.result())
+            except cancel.Cancelled:
+                for f in futures:
+                    f.cancel()
+                raise
+            except Exception as e:
+                entry["error"] = f"{type(e).__name__}: {e}"
+            out.append(entry)
+    cancel.check()
+    return json.dumps({"root": base, "repos": out, "truncated": truncated}, ensure_ascii=False)
@@ -0,0 +1,205 @@
+import hashlib, json, os, stat, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from mcp_local import cancel
+from mcp_local.pools import SharedPool
+
+CHUNK = 1 << 20
+ALGORITHMS = {
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+    "blake2s": lambda: hashlib.blake2s(),
+}
+# A file modified within this window of being hashed may change again without
+# its mtime moving (coarse timestamps); such digests are returned, not stored.
+_RACY_NS = 2_000_000_000
+
+class HashCache:
+    """Digests on disk (sqlite), keyed by (dev, ino, size, mtime_ns, algorithm)."""
+
+    def __init__(self, path: str) -> None:
+        import sqlite3
+
+        path = os.path.expanduser(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, algo TEXT,"
+            " digest TEXT NOT NULL, seen INTEGER NOT NULL,"
+            " PRIMARY KEY (dev, ino, size, mtime_ns, algo)) WITHOUT ROWID"
+        )
+        # Entries not looked up for 30 days belong to files that are long gone.
+        self._db.execute("DELETE FROM hashes WHERE seen < ?", (int(time.time()) - 30 * 86400,))
+
+    def get_many(self, keys: list) -> list:
+        # Hits refresh `seen` for the purge, at most once a day per entry so a
+        # warm lookup stays read-only.
+        now = int(time.time())
+        with self._lock:
+            cur = self._db.cursor()
+            cur.execute("BEGIN")
+            try:
+                out, stale = [], []
+                for k in keys:
+                    row = cur.execute(
+                        "SELECT digest, seen FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algo=?", k
+                    ).fetchone()
+                    out.append(row[0] if row else None)
+                    if row and row[1] < now - 86400:
+                        stale.append((now,) + tuple(k))
+                if stale:
+                    cur.executemany(
+                        "UPDATE hashes SET seen=? WHERE dev=? AND ino=? AND size=? AND mtime_ns=? AND algo=?", stale
+                    )
+                cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+            return out
+
+    def put_many(self, rows: list) -> None:
+        if not rows:
+            return
+        now = int(time.time())
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [k + (digest, now) for k, digest in rows],
+            )
+            self._db.execute("COMMIT")
+
+_CACHES: dict[str, HashCache] = {}
+_CACHES_LOCK = threading.Lock()
+_POOL = SharedPool(lambda n: ThreadPoolExecutor(max_workers=n, thread_name_prefix="mcp-hash"))
+
+def _cache(path: Optional[str]) -> Optional[HashCache]:
+    if not path:
+        return None
+    with _CACHES_LOCK:
+        c = _CACHES.get(path)
+        if c is None:
+            c = _CACHES[path] = HashCache(path)
+        return c
+
+def _i64(n: int) -> int:
+    # sqlite integers are signed 64-bit; some filesystems use the full u64 inode range.
+    return n - (1 << 64) if n >= 1 << 63 else n
+
+def _key(st: os.stat_result, algorithm: str) -> tuple:
+    return (_i64(st.st_dev), _i64(st.st_ino), st.st_size, st.st_mtime_ns, algorithm)
+
+def _hash_stable(path: str, key: tuple, token) -> tuple:
+    """(digest, whether it may be cached): the file must not have changed while hashed."""
+    digest = hash_file(path, key[4], token)
+    try:
+        unchanged = _key(os.stat(path), key[4]) == key
+    except OSError:
+        unchanged = False
+    return digest, unchanged and time.time_ns() - key[3] > _RACY_NS
+
+def hash_file(path: str, algorithm: str = "blake2b", token=None) -> str:
+    h = ALGORITHMS[algorithm]()
+    buf = bytearray(CHUNK)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            if token is not None and token.cancelled:
+                raise cancel.Cancelled()
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])  # hashlib drops the GIL for large updates
+    return h.hexdigest()
+
+def _walk_files(root: str, pattern: str, prune: Optional[list]):
+    from mcp_local import index
+    from mcp_local.walk import walk
+
+    idx = index.current()
+    return walk(root, pattern, sort=True, prune=prune, listdir=idx.listdir if idx else None)
+
+def hash_paths(
+    policy,
+    paths: Optional[list] = None,
+    root: Optional[str] = None,
+    pattern: str = "**/*",
+    algorithm: str = "blake2b",
+    max_files: int = 10000,
+    cache_path: Optional[str] = None,
+    workers: int = 4,
+    prune: Optional[list] = None,
+) -> str:
+    """
+    Hash paths, or the files under root matching pattern, in parallel.
+    Unchanged files (same dev/ino/size/mtime_ns) are answered from the
+    on-disk cache with a single stat. Returns JSON {"algorithm", "files":
+    {path: digest or {"error"}}, "hashed", "cached", "truncated"}.
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"algorithm must be one of {sorted(ALGORITHMS)}")
+    if (paths is None) == (root is None):
+        raise ValueError("Pass exactly one of paths or root")
+    source = paths if root is None else _walk_files(os.path.expanduser(root), pattern, prune)
+    truncated = False
+    result: dict = {}
+    keys, keyed = [], []  # cache key and (path, resolved path) per regular file
+    for p in source:
+        if len(keyed) >= max_files:
+            truncated = True
+            break
+        try:
+            # Symlinked files are hashed through, so the target must be allowed too.
+            rp = policy.check(p)
+            st = os.stat(rp)
+        except (OSError, PermissionError) as e:
+            result[p] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            if root is None:
+                result[p] = {"error": "not a regular file"}
+            continue  # directories/sockets in a subtree are simply skipped
+        keys.append(_key(st, algorithm))
+        keyed.append((p, rp))
+        result[p] = None
+
+    cache = _cache(cache_path)
+    hits = cache.get_many(keys) if cache else [None] * len(keys)
+    todo = []  # (path, resolved path, cache key) still to hash
+    for (p, rp), k, digest in zip(keyed, keys, hits):
+        if digest is None:
+            todo.append((p, rp, k))
+        else:
+            result[p] = digest
+
+    token = cancel.current()
+    fresh = []
+    with _POOL.use(workers) as pool:
+        futures = [(p, k, pool.submit(_hash_stable, rp, k, token)) for p, rp, k in todo]
+        for p, k, fut in futures:
+            try:
+                result[p], stable = fut.result()
+            except cancel.Cancelled:
+                raise
+            except OSError as e:
+                result[p] = {"error": f"{type(e).__name__}: {e}"}
+                continue
+            if stable:
+                fresh.append((k, result[p]))
+    cancel.check()
+    if cache:
+        cache.put_many(fresh)
+    return json.dumps(
+        {
+            "algorithm": algorithm,
+            "files": result,
+            "hashed": len(todo),
+            "cached": len(keys) - len(todo),
+            "truncated": truncated,
+        },
+        ensure_ascii=False,
+    )
@@ -1,5 +1,69 @@
 import difflib
+import heapq
+import math
+import os
 import pathlib
+import stat
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+from mcp_local import cancel
+from mcp_local.pools import SharedPool
+
+
+class _Scorer:
+    """
+    difflib ratio of query against candidates, skipped when it provably
+    can't reach a threshold. ratio = 2*M/T with M matched characters, and
+    M is bounded by (cheapest first): the shorter length, the candidate
+    characters that occur in the query at all, the per-character multiset
+    overlap (difflib's quick_ratio) and the longest common subsequence,
+    since matching blocks are an in-order common subsequence. Each bound is
+    exact, so a skipped candidate could never have made the results.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self.qlen = len(query)
+        self.qcount = Counter(query)
+        self.foreign = {ord(c): None for c in self.qcount}  # str.translate deletes query chars
+        self.matcher = difflib.SequenceMatcher(None, query, "")
+        # Bit i of masks[c] is set where query[i] == c (bit-parallel LCS, Hyyrö 2004).
+        self.masks: dict = {}
+        for i, c in enumerate(query):
+            self.masks[c] = self.masks.get(c, 0) | (1 << i)
+        self.full = (1 << self.qlen) - 1
+
+    def score(self, cand: str, threshold: float) -> Optional[float]:
+        clen = len(cand)
+        total = self.qlen + clen
+        if not total:
+            return None
+        if 2.0 * min(self.qlen, clen) / total < threshold:
+            return None
+        shared = clen - len(cand.translate(self.foreign))
+        if 2.0 * min(self.qlen, shared) / total < threshold:
+            return None
+        qcount = self.qcount
+        overlap = sum(min(n, qcount[c]) for c, n in Counter(cand).items() if c in qcount)
+        if 2.0 * overlap / total < threshold:
+            return None
+        if 2.0 * self._lcs(cand) / total < threshold:
+            return None
+        self.matcher.set_seq2(cand)
+        return self.matcher.ratio()
+
+    def _lcs(self, cand: str) -> int:
+        v = full = self.full
+        masks = self.masks
+        for c in cand:
+            m = masks.get(c)
+            if m:
+                u = v & m
+                v = ((v + u) | (v - u)) & full
+        return self.qlen - v.bit_count()
 
 
 def search_file(
@@ -24,18 +88,72 @@ def search_file(
         raise FileNotFoundError(f"File not found: {p}")
 
     text = p.read_text(encoding="utf-8", errors="ignore")
-    lines = text.splitlines()
+    results = search_lines(text.splitlines(), query, min_probability, max_results)
+    if not results:
+        return f"(no matches >= {min_probability:.2f})"
 
+    formatted = [
+        f"{p}:{line_no}:{score * 100:.1f}%: {snippet}"
+        for score, line_no, snippet in results
+    ]
+    return "\n".join(formatted)
+
+
+def search_file_many(
+    path: str,
+    queries: List[str],
+    min_probability: float = 0.5,
+    max_results: int = 20,
+) -> str:
+    """search_file for several phrasings of a query: the file is read once, results are grouped per query."""
+    if not queries or not all(q.strip() for q in queries):
+        raise ValueError("queries must be non-empty strings")
+    if not 0.0 <= min_probability <= 1.0:
+        raise ValueError("min_probability must be between 0.0 and 1.0")
+    if max_results < 1:
+        raise ValueError("max_results must be at least 1")
+
+    p = pathlib.Path(path).expanduser()
+    if not p.is_file():
+        raise FileNotFoundError(f"File not found: {p}")
+
+    text = p.read_text(encoding="utf-8", errors="ignore")
+    blocks = []
+    for query, results in zip(queries, search_lines_many(text.splitlines(), queries, min_probability, max_results)):
+        lines = [f"## {query}"]
+        lines += [f"{p}:{line_no}:{score * 100:.1f}%: {snippet}" for score, line_no, snippet in results]
+        if not results:
+            lines.append(f"(no matches >= {min_probability:.2f})")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def search_lines(
+    lines: list,
+    query: str,
+    min_probability: float,
+    max_results: int,
+    deadline: Optional[float] = None,
+) -> list:
+    """
+    Top max_results (score, 1-based line, snippet), best first, ties by line.
+    Past deadline (time.monotonic()) the lines seen so far are ranked.
+    """
     # Use a small multi-line window to better match longer queries.
     window_size = max(1, min(5, len(query) // 80 + 1))
+    scorer = _Scorer(query)
 
-    def score(candidate: str) -> float:
-        return difflib.SequenceMatcher(None, query, candidate).ratio()
-
-    results = []
-    for idx, _ in enumerate(lines):
+    # Min-heap of (score, -line_no, text): heap[0] is the weakest kept result.
+    # Lines arrive in order, so a later line only displaces it with a higher score.
+    heap: list = []
+    threshold = min_probability
+    for idx, line in enumerate(lines):
+        if idx % 1024 == 0:
+            cancel.check()
+            if deadline is not None and time.monotonic() > deadline:
+                break
         # Evaluate the current line and a short window starting at this line.
-        candidates = [lines[idx]]
+        candidates = [line]
         if window_size > 1:
             chunk = " ".join(lines[idx : idx + window_size])
             if chunk:
@@ -44,25 +162,422 @@ def search_file(
         best_score = 0.0
         best_text = ""
         for cand in candidates:
-            s = score(cand)
-            if s > best_score:
+            s = scorer.score(cand, max(threshold, best_score))
+            if s is not None and s > best_score:
                 best_score = s
                 best_text = cand
 
-        if best_score >= min_probability:
-            snippet = best_text.strip()
-            if len(snippet) > 240:
-                snippet = snippet[:237] + "..."
-            results.append((best_score, idx + 1, snippet))
+        if best_score < min_probability:
+            continue
+        if len(heap) < max_results:
+            heapq.heappush(heap, (best_score, -(idx + 1), best_text))
+        elif best_score > heap[0][0]:
+            heapq.heapreplace(heap, (best_score, -(idx + 1), best_text))
+        else:
+            continue
+        if len(heap) == max_results:
+            # A full heap only admits strictly better scores from here on.
+            threshold = max(min_probability, math.nextafter(heap[0][0], 2.0))
 
-    if not results:
-        return f"(no matches >= {min_probability:.2f})"
+    return _ranked(heap)
 
-    results.sort(key=lambda r: (-r[0], r[1]))
-    results = results[:max_results]
 
-    formatted = [
-        f"{p}:{line_no}:{score * 100:.1f}%: {snippet}"
-        for score, line_no, snippet in results
+def _ranked(heap: list) -> list:
+    results = []
+    for score, neg_line, text in sorted(heap, key=lambda r: (-r[0], -r[1])):
+        snippet = text.strip()
+        if len(snippet) > 240:
+            snippet = snippet[:237] + "..."
+        results.append((score, -neg_line, snippet))
+    return results
+
+
+_BOUND_BLOCK = 1 << 14  # lines per block of the count matrices
+
+
+def _ratio_bounds(np, lines: list, queries: List[str], windows: List[int], min_probability: float) -> list:
+    """
+    Per query: (line indexes, bounds) of the lines whose candidates (the line,
+    or its window of windows[j] lines) could reach min_probability. With C the
+    counts of the queries' characters in a candidate, P its 0/1 presence and
+    Q the queries' counts, C @ (Q > 0) and P @ Q both bound the multiset
+    overlap M in one product for all queries; lines that pass get the exact
+    M (the sum of per-character minimums). 2 * M / total bounds the ratio.
+    """
+    alphabet = sorted(set("".join(queries)))
+    codes = np.array([ord(c) for c in alphabet], dtype=np.uint32)
+    space = alphabet.index(" ") if " " in alphabet else -1
+    qc = np.array([[q.count(c) for q in queries] for c in alphabet], dtype=np.float64)
+    qp = (qc > 0).astype(np.float64)
+    qlen = np.array([len(q) for q in queries], dtype=np.float64)
+    qcols = [np.nonzero(qp[:, j])[0] for j in range(len(queries))]
+    nv, n = len(alphabet), len(lines)
+    out: list = [([], []) for _ in queries]
+    pad = max(windows) - 1
+
+    def ratio(overlap, clen, qn):
+        total = clen + qn
+        return np.where(total > 0, 2.0 * np.minimum(np.minimum(overlap, clen), qn) / np.maximum(total, 1), 0.0)
+
+    for a in range(0, n, _BOUND_BLOCK):
+        cancel.check()
+        blk = lines[a : a + _BOUND_BLOCK + pad]  # windows may run into the next block
+        m = len(blk)
+        lens = np.fromiter(map(len, blk), dtype=np.int64, count=m)
+        cp = np.frombuffer("".join(blk).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        col = np.minimum(np.searchsorted(codes, cp), nv - 1)
+        hit = codes[col] == cp
+        row = np.repeat(np.arange(m), lens)[hit]
+        counts = np.bincount(row * nv + col[hit], minlength=m * nv).reshape(m, nv).astype(np.float64)
+        rows = min(_BOUND_BLOCK, n - a)
+
+        # Candidates per window size: (counts, lengths) of the line (1) or window.
+        cands = {1: (counts[:rows], lens[:rows].astype(np.float64))}
+        if pad:
+            csum = np.vstack([np.zeros((1, nv)), np.cumsum(counts, axis=0)])
+            lsum = np.concatenate([[0], np.cumsum(lens)])
+            start = np.arange(rows)
+            for w in set(windows) - {1}:
+                end = np.minimum(start + w, m)
+                wc = csum[end] - csum[start]
+                joins = (end - start - 1).astype(np.float64)  # " ".join adds a space per seam
+                if space >= 0:
+                    wc[:, space] += joins
+                cands[w] = (wc, (lsum[end] - lsum[start]).astype(np.float64) + joins)
+        loose = {
+            w: ratio(np.minimum(c @ qp, (c > 0) @ qc), clen[:, None], qlen) for w, (c, clen) in cands.items()
+        }
+        for j, w in enumerate(windows):
+            sizes = (1, w) if w > 1 else (1,)
+            ub = np.max([loose[s][:, j] for s in sizes], axis=0)
+            keep = np.nonzero(ub >= min_probability)[0]
+            qj, cols = qc[qcols[j], j], qcols[j]
+            exact = np.max(
+                [ratio(np.minimum(cands[s][0][keep][:, cols], qj).sum(1), cands[s][1][keep], qlen[j]) for s in sizes],
+                axis=0,
+            )
+            sel = exact >= min_probability
+            out[j][0].append(keep[sel] + a)
+            out[j][1].append(exact[sel])
+    return [(np.concatenate(ix), np.concatenate(ub)) for ix, ub in out]
+
+
+def search_lines_many(
+    lines: list,
+    queries: List[str],
+    min_probability: float,
+    max_results: int,
+    deadline: Optional[float] = None,
+) -> List[list]:
+    """
+    search_lines for each query, same results, sharing one pass over lines.
+    With NumPy, two matrix products bound every query's ratio on every line;
+    each query then scores lines in falling bound order and stops at the
+    first bound below its k-th best score, so most lines are never scored.
+    Without NumPy the queries run search_lines one after another.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [search_lines(lines, q, min_probability, max_results, deadline) for q in queries]
+    if not lines or not queries:
+        return [[] for _ in queries]
+    windows = [max(1, min(5, len(q) // 80 + 1)) for q in queries]  # as in search_lines
+    results = []
+    for query, window_size, (ix, ub) in zip(queries, windows, _ratio_bounds(np, lines, queries, windows, min_probability)):
+        scorer = _Scorer(query)
+        # Lines come best bound first, not in order: ties on score are broken
+        # by line explicitly, so a full heap admits an equal score too.
+        heap: list = []
+        threshold = min_probability
+        order = np.lexsort((ix, -ub))
+        for n, pos in enumerate(order.tolist()):
+            if ub[pos] < threshold:
+                break  # no later line can qualify either
+            if n % 1024 == 0:
+                cancel.check()
+                if deadline is not None and time.monotonic() > deadline:
+                    break
+            idx = int(ix[pos])
+            candidates = [lines[idx]]
+            if window_size > 1:
+                chunk = " ".join(lines[idx : idx + window_size])
+                if chunk:
+                    candidates.append(chunk)
+            best_score = 0.0
+            best_text = ""
+            for cand in candidates:
+                s = scorer.score(cand, max(threshold, best_score))
+                if s is not None and s > best_score:
+                    best_score = s
+                    best_text = cand
+            if best_score < min_probability:
+                continue
+            if len(heap) < max_results:
+                heapq.heappush(heap, (best_score, -(idx + 1), best_text))
+            elif (best_score, -(idx + 1)) > heap[0][:2]:
+                heapq.heapreplace(heap, (best_score, -(idx + 1), best_text))
+            else:
+                continue
+            if len(heap) == max_results:
+                threshold = max(min_probability, heap[0][0])
+        results.append(_ranked(heap))
+    return results
+
+
+
+# --- tree mode ---------------------------------------------------------------
+
+# A result across files: (score, -file index, -line, snippet). Bigger sorts
+# better, so ties go to the earlier file, then the earlier line.
+_Hit = Tuple[float, int, int, str]
+
+BATCH_BYTES = 1 << 20  # files per worker task are grouped up to about this much text
+_INLINE_BYTES = 512 << 10  # smaller trees aren't worth the round trips to the pool
+
+def _new_pool(workers: int) -> ProcessPoolExecutor:
+    import multiprocessing
+
+    # spawn, not fork: the server process runs many threads.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+_POOL = SharedPool(_new_pool)
+
+
+def _push(heap: List[_Hit], hit: _Hit, k: int) -> None:
+    if len(heap) < k:
+        heapq.heappush(heap, hit)
+    elif hit[:3] > heap[0][:3]:
+        heapq.heapreplace(heap, hit)
+
+
+def _read_text(path: str, max_file_bytes: int) -> Optional[str]:
+    """File text, or None for unreadable, oversized or binary (NUL in the first 8 KiB) files."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(max_file_bytes + 1)
+    except OSError:
+        return None
+    if len(data) > max_file_bytes or b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="ignore")
+
+
+def _search_batch(
+    batch: List[Tuple[int, str]],
+    query: str,
+    floor: float,
+    max_results: int,
+    deadline: float,
+    max_file_bytes: int,
+) -> Tuple[List[_Hit], int]:
+    """Worker task: the batch's top max_results hits scoring >= floor, and files searched."""
+    heap: List[_Hit] = []
+    searched = 0
+    for i, path in batch:
+        if time.monotonic() > deadline:
+            break
+        searched += 1
+        text = _read_text(path, max_file_bytes)
+        if text is None:
+            continue
+        for score, line, snippet in search_lines(text.splitlines(), query, floor, max_results, deadline):
+            _push(heap, (score, -i, -line, snippet), max_results)
+        if len(heap) == max_results:
+            floor = max(floor, heap[0][0])
+    return heap, searched
+
+
+def _run_inline(batches, args: tuple, floor: Callable[[], float], saturated: Callable[[], bool]):
+    for batch in batches:
+        if saturated():
+            return
+        yield _search_batch(batch, args[0], floor(), *args[1:])
+
+
+def _run_pool(batches, args: tuple, floor: Callable[[], float], saturated: Callable[[], bool], workers: int):
+    # Only a few tasks are queued at a time, so each new one starts from the
+    # best cutoff known so far instead of min_probability. Batches go out in
+    # file order: once saturated() the unsent ones can't place, but those in
+    # flight (earlier files) still can and are waited for.
+    with _POOL.use(workers) as pool:
+        todo = iter(batches)
+        pending: set = set()
+        try:
+            while True:
+                while len(pending) < 2 * workers and not saturated():
+                    batch = next(todo, None)
+                    if batch is None:
+                        break
+                    pending.add(pool.submit(_search_batch, batch, args[0], floor(), *args[1:]))
+                if not pending:
+                    return
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                cancel.check()
+                for fut in done:
+                    yield fut.result()
+        except Exception as e:
+            from concurrent.futures.process import BrokenProcessPool
+
+            if isinstance(e, BrokenProcessPool):
+                _POOL.discard(pool)
+                raise RuntimeError(f"mgrep worker process died: {e}") from None
+            raise
+        finally:
+            # Stopped early (budget, cancel, saturated): drop what hasn't started.
+            for fut in pending:
+                fut.cancel()
+
+
+def _tree_files(policy, root: str, include: List[str], exclude: List[str], prune, max_files: int):
+    """([(path, size)] in walk order, whether max_files cut the list short)."""
+    from mcp_local import index
+    from mcp_local.walk import path_matcher, walk
+
+    idx = index.current()
+    listdir = idx.listdir if idx else None
+    excluded = path_matcher(exclude)
+    base = root.rstrip(os.sep) or os.sep
+    seen: set = set()
+    files = []
+    for pattern in include:
+        for path in walk(base, pattern, sort=True, prune=prune, listdir=listdir):
+            if path in seen:
+                continue
+            seen.add(path)
+            if excluded(path[len(base):].lstrip(os.sep).replace(os.sep, "/")):
+                continue
+            try:
+                st = os.stat(policy.check(path))  # symlinked files must point inside allowed_roots
+            except (OSError, PermissionError):
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if len(files) >= max_files:
+                return files, True
+            files.append((path, st.st_size))
+    return files, False
+
+
+def search_tree(
+    policy,
+    root: str,
+    query: str,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    min_probability: float = 0.5,
+    max_results: int = 20,
+    workers: int = 4,
+    time_budget_s: float = 30.0,
+    max_files: int = 20000,
+    max_file_bytes: int = 8 << 20,
+    prune: Optional[list] = None,
+) -> str:
+    """
+    mgrep over the files under root matching include (minus exclude), scored
+    on a process pool. Per-batch top-k lists are merged into one ranking,
+    the same one a single-file search over each file would give. The
+    search returns what it has at time_budget_s, and stops early once
+    max_results exact (100%) matches are in hand.
+    """
+    if not query.strip():
+        raise ValueError("query must not be empty")
+    if not 0.0 <= min_probability <= 1.0:
+        raise ValueError("min_probability must be between 0.0 and 1.0")
+    if max_results < 1:
+        raise ValueError("max_results must be at least 1")
+    root = os.path.expanduser(root)
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Directory not found: {root}")
+
+    deadline = time.monotonic() + time_budget_s
+    files, truncated = _tree_files(policy, root, include or ["**/*"], exclude or [], prune, max_files)
+    lines = search_files(files, query, min_probability, max_results, workers, deadline, max_file_bytes)
+    if truncated:
+        lines.append(f"... (only the first max_files={max_files} files were searched)")
+    return "\n".join(lines)
+
+
+def search_files(
+    files: List[Tuple[str, int]],
+    query: str,
+    min_probability: float,
+    max_results: int,
+    workers: int,
+    deadline: float,
+    max_file_bytes: int,
+) -> List[str]:
+    """
+    Output lines for [(path, size)] searched in order (ties go to earlier
+    files), with a trailer if the deadline (time.monotonic()) cut it short.
+    """
+    paths = [p for p, _ in files]
+    batches: List[List[Tuple[int, str]]] = [[]]
+    size = 0
+    for i, (path, n) in enumerate(files):
+        if batches[-1] and size + n > BATCH_BYTES:
+            batches.append([])
+            size = 0
+        batches[-1].append((i, path))
+        size += n
+    total = sum(n for _, n in files)
+
+    heap: List[_Hit] = []
+
+    def floor() -> float:
+        return max(min_probability, heap[0][0]) if len(heap) == max_results else min_probability
+
+    def saturated() -> bool:
+        # max_results exact (100%) matches: no later file can displace any.
+        return len(heap) == max_results and heap[0][0] >= 1.0
+
+    args = (query, max_results, deadline, max_file_bytes)
+    workers = min(workers, os.cpu_count() or 1)
+    if workers <= 1 or total < _INLINE_BYTES or len(batches) == 1:
+        results = _run_inline(batches, args, floor, saturated)
+    else:
+        results = _run_pool(batches, args, floor, saturated, workers)
+    searched = 0
+    stopped = False
+    try:
+        for hits, n in results:
+            searched += n
+            for hit in hits:
+                _push(heap, hit, max_results)
+            if time.monotonic() > deadline:
+                stopped = True
+                break
+    finally:
+        results.close()
+
+    lines = [
+        f"{paths[-neg_i]}:{-neg_line}:{score * 100:.1f}%: {snippet}"
+        for score, neg_i, neg_line, snippet in sorted(heap, reverse=True)
     ]
-    return "\n".join(formatted)
+    if not lines:
+        lines.append(f"(no matches >= {min_probability:.2f})")
+    if stopped:
+        lines.append(f"... (stopped: time budget reached; searched {searched} of {len(files)} files)")
+    return lines
+
+
+def search(
+    policy,
+    query: Union[str, List[str]],
+    path: Optional[str] = None,
+    root: Optional[str] = None,
+    min_probability: float = 0.5,
+    max_results: int = 20,
+    **tree_opts,
+) -> str:
+    """mgrep_search entry point: one file (path) or a directory tree (root); a list of queries needs path."""
+    if (path is None) == (root is None):
+        raise ValueError("Pass exactly one of path or root")
+    if not isinstance(query, str):
+        if path is None:
+            raise ValueError("A list of queries searches one file: pass path")
+        return search_file_many(path, query, min_probability, max_results)
+    if path is not None:
+        return search_file(path, query, min_probability, max_results)
+    return search_tree(policy, root, query, min_probability=min_probability, max_results=max_results, **tree_opts)
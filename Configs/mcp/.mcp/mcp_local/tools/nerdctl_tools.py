@@ -1,10 +1,11 @@
-import subprocess, shutil, json
+import shutil, json
+from mcp_local import cancel
 
 def local(config: dict, args: list[str]) -> str:
     nerdctl = config.get("nerdctl", {}).get("local_path", "nerdctl")
     if shutil.which(nerdctl) is None:
         raise RuntimeError(f"nerdctl not found in PATH (configured as {nerdctl}). Install nerdctl or update config.")
-    proc = subprocess.run([nerdctl] + list(args), text=True, capture_output=True)
+    proc = cancel.run([nerdctl] + list(args), text=True, capture_output=True)
     out = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
     if proc.returncode != 0:
         raise RuntimeError(out.strip() or f"nerdctl failed ({proc.returncode})")
@@ -21,8 +22,14 @@ def remote_ssh(config: dict, host: str, args: list[str]) -> str:
 
     # No shell interpolation: ssh target -- nerdctl args...
     cmd = ["ssh", target, "--", nerdctl_path] + list(args)
-    proc = subprocess.run(cmd, text=True, capture_output=True)
+    proc = cancel.run(cmd, text=True, capture_output=True)
     out = (proc.stdout or "") + (("\n" + proc.stderr) if proc.stderr else "")
     if proc.returncode != 0:
         raise RuntimeError(out.strip() or f"ssh nerdctl failed ({proc.returncode})")
     return out.strip() if out.strip() else "(ok)"
+
+def run(config: dict, args: list[str], host: str | None = None) -> str:
+    # Remote when a host is given, local otherwise.
+    if host:
+        return remote_ssh(config, host, args)
+    return local(config, args)
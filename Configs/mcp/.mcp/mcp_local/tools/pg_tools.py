@@ -1,5 +1,13 @@
 from __future__ import annotations
-import json
+import json, threading
+from contextlib import contextmanager
+from mcp_local import cancel
+
+# Idle connections per URL, reused across calls. Keyed by URL (not connection
+# name) so a config reload only has to close pools whose URL changed.
+_POOL_LOCK = threading.Lock()
+_IDLE: dict[str, list] = {}
+_RETIRED: set[str] = set()
 
 def _get_url(config: dict, conn: str) -> str:
     conns = config.get("postgres", {}).get("connections", {})
@@ -10,6 +18,70 @@ def _get_url(config: dict, conn: str) -> str:
         raise ValueError(f"Missing url for Postgres connection: {conn}")
     return url
 
+@contextmanager
+def _cancel_on_request(cx):
+    # A cancelled tools/call interrupts the running statement server-side.
+    token = cancel.current()
+    if token is None:
+        yield
+        return
+    token.check()
+    unregister = token.on_cancel(cx.cancel)
+    try:
+        yield
+    except Exception:
+        token.check()  # report the QueryCanceled as a cancellation
+        raise
+    finally:
+        unregister()
+
+@contextmanager
+def _connection(psycopg, config: dict, url: str):
+    pool_size = int(config.get("postgres", {}).get("pool_size", 2))
+    cx = None
+    with _POOL_LOCK:
+        _RETIRED.discard(url)
+        idle = _IDLE.get(url)
+        while idle and cx is None:
+            cx = idle.pop()
+            if cx.closed or cx.broken:
+                cx = None
+    if cx is None:
+        cx = psycopg.connect(url)
+    reusable = False
+    try:
+        yield cx
+        reusable = not cx.closed and cx.info.transaction_status == psycopg.pq.TransactionStatus.IDLE
+    finally:
+        if reusable:
+            with _POOL_LOCK:
+                idle = _IDLE.setdefault(url, [])
+                if url not in _RETIRED and len(idle) < pool_size:
+                    idle.append(cx)
+                    cx = None
+        if cx is not None:
+            cx.close()
+
+def _rollback_quietly(cx) -> None:
+    # A broken connection can't roll back; it just won't be pooled.
+    try:
+        cx.rollback()
+    except Exception:
+        pass
+
+def close_pools(urls) -> None:
+    """Close idle connections for these URLs; in-use ones close on release."""
+    with _POOL_LOCK:
+        doomed = []
+        for url in urls:
+            _RETIRED.add(url)
+            doomed += _IDLE.pop(url, [])
+    for cx in doomed:
+        try:
+            cx.close()
+        except Exception:
+            pass
+
 def query(config: dict, conn: str, sql: str, limit: int = 2000) -> str:
     try:
         import psycopg
@@ -22,11 +94,19 @@ def query(config: dict, conn: str, sql: str, limit: int = 2000) -> str:
     if trimmed[:6].lower() == "select" and "limit" not in trimmed.lower():
         sql = f"{trimmed}\nLIMIT {int(limit)}"
 
-    with psycopg.connect(url) as cx:
-        with cx.cursor() as cur:
-            cur.execute(sql)
-            rows = cur.fetchall() if cur.description else []
-            cols = [d.name for d in (cur.description or [])]
+    with _connection(psycopg, config, url) as cx, _cancel_on_request(cx):
+        try:
+            with cx.cursor() as cur:
+                cur.execute(sql)
+                rows = cur.fetchall() if cur.description else []
+                cols = [d.name for d in (cur.description or [])]
+            # Commit like `with psycopg.connect()` did: side effects of the
+            # statement (nextval(), a writing CTE) persist, and the
+            # connection goes back to the pool with no open transaction.
+            cx.commit()
+        except BaseException:
+            _rollback_quietly(cx)
+            raise
     payload = {"columns": cols, "rows": rows[:limit], "rowCount": len(rows)}
     return json.dumps(payload, ensure_ascii=False, default=str, indent=2)
 
@@ -37,9 +117,14 @@ def exec_write(config: dict, conn: str, sql: str) -> str:
         raise RuntimeError("psycopg not installed. Install requirements.txt to enable Postgres tools.") from e
 
     url = _get_url(config, conn)
-    with psycopg.connect(url) as cx:
-        with cx.cursor() as cur:
-            cur.execute(sql)
-            rowcount = cur.rowcount
-        cx.commit()
+    with _connection(psycopg, config, url) as cx, _cancel_on_request(cx):
+        try:
+            with cx.cursor() as cur:
+                cur.execute(sql)
+                rowcount = cur.rowcount
+            cancel.check()  # cancelled before commit: roll back instead
+            cx.commit()
+        except BaseException:
+            _rollback_quietly(cx)
+            raise
     return json.dumps({"status": "ok", "rowCount": rowcount}, ensure_ascii=False, indent=2)
@@ -1,19 +1,173 @@
-import subprocess, shutil, pathlib
+import base64, json, os, re, shutil, subprocess, tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from mcp_local import cancel
 
-def search(root: str, query: str, glob: str | None = None, max_results: int = 200) -> str:
+MAX_LINE_CHARS = 500  # longer match/context lines are cut (minified files)
+MAX_ERRORS = 20  # rg error messages returned next to partial results
+_CASE_FLAGS = {"sensitive": "--case-sensitive", "insensitive": "--ignore-case", "smart": "--smart-case"}
+
+def _text(obj: Dict[str, Any]) -> str:
+    # rg --json sends non-UTF-8 paths/lines base64-encoded under "bytes".
+    if "text" in obj:
+        return obj["text"]
+    return base64.b64decode(obj.get("bytes", "")).decode("utf-8", errors="replace")
+
+def _line(data: Dict[str, Any]) -> str:
+    return _text(data["lines"]).rstrip("\r\n")
+
+def _cut(text: str) -> str:
+    return text if len(text) <= MAX_LINE_CHARS else text[:MAX_LINE_CHARS] + "..."
+
+def _command(
+    roots: List[str],
+    queries: List[str],
+    glob: Optional[List[str]],
+    max_count: Optional[int],
+    case: str,
+    word: bool,
+    fixed_strings: bool,
+    before: int,
+    after: int,
+    sort: bool,
+) -> List[str]:
+    if case not in _CASE_FLAGS:
+        raise ValueError(f"case must be one of {sorted(_CASE_FLAGS)}")
+    cmd = ["rg", "--json", _CASE_FLAGS[case]]
+    if word:
+        cmd.append("--word-regexp")
+    if fixed_strings:
+        cmd.append("--fixed-strings")
+    if max_count:
+        cmd += ["--max-count", str(max_count)]
+    if before:
+        cmd += ["--before-context", str(before)]
+    if after:
+        cmd += ["--after-context", str(after)]
+    if sort:
+        cmd += ["--sort", "path"]  # deterministic, but single-threaded
+    for g in glob or []:
+        cmd += ["--glob", g]
+    for q in queries:
+        cmd += ["-e", q]
+    return cmd + ["--"] + [os.path.expanduser(r) for r in roots]
+
+def _attributor(queries: List[str], case: str, word: bool, fixed_strings: bool) -> Callable[[str, int], List[Tuple[int, int]]]:
+    """
+    Map a line rg matched to (query index, 1-based byte column) for each query
+    that hits it, by re-running the patterns with Python's re. Patterns re
+    can't parse (rg-only syntax) take the lines no other pattern explains; a
+    line nothing explains goes to every query rather than being dropped.
+    """
+    # rg applies smart case to the whole pattern set, not per -e.
+    ignore = case == "insensitive" or (case == "smart" and not any(c.isupper() for q in queries for c in q))
+    rxs = []
+    for q in queries:
+        src = re.escape(q) if fixed_strings else q
+        try:
+            rxs.append(re.compile(rf"\b(?:{src})\b" if word else src, re.IGNORECASE if ignore else 0))
+        except (re.error, RecursionError, OverflowError):
+            rxs.append(None)
+    unparsed = [i for i, rx in enumerate(rxs) if rx is None]
+
+    def attribute(line: str, column: int) -> List[Tuple[int, int]]:
+        hits = []
+        for i, rx in enumerate(rxs):
+            m = rx.search(line) if rx is not None else None
+            if m:
+                hits.append((i, len(line[: m.start()].encode("utf-8")) + 1))
+        return hits or [(i, column) for i in unparsed or range(len(queries))]
+
+    return attribute
+
+def search(
+    roots: List[str],
+    query: Union[str, List[str]],
+    glob: Optional[List[str]] = None,
+    max_results: int = 200,
+    max_count: Optional[int] = None,
+    case: str = "sensitive",
+    word: bool = False,
+    fixed_strings: bool = False,
+    before: int = 0,
+    after: int = 0,
+    sort: bool = False,
+) -> str:
+    """
+    Stream `rg --json` and stop it once max_results matches are in hand.
+    Returns JSON {"matches": [{path, line, column, text[, before, after]}],
+    "truncated"}: column is 1-based, in bytes, as rg counts it; truncated
+    means rg was stopped at max_results and more matches may exist. If rg
+    reports errors (e.g. an unreadable file) it raises when nothing matched,
+    else adds them as "errors".
+
+    A list of queries runs as one rg pass with an -e per query and returns
+    {"results": [{"query", "matches", "truncated"}]} in query order, each
+    query with its own max_results; rg is stopped once all of them are full.
+    """
     if shutil.which("rg") is None:
         raise RuntimeError("ripgrep (rg) not found in PATH. Install ripgrep.")
-    r = pathlib.Path(root).expanduser()
-    cmd = ["rg", "--no-heading", "--line-number", "--color", "never", query, str(r)]
-    if glob:
-        cmd.extend(["-g", glob])
-    proc = subprocess.run(cmd, text=True, capture_output=True)
-    # rg returns 1 when no matches; that's not an error.
-    if proc.returncode not in (0, 1):
-        raise RuntimeError((proc.stderr or proc.stdout or "").strip() or f"rg failed ({proc.returncode})")
-    lines = (proc.stdout or "").splitlines()
-    if not lines:
-        return "(no matches)"
-    if len(lines) > max_results:
-        lines = lines[:max_results] + [f"... truncated to {max_results} results"]
-    return "\n".join(lines)
+    queries = [query] if isinstance(query, str) else list(query)
+    if not queries:
+        raise ValueError("queries must not be empty")
+    cmd = _command(roots, queries, glob, max_count, case, word, fixed_strings, before, after, sort)
+    if len(queries) > 1:
+        attribute = _attributor(queries, case, word, fixed_strings)
+    else:
+        attribute = lambda line, column: [(0, column)]  # noqa: E731
+    groups: List[List[Dict[str, Any]]] = [[] for _ in queries]
+    more = [False] * len(queries)  # a match past max_results was seen
+    open_ = len(queries)  # queries still short of max_results
+    pending: List[Dict[str, Any]] = []  # context lines waiting for the next match
+    last: Optional[Dict[str, Any]] = None  # the last match kept for any query
+    stopped = False
+    with tempfile.TemporaryFile() as err:
+        with cancel.popen(cmd, stdout=subprocess.PIPE, stderr=err) as proc:
+            for raw in proc.stdout:
+                msg = json.loads(raw)
+                kind, data = msg.get("type"), msg.get("data", {})
+                if not open_:
+                    # Every query is full: only finish the last match's after-context.
+                    if last is None or kind != "context" or not 0 < data["line_number"] - last["line"] <= after:
+                        stopped = True
+                        break
+                    last["after"].append({"line": data["line_number"], "text": _cut(_line(data))})
+                elif kind == "begin":
+                    pending, last = [], None
+                elif kind == "context":
+                    entry = {"line": data["line_number"], "text": _cut(_line(data))}
+                    if last is not None and 0 < entry["line"] - last["line"] <= after:
+                        last["after"].append(entry)
+                    pending.append(entry)  # may also lead into the next match
+                elif kind == "match":
+                    text, number = _line(data), data["line_number"]
+                    sub = data.get("submatches") or [{}]
+                    context = {}
+                    if before or after:
+                        # One after list, shared by every query the line is kept for.
+                        context = {"before": [c for c in pending if 0 < number - c["line"] <= before], "after": []}
+                        pending = []
+                    last = None
+                    for i, column in attribute(text, sub[0].get("start", 0) + 1):
+                        if len(groups[i]) >= max_results:
+                            more[i] = True
+                            continue
+                        last = {"path": _text(data["path"]), "line": number, "column": column, "text": _cut(text), **context}
+                        groups[i].append(last)
+                        if len(groups[i]) == max_results:
+                            open_ -= 1
+                    if not open_ and not after:
+                        stopped = True
+                        break
+            # Leaving the block kills rg if it is still searching.
+        returncode = proc.returncode
+        err.seek(0)
+        stderr = err.read().decode("utf-8", errors="replace").strip()
+    # rg exits 1 for no matches and 2 if anything failed (even with matches).
+    if returncode == 2 and not any(groups):
+        raise RuntimeError(stderr or f"rg failed ({returncode})")
+    errors = {"errors": stderr.splitlines()[:MAX_ERRORS]} if stderr else {}
+    truncated = [m or (stopped and len(g) >= max_results) for g, m in zip(groups, more)]
+    if isinstance(query, str):
+        return json.dumps({"matches": groups[0], "truncated": truncated[0], **errors}, ensure_ascii=False)
+    results = [{"query": q, "matches": g, "truncated": t} for q, g, t in zip(queries, groups, truncated)]
+    return json.dumps({"results": results, **errors}, ensure_ascii=False)
@@ -0,0 +1,26 @@
+import json, sys
+from mcp_local.cache import CACHE
+from mcp_local.metrics import METRICS
+
+def _cache_prometheus() -> str:
+    st = CACHE.stats()
+    out = []
+    for name in ("hits", "misses", "evictions", "invalidations"):
+        out.append(f"# TYPE local_mcp_cache_{name}_total counter")
+        out.append(f"local_mcp_cache_{name}_total {st[name]}")
+    for name in ("entries", "bytes"):
+        out.append(f"# TYPE local_mcp_cache_{name} gauge")
+        out.append(f"local_mcp_cache_{name} {st[name]}")
+    return "\n".join(out) + "\n"
+
+def server_stats(fmt: str = "json") -> str:
+    if fmt == "prometheus":
+        return METRICS.prometheus_text() + _cache_prometheus()
+    if fmt != "json":
+        raise ValueError("format must be 'json' or 'prometheus'")
+    payload = METRICS.snapshot()
+    payload["cache"] = CACHE.stats()
+    index = sys.modules.get("mcp_local.index")  # only loaded when index.enabled
+    if index is not None and index.stats() is not None:
+        payload["index"] = index.stats()
+    return json.dumps(payload, ensure_ascii=False, indent=2)
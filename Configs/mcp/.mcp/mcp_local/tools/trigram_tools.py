@@ -0,0 +1,200 @@
+import bisect, math, os, re, shutil, time
+from typing import List, Optional
+from mcp_local import cancel, trigram
+
+try:
+    from re import _constants as _sre, _parser as _sre_parse  # 3.11+
+except ImportError:  # pragma: no cover - 3.10
+    import sre_constants as _sre, sre_parse as _sre_parse
+
+# Under IGNORECASE these ASCII letters also match non-ASCII ones (K/k and the
+# Kelvin sign, s and long s, i and dotted/dotless i), whose bytes differ.
+_FOLDS_WIDE = frozenset("iksIKS")
+_REPEATS = tuple(getattr(_sre, n) for n in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT") if hasattr(_sre, n))
+_RG_CHUNK = 500  # candidate files per rg invocation
+
+def _literal_runs(text: str, ignore_case: bool) -> List[bytes]:
+    """Byte strings every match contains, split where case folding could change the bytes."""
+    if not ignore_case:
+        return [text.encode("utf-8")]
+    runs, cur = [], []
+    for ch in text:
+        if ch.isascii() and ch not in _FOLDS_WIDE:
+            cur.append(ch)
+        elif cur:
+            runs.append("".join(cur).encode())
+            cur = []
+    if cur:
+        runs.append("".join(cur).encode())
+    return runs
+
+def _regex_runs(items, ignore_case: bool, out: List[bytes]) -> None:
+    """Append the literal strings any match of parsed regex items must contain."""
+    cur: List[str] = []
+
+    def flush() -> None:
+        if cur:
+            out.extend(_literal_runs("".join(cur), ignore_case))
+            cur.clear()
+
+    for op, av in items:
+        if op is _sre.LITERAL:
+            cur.append(chr(av))
+        elif op is _sre.AT:
+            continue  # anchors are zero-width; the literal text stays contiguous
+        elif op is _sre.SUBPATTERN:
+            flush()
+            group_flags = av[1] if len(av) == 4 else 0
+            _regex_runs(av[-1], ignore_case or bool(group_flags & _sre.SRE_FLAG_IGNORECASE), out)
+        elif op in _REPEATS:
+            flush()
+            if av[0] >= 1:
+                _regex_runs(av[2], ignore_case, out)
+        else:
+            flush()  # classes, alternation, ., backreferences: no fixed text
+    flush()
+
+def query_trigrams(query: str, mode: str, ignore_case: bool) -> set:
+    """Trigrams every file matching query must contain (empty: no narrowing possible)."""
+    if mode == "literal":
+        runs = _literal_runs(query, ignore_case)
+    else:
+        try:
+            parsed = _sre_parse.parse(query, re.IGNORECASE if ignore_case else 0)
+        except (re.error, RecursionError, OverflowError):
+            return set()  # e.g. rg-only syntax: search every file
+        runs = []
+        _regex_runs(parsed, ignore_case or bool(parsed.state.flags & re.IGNORECASE), runs)
+    keys: set = set()
+    for run in runs:
+        keys |= trigram.trigrams(run)
+    return keys
+
+def _fuzzy_candidates(idx, keys: set, min_probability: float) -> List[int]:
+    # Heuristic, not a bound: files sharing at least min_probability of the
+    # query's trigrams. A fuzzy match can share none (see mgrep_tools).
+    if not keys:
+        return list(range(idx.nfiles))
+    need = max(1, math.ceil(min_probability * len(keys)))
+    counts: dict = {}
+    for k in keys:
+        for i in idx.postings(k):
+            counts[i] = counts.get(i, 0) + 1
+    return idx.with_unindexed([i for i, n in counts.items() if n >= need])
+
+def _rg(files: List[str], query: str, literal: bool, ignore_case: bool, max_results: int) -> List[str]:
+    out: List[str] = []
+    for a in range(0, len(files), _RG_CHUNK):
+        cmd = ["rg", "--no-heading", "--line-number", "--with-filename", "--color", "never", "--sort", "path"]
+        if literal:
+            cmd.append("-F")
+        if ignore_case:
+            cmd.append("-i")
+        proc = cancel.run(cmd + ["-e", query, "--"] + files[a : a + _RG_CHUNK], text=True, capture_output=True)
+        if proc.returncode not in (0, 1):
+            raise RuntimeError((proc.stderr or proc.stdout or "").strip() or f"rg failed ({proc.returncode})")
+        out.extend((proc.stdout or "").splitlines())
+        if len(out) > max_results:
+            break
+    return out
+
+def _scan(files: List[str], query: str, literal: bool, ignore_case: bool, max_results: int) -> List[str]:
+    # Without rg: Python's re over the candidate files only.
+    rx = re.compile(re.escape(query) if literal else query, re.IGNORECASE if ignore_case else 0)
+    out: List[str] = []
+    for path in files:
+        cancel.check()
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                for n, line in enumerate(f, 1):
+                    line = line.rstrip("\n")
+                    if rx.search(line):
+                        out.append(f"{path}:{n}:{line}")
+                        if len(out) > max_results:
+                            return out
+        except OSError:
+            continue
+    return out
+
+def index_search(
+    policy,
+    root: str,
+    query: str,
+    mode: str = "literal",
+    ignore_case: bool = False,
+    glob: Optional[str] = None,
+    max_results: int = 200,
+    refresh: bool = False,
+    index_dir: str = trigram.DEFAULT_DIR,
+    max_file_bytes: int = trigram.DEFAULT_MAX_FILE_BYTES,
+    prune: Optional[list] = None,
+    min_probability: float = 0.5,
+    workers: int = 4,
+    time_budget_s: float = 30.0,
+) -> str:
+    """
+    Search root using its trigram index (or an indexed ancestor's) to pick the
+    files worth reading, then run rg (mode literal/regex) or the mgrep scorer
+    (mode fuzzy) on just those. refresh=True updates the index first.
+    """
+    if mode not in ("literal", "regex", "fuzzy"):
+        raise ValueError("mode must be literal, regex or fuzzy")
+    if not query:
+        raise ValueError("query must not be empty")
+    start = time.monotonic()
+    root = os.path.expanduser(root)
+    if refresh:
+        try:
+            idx = trigram.find_index(root, index_dir)
+        except ValueError:  # an index in an older format: rebuild it in place
+            idx = None
+        trigram.build(idx.root if idx else root, index_dir, prune=prune, max_file_bytes=max_file_bytes)
+    idx = trigram.find_index(root, index_dir)
+    if idx is None:
+        raise RuntimeError(
+            f"No trigram index covers {root}. Build one with "
+            f"`python -m mcp_local.trigram build {root}` or call with refresh=true."
+        )
+
+    from mcp_local.walk import path_matcher
+
+    real = os.path.realpath(root)
+    prefix = "" if real == idx.root else os.path.relpath(real, idx.root).replace(os.sep, "/") + "/"
+    if mode == "fuzzy":
+        ids = _fuzzy_candidates(idx, trigram.trigrams(query.encode("utf-8")), min_probability)
+    else:
+        ids = idx.candidates(query_trigrams(query, mode, ignore_case))
+    lo, hi = idx.prefix_range(prefix)
+    ids = ids[bisect.bisect_left(ids, lo) : bisect.bisect_left(ids, hi)]
+    in_glob = path_matcher([glob]) if glob else None
+
+    files = []  # (path as seen from root, size)
+    for i in ids:
+        rel, size, _ = idx.file(i)
+        rel = rel[len(prefix):]
+        if in_glob is not None and not in_glob(rel):
+            continue
+        path = os.path.join(root, *rel.split("/"))
+        try:
+            policy.check(path)
+        except PermissionError:
+            continue
+        if os.path.exists(path):  # deleted since the last build/update
+            files.append((path, size))
+
+    if mode == "fuzzy":
+        from mcp_local.tools import mgrep_tools
+
+        lines = mgrep_tools.search_files(
+            files, query, min_probability, max_results, workers, start + time_budget_s, max_file_bytes
+        )
+    else:
+        paths = [p for p, _ in files]
+        search = _rg if shutil.which("rg") else _scan
+        lines = search(paths, query, mode == "literal", ignore_case, max_results) if paths else []
+        if not lines:
+            lines = ["(no matches)"]
+        elif len(lines) > max_results:
+            lines = lines[:max_results] + [f"... truncated to {max_results} results"]
+    lines.append(f"... (index: searched {len(files)} of {hi - lo} files)")
+    return "\n".join(lines)
@@ -0,0 +1,443 @@
+"""
+Persistent trigram index of a source tree, used by index_search.
+
+One file per indexed root under trigram.dir, named after a hash of the
+root's real path. It maps every 3-byte sequence (ASCII-lowercased) to the
+sorted ids of the files containing it, so a query's trigrams narrow the
+files an exact or fuzzy matcher has to read. The file is used through mmap:
+opening it costs a header read, and a lookup is a binary search over the key
+table plus one slice of the postings.
+
+Layout (little-endian, every section 8-byte aligned):
+
+    header    magic (with the format version), counts, section offsets
+    files     per file: mtime_ns, size, path offset, path length
+    paths     paths relative to the root, '/'-separated, as the filesystem's bytes
+    keys      sorted uint32 trigrams (b0 << 16 | b1 << 8 | b2)
+    offsets   uint64 start of each key's postings, plus the end
+    postings  file ids: uint16 while there are fewer than 65536 files, else uint32
+    unindexed sorted uint32 ids of the files listed without trigrams
+
+Files are taken from the scandir walker (`**/*`: no dot-files, no
+fs.prune_dirs, .gitignore honoured). Files over max_file_bytes or unreadable
+at build time are listed as unindexed: they have no trigrams, and every query
+gets them as candidates so the matcher still reads them. Binary files (NUL in
+the first 8 KiB) are indexed with no trigrams and so skipped on purpose, as
+rg and mgrep skip them. `update` re-reads only files
+whose size or mtime changed and carries the rest over from the old index;
+either way the new index replaces the old one atomically.
+
+    python -m mcp_local.trigram build ROOT [--workers N]
+    python -m mcp_local.trigram update ROOT
+    python -m mcp_local.trigram stats ROOT
+"""
+import argparse
+import array
+import bisect
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+MAGIC = b"MCPTRI02"
+_HEADER = struct.Struct("<8sIIQQQQQQQQ")  # magic, nfiles, nkeys, nunindexed, then section offsets
+_FILE = struct.Struct("<qQQQ")  # mtime_ns, size, path offset, path length
+DEFAULT_DIR = "~/.cache/local-mcp/trigram"
+DEFAULT_MAX_FILE_BYTES = 4 << 20
+
+
+def index_path(root: str, index_dir: str = DEFAULT_DIR) -> str:
+    real = os.path.realpath(os.path.expanduser(root))
+    name = hashlib.blake2b(os.fsencode(real), digest_size=10).hexdigest()
+    return os.path.join(os.path.expanduser(index_dir), f"{name}.tri")
+
+
+def trigrams(data: bytes) -> Set[int]:
+    """Trigram keys of data, ASCII-lowercased."""
+    data = data.lower()
+    return {a << 16 | b << 8 | c for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def _file_trigrams(path: str, max_file_bytes: int) -> Optional[array.array]:
+    """Sorted trigram keys of a file; None if it is too big or can't be read (unindexed)."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read(max_file_bytes + 1)
+    except OSError:
+        return None
+    if len(data) > max_file_bytes:
+        return None
+    if b"\0" in data[:8192]:
+        return array.array("I")  # binary: never a candidate
+    return array.array("I", sorted(trigrams(data)))
+
+
+class TrigramIndex:
+    """Read-only view of an index file (mmap)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        head = _HEADER.unpack_from(self._mm, 0)
+        if head[0] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a trigram index (or an older format): {path}")
+        _, self.nfiles, self.nkeys, nun, self._files, self._paths, keys, offsets, posts, unindexed, _end = head
+        view = memoryview(self._mm)
+        self._keys = view[keys : keys + 4 * self.nkeys].cast("I")
+        self._offsets = view[offsets : offsets + 8 * (self.nkeys + 1)].cast("Q")
+        self.unindexed = view[unindexed : unindexed + 4 * nun].cast("I")
+        self._posts = posts
+        self._id = _id_type(self.nfiles)
+        self._view = view
+        # The paths section starts with the indexed root (length-prefixed).
+        (n,) = struct.unpack_from("<Q", self._mm, self._paths)
+        self.root = bytes(self._mm[self._paths + 8 : self._paths + 8 + n]).decode("utf-8", "surrogateescape")
+
+    def close(self) -> None:
+        self._keys.release()
+        self._offsets.release()
+        self.unindexed.release()
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            pass  # a postings view is still referenced; the map goes with it
+
+    def file(self, i: int) -> Tuple[str, int, int]:
+        """(relative path, size, mtime_ns) of file id i."""
+        mtime, size, off, n = _FILE.unpack_from(self._mm, self._files + i * _FILE.size)
+        return bytes(self._mm[off : off + n]).decode("utf-8", "surrogateescape"), size, mtime
+
+    def files(self) -> Iterable[Tuple[str, int, int]]:
+        for i in range(self.nfiles):
+            yield self.file(i)
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        """Ids [lo, hi) of the files whose path starts with prefix (paths are sorted)."""
+        if not prefix:
+            return 0, self.nfiles
+        return self._lower_bound(prefix), self._lower_bound(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+
+    def _lower_bound(self, rel: str) -> int:
+        lo, hi = 0, self.nfiles
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.file(mid)[0] < rel:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def postings(self, key: int) -> memoryview:
+        """Sorted ids of the files containing trigram key (empty if none)."""
+        k = bisect.bisect_left(self._keys, key)
+        if k == self.nkeys or self._keys[k] != key:
+            return memoryview(b"").cast(self._id)
+        return self._slice(k)
+
+    def _slice(self, k: int) -> memoryview:
+        w = 2 if self._id == "H" else 4
+        a, b = self._offsets[k], self._offsets[k + 1]
+        return self._view[self._posts + w * a : self._posts + w * b].cast(self._id)
+
+    def items(self) -> Iterable[Tuple[int, memoryview]]:
+        for k in range(self.nkeys):
+            yield self._keys[k], self._slice(k)
+
+    def candidates(self, keys: Set[int]) -> List[int]:
+        """
+        Sorted ids of the files containing every trigram in keys, plus the
+        unindexed files (all files if keys is empty).
+        """
+        if not keys:
+            return list(range(self.nfiles))
+        lists = sorted((self.postings(k) for k in keys), key=len)
+        out = list(lists[0])
+        for ids in lists[1:]:
+            if not out:
+                break
+            # Smallest list first: probe the others by binary search.
+            out = [i for i in out if _contains(ids, i)]
+        return self.with_unindexed(out) if len(self.unindexed) else out
+
+    def with_unindexed(self, ids: List[int]) -> List[int]:
+        """ids and the unindexed files' ids, sorted."""
+        return sorted(set(ids).union(self.unindexed))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": self.nfiles,
+            "trigrams": self.nkeys,
+            "postings": int(self._offsets[self.nkeys]) if self.nkeys else 0,
+            "unindexed": len(self.unindexed),
+            "bytes": len(self._mm),
+        }
+
+
+def _id_type(nfiles: int) -> str:
+    return "H" if nfiles < 1 << 16 else "I"
+
+
+def _contains(ids: memoryview, i: int) -> bool:
+    j = bisect.bisect_left(ids, i)
+    return j < len(ids) and ids[j] == i
+
+
+def _align(f) -> int:
+    pad = -f.tell() % 8
+    f.write(b"\0" * pad)
+    return f.tell()
+
+
+def _write(
+    path: str, root: str, files: List[Tuple[str, int, int]], post: Dict[int, array.array], unindexed: List[int]
+) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tri-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            files_off = _align(f)
+            # Names that aren't valid UTF-8 come from os.scandir surrogate-escaped;
+            # this stores their original bytes.
+            encoded = [rel.encode("utf-8", "surrogateescape") for rel, _, _ in files]
+            root_b = root.encode("utf-8", "surrogateescape")
+            paths_off = files_off + _FILE.size * len(files)
+            paths_off += -paths_off % 8
+            off = paths_off + 8 + len(root_b)
+            table = bytearray()
+            for (rel, size, mtime), b in zip(files, encoded):
+                table += _FILE.pack(mtime, size, off, len(b))
+                off += len(b)
+            f.write(table)
+            _align(f)
+            f.write(struct.pack("<Q", len(root_b)) + root_b)
+            f.write(b"".join(encoded))
+            keys_off = _align(f)
+            keys = sorted(post)
+            f.write(array.array("I", keys).tobytes())
+            offsets_off = _align(f)
+            offsets = array.array("Q", [0])
+            n = 0
+            for k in keys:
+                n += len(post[k])
+                offsets.append(n)
+            f.write(offsets.tobytes())
+            posts_off = _align(f)
+            narrow = _id_type(len(files)) == "H"
+            for k in keys:
+                f.write((array.array("H", post[k]) if narrow else post[k]).tobytes())
+            unindexed_off = _align(f)
+            f.write(array.array("I", sorted(unindexed)).tobytes())
+            end = f.tell()
+            f.seek(0)
+            f.write(_HEADER.pack(
+                MAGIC, len(files), len(keys), len(unindexed),
+                files_off, paths_off, keys_off, offsets_off, posts_off, unindexed_off, end,
+            ))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def build(
+    root: str,
+    index_dir: str = DEFAULT_DIR,
+    prune: Optional[Iterable[str]] = None,
+    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+    workers: int = 1,
+    incremental: bool = True,
+) -> Dict[str, float]:
+    """
+    (Re)build the index of root. With incremental=True and an existing index
+    of the same root, files whose size and mtime are unchanged keep their
+    trigrams from it and only the rest are read.
+    """
+    start = time.monotonic()
+    root = os.path.realpath(os.path.expanduser(root))
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"Directory not found: {root}")
+    path = index_path(root, index_dir)
+    from mcp_local.walk import list_files
+
+    files = list_files(root, prune)
+    ids = {rel: i for i, (rel, _, _) in enumerate(files)}
+
+    old: Optional[TrigramIndex] = None
+    if incremental and os.path.exists(path):
+        try:
+            old = TrigramIndex(path)
+        except (OSError, ValueError):
+            old = None
+        if old is not None and old.root != root:
+            old.close()
+            old = None
+
+    remap = array.array("q")  # old id -> new id, or -1
+    kept: Set[int] = set()
+    unindexed: List[int] = []
+    if old is not None:
+        for rel, size, mtime in old.files():
+            i = ids.get(rel, -1)
+            if i >= 0 and files[i][1:] != (size, mtime):
+                i = -1
+            remap.append(i)
+            if i >= 0:
+                kept.add(i)
+        # Unindexed files go through the size check again (max_file_bytes may
+        # have changed), and one that couldn't be read is retried.
+        for j in old.unindexed:
+            kept.discard(remap[j])
+
+    post: Dict[int, array.array] = {}  # trigram -> file ids
+    if old is not None:
+        same_ids = all(j == i for i, j in enumerate(remap))  # nothing dropped or renumbered
+        for key, olds in old.items():
+            if same_ids:
+                new = array.array("I", olds)
+            else:
+                new = array.array("I", [j for j in map(remap.__getitem__, olds) if j >= 0])
+            if new:
+                post[key] = new
+        old.close()
+
+    todo = []
+    for i in range(len(files)):
+        if i in kept:
+            continue
+        if files[i][1] > max_file_bytes:
+            unindexed.append(i)  # known from its size alone
+        else:
+            todo.append(i)
+    base = root.rstrip(os.sep) or os.sep
+    paths = [os.path.join(base, *files[i][0].split("/")) for i in todo]
+    if workers > 1 and len(todo) > 64:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        ctx = multiprocessing.get_context("spawn")  # may run inside the (threaded) server
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(_file_trigrams, paths, [max_file_bytes] * len(paths), chunksize=32))
+    else:
+        results = (_file_trigrams(p, max_file_bytes) for p in paths)
+    for i, keys in zip(todo, results):
+        if keys is None:
+            unindexed.append(i)
+            continue
+        for k in keys:
+            post.setdefault(k, array.array("I")).append(i)
+    if kept and todo:
+        # Ids of re-read files were appended after the carried-over ones.
+        for k, ids_ in post.items():
+            post[k] = array.array("I", sorted(ids_))
+
+    _write(path, root, files, post, unindexed)
+    return {
+        "files": len(files),
+        "read": len(todo),
+        "reused": len(kept),
+        "unindexed": len(unindexed),
+        "trigrams": len(post),
+        "bytes": os.path.getsize(path),
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+_OPEN: Dict[str, TrigramIndex] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_index(path: str) -> Optional[TrigramIndex]:
+    """Shared reader for path, reopened when the file is replaced; None if absent."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+    with _OPEN_LOCK:
+        idx = _OPEN.get(path)
+        if idx is None or idx.sig != sig:
+            # An index still in use by another call stays mapped until it's dropped.
+            idx = _OPEN[path] = TrigramIndex(path)
+        return idx
+
+
+def find_index(root: str, index_dir: str = DEFAULT_DIR) -> Optional[TrigramIndex]:
+    """The index of root or of its nearest indexed ancestor."""
+    d = os.path.realpath(os.path.expanduser(root))
+    while True:
+        idx = open_index(index_path(d, index_dir))
+        if idx is not None:
+            return idx
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m mcp_local.trigram")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    for name, help_ in (
+        ("build", "index ROOT from scratch"),
+        ("update", "re-read only files changed since the last build/update"),
+        ("stats", "print the size of ROOT's index"),
+    ):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("root")
+        p.add_argument("--config", help="config.yaml to take trigram.* and fs.prune_dirs from")
+        p.add_argument("--dir", help="index directory (default: trigram.dir)")
+        if name != "stats":
+            p.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    opts = ap.parse_args(argv)
+
+    cfg: dict = {}
+    try:
+        from mcp_local.config import load_config
+
+        cfg = load_config(opts.config)
+    except Exception as e:
+        if opts.config:
+            raise
+        sys.stderr.write(f"(no usable config.yaml, using defaults: {e})\n")
+    tcfg = cfg.get("trigram", {})
+    index_dir = opts.dir or tcfg.get("dir") or DEFAULT_DIR
+
+    if opts.cmd == "stats":
+        path = index_path(opts.root, index_dir)
+        idx = open_index(path)
+        if idx is None:
+            print(f"no index for {opts.root} ({path})")
+            return 1
+        print(f"{path}: " + ", ".join(f"{k}={v}" for k, v in idx.stats().items()))
+        return 0
+
+    result = build(
+        opts.root,
+        index_dir,
+        prune=cfg.get("fs", {}).get("prune_dirs"),
+        max_file_bytes=int(tcfg.get("max_file_bytes", DEFAULT_MAX_FILE_BYTES)),
+        workers=opts.workers,
+        incremental=opts.cmd == "update",
+    )
+    print(", ".join(f"{k}={v}" for k, v in result.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+"""
+Streaming os.scandir tree walker used by fs_glob.
+
+Patterns follow glob.glob(recursive=True): `**` spans directories, `*`/`?`/
+`[...]` stay within one component and wildcards skip dot-names unless the
+pattern component itself starts with a dot. Differences from glob.glob:
+matches are yielded as they are found (callers stop early by not consuming),
+well-known bulky directories are pruned, .gitignore files under the search
+root are honoured, symlinked directories are listed but not descended, and
+"name/" is only yielded for directories (glob also yields it for a file that a
+pattern ending in `/` or `/**` names).
+
+With sort=True the output equals sorted(glob.glob(...)) over the same
+entries: each directory's entries are visited in the order their full paths
+sort, which is why a directory's own match and its contents are keyed apart.
+"""
+import fnmatch
+import os
+import re
+import stat
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_PRUNE = frozenset({
+    ".git", ".hg", ".svn", "node_modules", ".venv", "venv", "__pycache__",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", ".build", "DerivedData",
+})
+
+_MAGIC = re.compile(r"[*?\[]")
+
+# (directory the .gitignore lives in, [(regex, negated, dir_only, name_only), ...])
+_Ignore = Tuple[str, List[Tuple[re.Pattern, bool, bool, bool]]]
+
+
+def _component(part: str, dotfiles: bool) -> str:
+    """Regex for one path component (no '/')."""
+    res = []
+    if not dotfiles and _MAGIC.search(part) and not part.startswith("."):
+        res.append(r"(?!\.)")
+    i, n = 0, len(part)
+    while i < n:
+        c = part[i]
+        i += 1
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[":
+            j = i
+            if j < n and part[j] in "!^":
+                j += 1
+            if j < n and part[j] == "]":
+                j += 1
+            while j < n and part[j] != "]":
+                j += 1
+            if j >= n:
+                res.append(r"\[")
+                continue
+            body = part[i:j].replace("\\", r"\\")
+            i = j + 1
+            if body[0] in "!^":
+                body = "^" + body[1:]
+            res.append(f"[{body}]")
+        elif c == "\\" and dotfiles and i < n:
+            res.append(re.escape(part[i]))  # gitignore escapes (\#, \!, \*)
+            i += 1
+        else:
+            res.append(re.escape(c))
+    return "".join(res)
+
+
+def _translate(parts: List[str], dotfiles: bool) -> str:
+    out = []
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            if dotfiles:
+                out.append(".*" if last else "(?:.*/)?")
+            else:
+                out.append(r"(?!\.)[^/]*(?:/(?!\.)[^/]*)*" if last else r"(?:(?!\.)[^/]*/)*")
+            continue
+        out.append(_component(part, dotfiles) + ("" if last else "/"))
+    return "".join(out)
+
+
+def _load_gitignore(path: str) -> list:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        neg = line.startswith("!")
+        if neg:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # Patterns without a slash match the basename at any depth.
+        name_only = "/" not in line
+        rules.append((re.compile(_translate(line.lstrip("/").split("/"), dotfiles=True)), neg, dir_only, name_only))
+    return rules
+
+
+def _ignored(path: str, name: str, is_dir: bool, ignores: List[_Ignore]) -> bool:
+    # Last matching rule wins; deeper .gitignore files come later in the list.
+    hit = False
+    for base, rules in ignores:
+        sub = path[len(base) + 1:]
+        for rx, neg, dir_only, name_only in rules:
+            if (is_dir or not dir_only) and rx.fullmatch(name if name_only else sub):
+                hit = not neg
+    return hit
+
+
+def path_matcher(patterns: List[str]) -> Callable[[str], bool]:
+    """
+    Test for '/'-separated paths relative to a root, .gitignore-style: a
+    pattern without '/' matches a file or directory name at any depth (and
+    so everything below it); others match from the root down.
+    """
+    names, paths = [], []
+    for p in patterns:
+        p = p.strip("/")
+        if p:
+            rx = re.compile(_translate(p.split("/"), dotfiles=True)).fullmatch
+            (paths if "/" in p else names).append(rx)
+
+    def matches(rel: str) -> bool:
+        parts = rel.split("/")
+        return any(m(part) for m in names for part in parts) or any(
+            m("/".join(parts[:i])) for m in paths for i in range(1, len(parts) + 1)
+        )
+
+    return matches
+
+
+# listdir(path) -> [(name, is_dir), ...], or None to fall back to the disk.
+ListDir = Callable[[str], Optional[List[Tuple[str, bool]]]]
+
+
+def _scandir(path: str) -> List[Tuple[str, bool]]:
+    out = []
+    try:
+        with os.scandir(path) as it:
+            for e in it:
+                try:
+                    is_dir = e.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                out.append((e.name, is_dir))
+    except OSError:
+        return []
+    return out
+
+
+def _lister(listdir: Optional[ListDir]) -> Callable[[str], List[Tuple[str, bool]]]:
+    if listdir is None:
+        return _scandir
+
+    def scan(path: str) -> List[Tuple[str, bool]]:
+        entries = listdir(path)
+        return _scandir(path) if entries is None else entries
+
+    return scan
+
+
+def walk(
+    root: str,
+    pattern: str,
+    sort: bool = True,
+    prune: Optional[Iterable[str]] = None,
+    gitignore: bool = True,
+    listdir: Optional[ListDir] = None,
+) -> Iterator[str]:
+    """
+    Yield paths under root matching pattern, as root-joined strings.
+    listdir, if given, supplies directory entries (e.g. from mcp_local.index).
+    """
+    pattern = pattern.replace(os.sep, "/")
+    parts = []
+    for p in pattern.split("/"):
+        if p and p != "." and not (p == "**" and parts[-1:] == ["**"]):
+            parts.append(p)
+    if not parts:
+        return
+    # As in glob: a trailing '/' matches directories only, yielded with a
+    # trailing separator, and a trailing `**` also matches (as "dir/") each
+    # directory the components before it match.
+    dirs_only = pattern.endswith("/")
+    if pattern.startswith("/") or ".." in parts:
+        raise ValueError("pattern must be relative to root and must not contain '..'")
+    prune = DEFAULT_PRUNE if prune is None else frozenset(prune)
+
+    # Literal leading components narrow the walk before any directory is listed.
+    base = root.rstrip(os.sep) or os.sep
+    ignores: List[_Ignore] = []
+    k = 0
+    while k < len(parts) - 1 and not _MAGIC.search(parts[k]):
+        if gitignore:
+            rules = _load_gitignore(os.path.join(base, ".gitignore"))
+            if rules:
+                ignores.append((base, rules))
+        base = os.path.join(base, parts[k])
+        k += 1
+    rest = parts[k:]
+    if len(rest) == 1 and not _MAGIC.search(rest[0]):
+        path = os.path.join(base, rest[0])
+        if dirs_only and os.path.isdir(path):
+            yield path + os.sep
+        elif not dirs_only and os.path.lexists(path):
+            yield path
+        return
+    self_match = None
+    if rest[-1] == "**":
+        if len(rest) == 1:
+            if os.path.isdir(base):
+                yield base + os.sep
+        else:
+            self_match = re.compile(_translate(rest[:-1], dotfiles=False)).fullmatch
+
+    fixed = rest.index("**") if "**" in rest else len(rest)
+    # Below the first `**` any directory may lead to a match; above it a
+    # directory at depth d must match component d. `**` never matches a
+    # dot-directory, so those are only entered if a later component could.
+    dir_match = [re.compile(_component(p, dotfiles=False)).fullmatch for p in rest[: min(fixed, len(rest) - 1)]]
+    max_depth = None if "**" in rest else len(rest) - 1
+    hidden_ok = any(p.startswith(".") for p in rest[fixed:])
+    if rest[:-1] == ["**"] and not hidden_ok:
+        # "**/<name pattern>": with dot-directories skipped only the name matters.
+        name_match = re.compile(_component(rest[-1], dotfiles=False)).fullmatch
+    else:
+        name_match = None
+        match = re.compile(_translate(rest, dotfiles=False)).fullmatch
+
+    scan = _lister(listdir)
+
+    def visit(dirpath: str, rel: str, depth: int, ignores: List[_Ignore]) -> Iterator[str]:
+        entries = scan(dirpath)
+        if gitignore and any(name == ".gitignore" for name, _ in entries):
+            rules = _load_gitignore(os.path.join(dirpath, ".gitignore"))
+            if rules:
+                ignores = ignores + [(dirpath, rules)]
+        descend_ok = max_depth is None or depth < max_depth
+        todo = []
+        for name, is_dir in entries:
+            if is_dir and name in prune:
+                continue
+            path = dirpath + os.sep + name if dirpath != os.sep else os.sep + name
+            if ignores and _ignored(path, name, is_dir, ignores):
+                continue
+            r = rel + "/" + name if rel else name
+            hit = (name_match(name) if name_match else match(r)) is not None
+            if hit and dirs_only and not is_dir:
+                hit = os.path.isdir(path)  # a symlink to a directory still counts
+            itself = self_match is not None and self_match(r) is not None and (is_dir or os.path.isdir(path))
+            # (sort key, path) to yield; "dir" via a match and "dir/" via itself are distinct.
+            out = [(name + "/", path + os.sep)] if itself or (hit and dirs_only) else []
+            if hit and not dirs_only:
+                out.insert(0, (name, path))
+            if not is_dir or not descend_ok:
+                down = False
+            elif depth < len(dir_match):
+                down = dir_match[depth](name) is not None
+            else:
+                down = hidden_ok or depth < fixed or name[0] != "."
+            if not sort:
+                for _, shown in out:
+                    yield shown
+                if down:
+                    yield from visit(path, r, depth + 1, ignores)
+                continue
+            todo.extend((key, shown, r, False) for key, shown in out)
+            if down:
+                todo.append((name + "/", path, r, True))
+        if sort:
+            todo.sort(key=lambda t: t[0])
+            for _, path, r, down in todo:
+                if down:
+                    yield from visit(path, r, depth + 1, ignores)
+                else:
+                    yield path
+
+    yield from visit(base, "", 0, ignores)
+
+
+def find(
+    roots: List[str],
+    query: str,
+    kind: Optional[str] = None,
+    prune: Optional[Iterable[str]] = None,
+    listdir: Optional[ListDir] = None,
+) -> Iterator[str]:
+    """
+    Yield paths under roots whose basename matches query: a case-insensitive
+    substring, or a case-insensitive glob if query contains * ? or [.
+    kind is "file", "dir" or None for both. Hidden entries are included.
+    """
+    prune = DEFAULT_PRUNE if prune is None else frozenset(prune)
+    q = query.lower()
+    if _MAGIC.search(q):
+        rx = re.compile(fnmatch.translate(q))
+        hit = lambda name: rx.match(name.lower()) is not None
+    else:
+        hit = lambda name: q in name.lower()
+    scan = _lister(listdir)
+    stack = [r.rstrip(os.sep) or os.sep for r in reversed(roots)]
+    while stack:
+        dirpath = stack.pop()
+        subdirs = []
+        for name, is_dir in sorted(scan(dirpath)):
+            if is_dir and name in prune:
+                continue
+            path = dirpath + os.sep + name if dirpath != os.sep else os.sep + name
+            if (kind is None or kind == ("dir" if is_dir else "file")) and hit(name):
+                yield path
+            if is_dir:
+                subdirs.append(path)
+        stack.extend(reversed(subdirs))
+
+
+def list_files(root: str, prune: Optional[Iterable[str]] = None) -> List[Tuple[str, int, int]]:
+    """[(path relative to root, size, mtime_ns)] of the regular files `walk(root, "**/*")` yields, sorted."""
+    out = []
+    base = root.rstrip(os.sep) or os.sep
+    for path in walk(base, "**/*", sort=True, prune=prune):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            out.append((path[len(base):].lstrip(os.sep).replace(os.sep, "/"), st.st_size, st.st_mtime_ns))
+    return out
@@ -1,22 +1,16 @@
 #!/usr/bin/env python3
 import sys
 import json
-import traceback
-from typing import Any, Dict, List, Optional
-from mcp_local.config import load_config
-from mcp_local.policy import (
-    ensure_path_allowed,
-    check_sql_write_policy,
-    split_single_statement,
-)
-from mcp_local.tools import (
-    fs_tools,
-    git_tools,
-    rg_tools,
-    pg_tools,
-    nerdctl_tools,
-    mgrep_tools,
-)
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from mcp_local import registry
+from mcp_local.config import ConfigStore, install_sighup
+from mcp_local.metrics import METRICS
+
+# Tool modules, yaml and the worker pool are imported on the first tools/call
+# (see mcp_local.registry and _Runtime) so initialize/tools/list answer fast.
 
 PROTOCOL_VERSION = "2024-11-05"  # informational; MCP is JSON-RPC 2.0
 
@@ -25,403 +19,422 @@ class InvalidParams(Exception):
     """Raised when request arguments are invalid or missing."""
 
 
-def _send(obj: Dict[str, Any]) -> None:
-    sys.stdout.write(json.dumps(obj, ensure_ascii=False) + "\n")
-    sys.stdout.flush()
+_SEND_LOCK = threading.Lock()
+
+# Receives one encoded JSON-RPC response, or None when a request ends without
+# one (e.g. it was cancelled). Writes to stdout, or fills a slot of a batch.
+Reply = Callable[[Optional[str]], None]
+
+
+def _write_line(encoded: Optional[str]) -> None:
+    if encoded is None:
+        return
+    # Tool calls finish on worker threads; keep each response on its own line.
+    with _SEND_LOCK:
+        sys.stdout.write(encoded + "\n")
+        sys.stdout.flush()
+
+
+def _send(obj: Dict[str, Any], reply: Reply = _write_line) -> None:
+    reply(json.dumps(obj, ensure_ascii=False))
 
 
-def _result(id_: Any, result: Any) -> None:
-    _send({"jsonrpc": "2.0", "id": id_, "result": result})
+def _result(id_: Any, result: Any, reply: Reply = _write_line) -> None:
+    _send({"jsonrpc": "2.0", "id": id_, "result": result}, reply)
 
 
-def _error(id_: Any, code: int, message: str, data: Optional[Any] = None) -> None:
+def _send_raw(id_: Any, result_json: str, reply: Reply = _write_line) -> None:
+    # result_json is already-encoded JSON (e.g. the cached tools/list payload).
+    reply('{"jsonrpc": "2.0", "id": %s, "result": %s}' % (json.dumps(id_), result_json))
+
+
+def _error(
+    id_: Any,
+    code: int,
+    message: str,
+    data: Optional[Any] = None,
+    reply: Reply = _write_line,
+) -> None:
     err = {"code": code, "message": message}
     if data is not None:
         err["data"] = data
-    _send({"jsonrpc": "2.0", "id": id_, "error": err})
+    _send({"jsonrpc": "2.0", "id": id_, "error": err}, reply)
 
 
 def _text_content(text: str) -> Dict[str, Any]:
     return {"content": [{"type": "text", "text": text}]}
 
 
-def tools_list(config) -> List[Dict[str, Any]]:
-    # Minimal tool schema with JSON schema inputSchema
-    return [
-        # Filesystem
-        {
-            "name": "fs_read",
-            "description": "Read a text file (restricted to allowed_roots).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {"path": {"type": "string"}},
-                "required": ["path"],
-            },
-        },
-        {
-            "name": "fs_write",
-            "description": "Write a text file (restricted to allowed_roots).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string"},
-                    "content": {"type": "string"},
-                },
-                "required": ["path", "content"],
-            },
-        },
-        {
-            "name": "fs_list",
-            "description": "List directory entries (restricted to allowed_roots).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {"path": {"type": "string"}},
-                "required": ["path"],
-            },
-        },
-        {
-            "name": "fs_glob",
-            "description": "Glob files under an allowed root (restricted).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "root": {"type": "string"},
-                    "pattern": {"type": "string"},
-                },
-                "required": ["root", "pattern"],
-            },
-        },
-        # Git
-        {
-            "name": "git_status",
-            "description": "git status --porcelain in a repo.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {"repo": {"type": "string"}},
-                "required": ["repo"],
-            },
-        },
-        {
-            "name": "git_diff",
-            "description": "git diff (optionally staged).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "repo": {"type": "string"},
-                    "staged": {"type": "boolean"},
-                },
-                "required": ["repo"],
-            },
-        },
-        {
-            "name": "git_log",
-            "description": "git log --oneline (n entries).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "repo": {"type": "string"},
-                    "n": {"type": "integer", "minimum": 1, "maximum": 200},
-                },
-                "required": ["repo"],
-            },
-        },
-        {
-            "name": "git_checkout",
-            "description": "git checkout <branch>.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "repo": {"type": "string"},
-                    "branch": {"type": "string"},
-                },
-                "required": ["repo", "branch"],
-            },
-        },
-        {
-            "name": "git_commit",
-            "description": "git commit -am <message> (only tracked changes).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "repo": {"type": "string"},
-                    "message": {"type": "string"},
-                },
-                "required": ["repo", "message"],
-            },
-        },
-        # Ripgrep
-        {
-            "name": "rg_search",
-            "description": "Search text in repo using ripgrep (rg).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "root": {"type": "string"},
-                    "query": {"type": "string"},
-                    "glob": {"type": "string"},
-                    "max_results": {"type": "integer", "minimum": 1, "maximum": 5000},
-                },
-                "required": ["root", "query"],
-            },
-        },
-        {
-            "name": "mgrep_search",
-            "description": "Approximate text search with match probability (mimics mgrep).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "path": {"type": "string"},
-                    "query": {"type": "string"},
-                    "min_probability": {
-                        "type": "number",
-                        "minimum": 0.0,
-                        "maximum": 1.0,
-                    },
-                    "max_results": {
-                        "type": "integer",
-                        "minimum": 1,
-                        "maximum": 500,
-                    },
-                },
-                "required": ["path", "query"],
-            },
-        },
-        # Postgres
-        {
-            "name": "pg_query",
-            "description": "Run a read-only SQL query on a named Postgres connection.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "conn": {"type": "string"},
-                    "sql": {"type": "string"},
-                    "limit": {"type": "integer", "minimum": 1, "maximum": 10000},
-                },
-                "required": ["conn", "sql"],
-            },
-        },
-        {
-            "name": "pg_exec",
-            "description": "Run a write SQL statement (INSERT/UPDATE/DELETE) with policy guards on a named Postgres connection.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {"conn": {"type": "string"}, "sql": {"type": "string"}},
-                "required": ["conn", "sql"],
-            },
-        },
-        # nerdctl
-        {
-            "name": "nerdctl",
-            "description": "Run nerdctl locally or on a remote SSH host when host is provided.",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "args": {"type": "array", "items": {"type": "string"}},
-                    "host": {"type": "string"},
-                },
-                "required": ["args"],
-            },
-        },
-        {
-            "name": "nerdctl_local",
-            "description": "Run nerdctl locally (e.g., ps/logs/exec).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {"args": {"type": "array", "items": {"type": "string"}}},
-                "required": ["args"],
-            },
-        },
-        {
-            "name": "nerdctl_ssh",
-            "description": "Run nerdctl on a remote host via SSH (key-based auth).",
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    "host": {"type": "string"},
-                    "args": {"type": "array", "items": {"type": "string"}},
-                },
-                "required": ["host", "args"],
-            },
-        },
-    ]
-
-
 def handle_tools_call(name: str, args: Dict[str, Any], config) -> str:
     allowed_roots = config.get("allowed_roots", [])
     if not allowed_roots:
         raise InvalidParams("allowed_roots is not configured; set it in config.yaml")
 
-    postgres_cfg = config.get("postgres", {})
-    write_policy = postgres_cfg.get("write_policy", {})
-
-    # Filesystem (scoped)
-    if name == "fs_read":
-        path = args["path"]
-        ensure_path_allowed(path, allowed_roots)
-        return fs_tools.read_text(path)
-    if name == "fs_write":
-        path = args["path"]
-        ensure_path_allowed(path, allowed_roots)
-        return fs_tools.write_text(path, args["content"])
-    if name == "fs_list":
-        path = args["path"]
-        ensure_path_allowed(path, allowed_roots)
-        return fs_tools.list_dir(path)
-    if name == "fs_glob":
-        root = args["root"]
-        ensure_path_allowed(root, allowed_roots)
-        return fs_tools.glob_files(root, args["pattern"])
-
-    # Git (scoped to allowed roots via repo path check)
-    if name.startswith("git_"):
-        repo = args["repo"]
-        ensure_path_allowed(repo, allowed_roots)
-        if name == "git_status":
-            return git_tools.status(repo)
-        if name == "git_diff":
-            return git_tools.diff(repo, staged=bool(args.get("staged", False)))
-        if name == "git_log":
-            return git_tools.log(repo, n=int(args.get("n", 20)))
-        if name == "git_checkout":
-            return git_tools.checkout(repo, args["branch"])
-        if name == "git_commit":
-            return git_tools.commit_am(repo, args["message"])
-
-    # Ripgrep
-    if name == "rg_search":
-        root = args["root"]
-        ensure_path_allowed(root, allowed_roots)
-        return rg_tools.search(
-            root,
-            args["query"],
-            glob=args.get("glob"),
-            max_results=int(args.get("max_results", 200)),
-        )
-    if name == "mgrep_search":
-        path = args["path"]
-        ensure_path_allowed(path, allowed_roots)
-        return mgrep_tools.search_file(
-            path,
-            args["query"],
-            min_probability=float(args.get("min_probability", 0.5)),
-            max_results=int(args.get("max_results", 20)),
+    spec = registry.get(name)
+    if spec is None:
+        raise ValueError(f"Unknown tool: {name}")
+
+    start = time.perf_counter()
+    error = cancelled = False
+    out = ""
+    try:
+        out = spec.call(args, config)
+        return out
+    except Exception as e:
+        from mcp_local.cancel import Cancelled
+
+        cancelled = isinstance(e, Cancelled)
+        error = not cancelled
+        raise
+    finally:
+        METRICS.record(
+            name,
+            time.perf_counter() - start,
+            nbytes=len(out.encode("utf-8")),
+            error=error,
+            cancelled=cancelled,
         )
 
-    # Postgres
-    if name == "pg_query":
-        conn = args["conn"]
-        sql = args["sql"]
-        limit = int(args.get("limit", 2000))
-        return pg_tools.query(config, conn, sql, limit=limit)
-
-    if name == "pg_exec":
-        conn = args["conn"]
-        sql = args["sql"]
-        sql = split_single_statement(
-            sql,
-            allow_multi=bool(
-                write_policy.get("allow_multi_statement", False)
-            ),
+
+def _call_tool(id_: Any, name: str, args: Dict[str, Any], config, reply: Reply) -> None:
+    # Worker thread only: the dispatcher has already imported mcp_local.cancel.
+    from mcp_local import cancel
+
+    token = cancel.current()
+    try:
+        out = handle_tools_call(name, args, config)
+        if token is None or not token.cancelled:
+            _result(id_, _text_content(out), reply)
+        else:
+            reply(None)
+    except cancel.Cancelled:
+        reply(None)  # the client gave up on this id; MCP says send nothing
+    except InvalidParams as e:
+        _error(id_, -32602, str(e), reply=reply)
+    except Exception as e:
+        if token is not None and token.cancelled:
+            reply(None)  # failure caused by the cancellation (killed child, etc.)
+            return
+        import traceback
+
+        _error(
+            id_,
+            -32000,
+            f"Tool error: {e}",
+            data={"trace": traceback.format_exc()},
+            reply=reply,
         )
-        check_sql_write_policy(sql, write_policy)
-        return pg_tools.exec_write(config, conn, sql)
 
-    # nerdctl
-    if name == "nerdctl":
-        host = args.get("host")
-        if host:
-            return nerdctl_tools.remote_ssh(config, host, args["args"])
-        return nerdctl_tools.local(config, args["args"])
-    if name == "nerdctl_local":
-        return nerdctl_tools.local(config, args["args"])
-    if name == "nerdctl_ssh":
-        return nerdctl_tools.remote_ssh(config, args["host"], args["args"])
 
-    raise ValueError(f"Unknown tool: {name}")
+class _Runtime:
+    """Config and worker pool, created when the first tool call needs them."""
+
+    def __init__(self) -> None:
+        self._store: Optional[ConfigStore] = None
+        self._dispatcher = None
+        # JSON-RPC id -> CancelToken of calls not yet finished.
+        self._inflight: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def config(self) -> dict:
+        """Current config snapshot; a reload swaps it, never mutates it."""
+        if self._store is None:
+            store = ConfigStore()
+            store.on_change(self._apply_config)
+            store.start_watching()
+            self._store = store
+        return self._store.get()
+
+    @property
+    def dispatcher(self):
+        if self._dispatcher is None:
+            from mcp_local.cache import CACHE
+            from mcp_local.dispatch import Dispatcher
+
+            CACHE.configure(self.config["cache"])
+            self._dispatcher = Dispatcher.from_config(self.config)
+            self._start_exporter(self.config)
+            if self.config["index"].get("enabled"):
+                from mcp_local import index
+
+                index.configure(self.config)
+        return self._dispatcher
+
+    def _start_exporter(self, config: dict) -> None:
+        textfile = config["metrics"].get("textfile")
+        if textfile:
+            METRICS.start_textfile_exporter(textfile, float(config["metrics"].get("interval_s", 15)))
+
+    def _apply_config(self, old: dict, new: dict) -> None:
+        # Runs on the config watcher thread after the new config is live.
+        # Only subsystems whose settings changed are touched.
+        if self._dispatcher is None:
+            return  # nothing built yet; everything will read the new config
+        if old["concurrency"] != new["concurrency"]:
+            self._dispatcher.reconfigure(new)
+        if old["cache"] != new["cache"]:
+            from mcp_local.cache import CACHE
+
+            CACHE.configure(new["cache"])
+        if old["metrics"] != new["metrics"]:
+            METRICS.stop_exporter()
+            self._start_exporter(new)
+        index_keys = ("index", "allowed_roots", "fs")
+        if any(old[k] != new[k] for k in index_keys) and (
+            new["index"].get("enabled") or "mcp_local.index" in sys.modules
+        ):
+            from mcp_local import index
+
+            index.configure(new)
+        old_urls = {n: c.get("url") for n, c in old["postgres"]["connections"].items()}
+        new_urls = {n: c.get("url") for n, c in new["postgres"]["connections"].items()}
+        stale = {url for name, url in old_urls.items() if new_urls.get(name) != url}
+        pg_tools = sys.modules.get("mcp_local.tools.pg_tools")
+        if stale and pg_tools is not None:
+            pg_tools.close_pools(stale - set(new_urls.values()))
+
+    def request_reload(self) -> None:
+        if self._store is not None:
+            self._store.request_reload()
+
+    def submit(self, id_: Any, tool: str, fn, on_drop: Callable[[], None]) -> None:
+        """Run fn on the pool; on_drop() if it is cancelled before it starts."""
+        from mcp_local.cancel import CancelToken
+
+        token = CancelToken()
+        if id_ is not None:
+            with self._lock:
+                self._inflight[id_] = token
+
+        def run() -> None:
+            try:
+                fn()
+            finally:
+                with self._lock:
+                    if self._inflight.get(id_) is token:
+                        del self._inflight[id_]
+
+        self.dispatcher.submit(tool, run, token, on_drop=on_drop)
+
+    def cancel(self, id_: Any) -> None:
+        with self._lock:
+            token = self._inflight.pop(id_, None)
+        if token is not None and self._dispatcher is not None:
+            self._dispatcher.cancel(token)
+
+    def drain(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.drain()
+            METRICS.stop_exporter(self.config["metrics"].get("textfile"))
+
 
+class _Recorder:
+    """Tees incoming requests, timestamped, to a JSONL file for mcp_local.replay."""
 
-def main() -> None:
-    config = load_config()
+    def __init__(self, path: str) -> None:
+        self._f = open(path, "a", encoding="utf-8")
+        self._t0 = time.monotonic()
+
+    def write(self, line: str) -> None:
+        entry = {"t": round(time.monotonic() - self._t0, 6), "ts": time.time()}
+        try:
+            entry["msg"] = json.loads(line)
+        except ValueError:
+            entry["raw"] = line
+        self._f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def _parse_args(argv: List[str]):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="local-mcp stdio server")
+    ap.add_argument(
+        "--record",
+        metavar="PATH",
+        default=os.environ.get("LOCAL_MCP_RECORD"),
+        help="append every incoming request, with timestamps, to PATH (JSONL)",
+    )
+    return ap.parse_args(argv)
+
+
+class _Batch:
+    """
+    Collects the responses of one JSON-RPC batch and writes them as a single
+    array, in request order, once every member has finished. Members that are
+    notifications (or end without a response) are left out.
+    """
+
+    _PENDING = object()
+
+    def __init__(self, size: int) -> None:
+        self._slots: List[Any] = [self._PENDING] * size
+        self._left = size
+        self._lock = threading.Lock()
+
+    def reply_for(self, index: int, expects_response: bool) -> Reply:
+        if expects_response:
+            return lambda encoded: self._fill(index, encoded)
+        return lambda encoded: self._fill(index, None)
+
+    def settle(self, index: int) -> None:
+        # A synchronously handled member that sent nothing: close its slot.
+        self._fill(index, None)
+
+    def _fill(self, index: int, encoded: Optional[str]) -> None:
+        with self._lock:
+            if self._slots[index] is not self._PENDING:
+                return
+            self._slots[index] = encoded
+            self._left -= 1
+            if self._left:
+                return
+            parts = [p for p in self._slots if p is not None]
+        if parts:
+            _write_line("[" + ",".join(parts) + "]")
+
+
+def _handle_message(msg: Any, runtime: _Runtime, reply: Reply) -> bool:
+    """
+    Handle one JSON-RPC message. Returns True when the response will be sent
+    later (a tools/call handed to the worker pool), False when handling is
+    complete, whether or not a response was sent.
+    """
+    if not isinstance(msg, dict):
+        _error(None, -32600, "Invalid Request", reply=reply)
+        return False
+    id_ = msg.get("id")
+    method = msg.get("method")
+    params = msg.get("params") or {}
+
+    # Notifications may omit id; ignore unknown notifications
+    if method == "initialize":
+        _result(
+            id_,
+            {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "local-mcp", "version": "1.0.0"},
+            },
+            reply,
+        )
+        return False
+
+    if method == "tools/list":
+        _send_raw(id_, registry.tools_list_json(), reply)
+        return False
+
+    if method == "tools/call":
+        tool_name = params.get("name")
+        tool_args = params.get("arguments") or {}
+        if not tool_name:
+            _error(
+                id_,
+                -32602,
+                "tools/call missing tool name; pass params.name",
+                reply=reply,
+            )
+            return False
+        try:
+            config = runtime.config
+        except Exception as e:
+            _error(id_, -32000, f"Config error: {e}", reply=reply)
+            return False
+        # Runs on the pool; the response goes out when it finishes.
+        runtime.submit(
+            id_,
+            tool_name,
+            lambda: _call_tool(id_, tool_name, tool_args, config, reply),
+            on_drop=lambda: reply(None),
+        )
+        return True
+
+    if method == "notifications/cancelled":
+        # Unknown or already-finished ids are ignored, per MCP.
+        runtime.cancel(params.get("requestId"))
+        return False
+
+    # Minimal responses for optional methods
+    if method in ("resources/list", "prompts/list"):
+        _result(
+            id_,
+            {"resources": []}
+            if method == "resources/list"
+            else {"prompts": []},
+            reply,
+        )
+        return False
+
+    if method in ("resources/read", "prompts/get"):
+        _error(
+            id_,
+            -32602,
+            "No resources or prompts are exposed by this server.",
+            reply=reply,
+        )
+        return False
+
+    # Unknown method
+    if id_ is not None:
+        _error(id_, -32601, f"Method not found: {method}", reply=reply)
+    return False
+
+
+def _handle_batch(msgs: List[Any], runtime: _Runtime) -> None:
+    if not msgs:
+        _error(None, -32600, "Invalid Request: empty batch")
+        return
+    batch = _Batch(len(msgs))
+    for i, msg in enumerate(msgs):
+        # Notifications (no "id" member) never contribute a response.
+        expects = not isinstance(msg, dict) or "id" in msg
+        reply = batch.reply_for(i, expects)
+        try:
+            pending = _handle_message(msg, runtime, reply)
+        except Exception as e:
+            _error(msg.get("id") if isinstance(msg, dict) else None, -32603, f"Dispatch error: {e}", reply=reply)
+            pending = False
+        if not pending:
+            batch.settle(i)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    opts = _parse_args(sys.argv[1:] if argv is None else argv)
+    runtime = _Runtime()
+    install_sighup(runtime.request_reload)
+    recorder = _Recorder(opts.record) if opts.record else None
 
     for line in sys.stdin:
         line = line.strip()
         if not line:
             continue
+        if recorder is not None:
+            recorder.write(line)
+        msg = None
         try:
             msg = json.loads(line)
-            id_ = msg.get("id")
-            method = msg.get("method")
-            params = msg.get("params") or {}
-
-            # Notifications may omit id; ignore unknown notifications
-            if method == "initialize":
-                _result(
-                    id_,
-                    {
-                        "protocolVersion": PROTOCOL_VERSION,
-                        "capabilities": {"tools": {}},
-                        "serverInfo": {"name": "local-mcp", "version": "1.0.0"},
-                    },
-                )
-                continue
-
-            if method == "tools/list":
-                _result(id_, {"tools": tools_list(config)})
-                continue
-
-            if method == "tools/call":
-                tool_name = params.get("name")
-                tool_args = params.get("arguments") or {}
-                if not tool_name:
-                    _error(
-                        id_,
-                        -32602,
-                        "tools/call missing tool name; pass params.name",
-                    )
-                    continue
-                try:
-                    out = handle_tools_call(tool_name, tool_args, config)
-                    _result(id_, _text_content(out))
-                except InvalidParams as e:
-                    _error(id_, -32602, str(e))
-                except Exception as e:
-                    _error(
-                        id_,
-                        -32000,
-                        f"Tool error: {e}",
-                        data={"trace": traceback.format_exc()},
-                    )
-                continue
-
-            # Minimal responses for optional methods
-            if method in ("resources/list", "prompts/list"):
-                _result(
-                    id_,
-                    {"resources": []}
-                    if method == "resources/list"
-                    else {"prompts": []},
-                )
-                continue
-
-            if method in ("resources/read", "prompts/get"):
-                _error(
-                    id_,
-                    -32602,
-                    "No resources or prompts are exposed by this server.",
-                )
-                continue
-
-            # Unknown method
-            if id_ is not None:
-                _error(id_, -32601, f"Method not found: {method}")
+            if isinstance(msg, list):
+                # Batch: members run concurrently; one array response, in order.
+                _handle_batch(msg, runtime)
+            else:
+                _handle_message(msg, runtime, _write_line)
         except Exception as e:
             # If we can't parse / handle, respond if possible
             try:
-                _error(msg.get("id"), -32700, f"Parse/dispatch error: {e}")
+                _error(msg.get("id") if isinstance(msg, dict) else None, -32700, f"Parse/dispatch error: {e}")
             except Exception:
                 # Can't even respond; keep going
                 pass
 
+    # stdin closed: let in-flight calls write their responses before exiting.
+    runtime.drain()
+    if recorder is not None:
+        recorder.close()
+
 
 if __name__ == "__main__":
     main()